@@ -0,0 +1,12 @@
+# NOTE: gunicorn -c gunicorn.conf.py run:app, the number of workers is set by WEB_CONCURRENCY
+from src.constans import WORKER_MODE, WORKER_THREADS, WORKER_CONNECTIONS
+
+bind = '0.0.0.0:5000'
+worker_class = WORKER_MODE
+# NOTE: the app is loaded by every worker after gevent has patched it, so it is not preloaded
+preload_app = False
+
+if WORKER_MODE == 'gthread':
+    threads = WORKER_THREADS
+if WORKER_MODE == 'gevent':
+    worker_connections = WORKER_CONNECTIONS
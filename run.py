@@ -1,9 +1,5 @@
-import logging
-
 from src.app import Application
 
-logging.basicConfig(level=logging.DEBUG)
-
 
 def create_app():
     application = Application(__name__)
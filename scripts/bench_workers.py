@@ -0,0 +1,177 @@
+"""Compares how many concurrent slow connections the worker modes serve.
+
+Every mode is started as a gunicorn instance with the same number of workers. Slow clients
+open connections and send their requests in two parts with a pause between them, the way a client
+on a bad network does, while a probe client sends quick requests. A sync worker is tied up by a
+slow client for the whole pause, so the probe waits once the slow clients outnumber the workers,
+gthread and gevent workers keep serving it.
+
+    python scripts/bench_workers.py --modes sync gthread gevent --workers 2 --connections 1 8 64 256
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+from replay import get_percentile
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+class LevelResult(NamedTuple):
+    mode: str
+    connections: int
+    completed: int
+    failed: int
+    probe_count: int
+    probe_failed: int
+    probe_p50: float
+    probe_p99: float
+
+
+def start_server(mode: str, workers: int, port: int) -> subprocess.Popen:
+    env = {**os.environ, 'WORKER_MODE': mode}
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+         '--workers', str(workers), '--backlog', '2048', 'run:app'],
+        cwd=PROJECT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_until_ready(port: int, host: str, path: str, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', path, headers={'Host': host})
+            connection.getresponse().read()
+            connection.close()
+            return True
+        except (OSError, http.client.HTTPException):
+            time.sleep(0.2)
+    return False
+
+
+def slow_request(port: int, host: str, path: str, pause: float, timeout: float) -> bool:
+    request = f'GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n'.encode()
+    try:
+        with socket.create_connection(('127.0.0.1', port), timeout=timeout) as connection:
+            # NOTE: the request line is sent at once, the headers only after the pause
+            split_at = request.index(b'\r\n') + 2
+            connection.sendall(request[:split_at])
+            time.sleep(pause)
+            connection.sendall(request[split_at:])
+            response = b''
+            while True:
+                chunk = connection.recv(65536)
+                if not chunk:
+                    break
+                response += chunk
+        return response.startswith(b'HTTP/1.1 200') or response.startswith(b'HTTP/1.0 200')
+    except OSError:
+        return False
+
+
+def run_level(mode: str, connections: int, port: int, host: str, path: str, pause: float,
+              timeout: float) -> LevelResult:
+    outcomes: List[bool] = []
+    outcomes_lock = threading.Lock()
+
+    def run_slow_client() -> None:
+        is_completed = slow_request(port, host, path, pause, timeout)
+        with outcomes_lock:
+            outcomes.append(is_completed)
+
+    clients = [threading.Thread(target=run_slow_client, daemon=True) for _ in range(connections)]
+    for client in clients:
+        client.start()
+
+    # NOTE: the probe runs while the slow clients hold their connections
+    latencies, probe_failed = [], 0
+    deadline = time.monotonic() + pause
+    while time.monotonic() < deadline:
+        started_at = time.perf_counter()
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+            connection.request('GET', path, headers={'Host': host})
+            status = connection.getresponse().status
+            connection.close()
+        except (OSError, http.client.HTTPException):
+            status = None
+        if status == 200:
+            latencies.append((time.perf_counter() - started_at) * 1000)
+        else:
+            probe_failed += 1
+        time.sleep(0.05)
+
+    for client in clients:
+        client.join()
+    latencies.sort()
+    return LevelResult(mode, connections, sum(outcomes), len(outcomes) - sum(outcomes),
+                       len(latencies) + probe_failed, probe_failed,
+                       get_percentile(latencies, 50), get_percentile(latencies, 99))
+
+
+def bench_mode(mode: str, args: argparse.Namespace) -> Optional[List[LevelResult]]:
+    server = start_server(mode, args.workers, args.port)
+    try:
+        if not wait_until_ready(args.port, args.host, args.path, args.startup_timeout):
+            print(f'{mode} workers did not start, is the worker class installed?', file=sys.stderr)
+            return None
+        return [run_level(mode, connections, args.port, args.host, args.path, args.pause, args.timeout)
+                for connections in args.connections]
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def format_report(results: List[LevelResult]) -> str:
+    header = ['mode', 'slow connections', 'completed', 'failed', 'probes', 'probes failed',
+              'probe p50', 'probe p99']
+    rows = [[result.mode, result.connections, result.completed, result.failed, result.probe_count,
+             result.probe_failed, f'{result.probe_p50:.2f}', f'{result.probe_p99:.2f}']
+            for result in results]
+    widths = [max(len(str(row[i])) for row in [header] + rows) for i in range(len(header))]
+    lines = ['  '.join(str(cell).rjust(width) for cell, width in zip(row, widths)) for row in [header] + rows]
+    lines.append('')
+    lines.append('Probe latencies are in ms, a probe fails when it is not served within the timeout.')
+    return '\n'.join(lines)
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--modes', nargs='+', default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers of every mode')
+    parser.add_argument('--connections', type=int, nargs='+', default=[1, 8, 64, 256],
+                        help='numbers of concurrent slow connections')
+    parser.add_argument('--pause', type=float, default=2, help='pause of a slow client in seconds')
+    parser.add_argument('--timeout', type=float, default=5, help='timeout of a request in seconds')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--host', default='vm-currency.com:5000', help='Host header, the SERVER_NAME')
+    parser.add_argument('--path', default='/api/v1/currencies', help='path of the requests')
+    parser.add_argument('--startup-timeout', type=float, default=30)
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str]) -> int:
+    args = parse_args(argv)
+    results = []
+    for mode in args.modes:
+        print(f'Benchmarking {mode} workers...', file=sys.stderr)
+        mode_results = bench_mode(mode, args)
+        if mode_results:
+            results.extend(mode_results)
+    if not results:
+        return 1
+    print(format_report(results))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,57 @@
+"""Switches the database to the incremental auto vacuum, so the rate compaction returns freed pages.
+
+The mode of an existing database is switched only by a full VACUUM. It rewrites the whole file,
+needs as much free disk space as the database takes and holds the write lock until it is done,
+so it is run once, while the API is stopped.
+
+    python scripts/enable_incremental_vacuum.py Resources/db.sqlite
+"""
+import argparse
+import sqlite3
+import sys
+import time
+from typing import List
+
+# NOTE: auto_vacuum modes of the SQLite header
+INCREMENTAL_AUTO_VACUUM = 2
+
+
+def enable_incremental_vacuum(path: str, timeout: float) -> bool:
+    """Returns False if the database was already in the incremental auto vacuum mode."""
+    # NOTE: without a transaction of the driver, VACUUM can not run inside one
+    connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    try:
+        if connection.execute('PRAGMA auto_vacuum').fetchone()[0] == INCREMENTAL_AUTO_VACUUM:
+            return False
+        connection.execute(f'PRAGMA auto_vacuum = {INCREMENTAL_AUTO_VACUUM}')
+        connection.execute('VACUUM')
+        return True
+    finally:
+        connection.close()
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('database', help='path of the SQLite database')
+    parser.add_argument('--timeout', type=float, default=30, help='wait for the write lock in seconds')
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str]) -> int:
+    args = parse_args(argv)
+    print(f'Switching {args.database} to the incremental auto vacuum...', file=sys.stderr)
+    started_at = time.perf_counter()
+    try:
+        is_switched = enable_incremental_vacuum(args.database, args.timeout)
+    except sqlite3.Error as e:
+        print(f'Failed to switch the database: {e}', file=sys.stderr)
+        return 1
+    if not is_switched:
+        print('The database is already in the incremental auto vacuum mode.', file=sys.stderr)
+        return 0
+    print(f'The database was switched in {time.perf_counter() - started_at:.1f} s.', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
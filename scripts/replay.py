@@ -0,0 +1,256 @@
+"""Replays a traffic capture against a running instance and reports the latencies per route.
+
+The capture is written by the API with TRAFFIC_CAPTURE_ENABLED=true. The requests are sent in
+their original order and pacing, scaled by the speed, by a pool of connections. A request is
+sent late when all connections are busy, it is the way a saturated instance is seen by clients.
+
+The target should serve a copy of the database the capture was taken with, so the ids of the
+captured paths exist. Rate limiting of the target has to be disabled or the replay has to be
+sent with one of its RATE_LIMIT_API_KEYS, see --header.
+
+    python scripts/replay.py Resources/traffic.jsonl --target http://127.0.0.1:5000 \\
+        --host vm-currency.com:5000 --speed 2 --concurrency 16
+"""
+import argparse
+import http.client
+import json
+import math
+import queue
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+# NOTE: statuses counted as errors, client errors are a part of the captured traffic
+_ERROR_STATUS: int = 500
+_PERCENTILES: Tuple[int, ...] = (50, 90, 99)
+
+
+class CapturedRequest(NamedTuple):
+    offset: float
+    method: str
+    path: str
+    route: str
+    args: Dict[str, List[str]]
+    body: Any
+    headers: Dict[str, str]
+    status: int
+    duration: float
+
+
+class Result(NamedTuple):
+    route: str
+    # NOTE: None when the request failed without a response
+    status: Optional[int]
+    captured_status: int
+    latency: float
+    captured_duration: float
+    # NOTE: delay of the send behind the schedule, all connections were busy
+    lag: float
+
+
+def load_capture(path: str, limit: Optional[int]) -> List[CapturedRequest]:
+    entries = []
+    with open(path, encoding='utf-8') as capture_file:
+        for line in capture_file:
+            if line.strip():
+                entries.append(json.loads(line))
+    # NOTE: the workers append to the file concurrently, so the records are only roughly ordered
+    entries.sort(key=lambda entry: entry['t'])
+    if limit is not None:
+        entries = entries[:limit]
+    if not entries:
+        return []
+
+    started_at = entries[0]['t']
+    return [
+        CapturedRequest(
+            offset=entry['t'] - started_at,
+            method=entry['m'],
+            path=entry['p'],
+            route=f"{entry['m']} {entry.get('r') or entry['p']}",
+            args=entry.get('a') or {},
+            body=entry.get('b'),
+            headers=entry.get('h') or {},
+            status=entry['s'],
+            duration=entry['d'] / 1000,
+        )
+        for entry in entries
+    ]
+
+
+class Replayer:
+    def __init__(self, target: str, host: Optional[str], headers: Dict[str, str], speed: float,
+                 concurrency: int, timeout: float):
+        url = urlsplit(target)
+        self._scheme: str = url.scheme
+        self._netloc: str = url.netloc
+        self._host: Optional[str] = host
+        self._headers: Dict[str, str] = headers
+        self._speed: float = speed
+        self._concurrency: int = concurrency
+        self._timeout: float = timeout
+        self._queue: queue.Queue = queue.Queue()
+        self._results: List[Result] = []
+        self._results_lock: threading.Lock = threading.Lock()
+
+    def replay(self, requests: List[CapturedRequest]) -> Tuple[List[Result], float]:
+        workers = [threading.Thread(target=self._work, daemon=True) for _ in range(self._concurrency)]
+        for worker in workers:
+            worker.start()
+
+        started_at = time.perf_counter()
+        for captured, due_at in self._schedule(requests, started_at):
+            delay = due_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self._queue.put((captured, due_at))
+        for _ in workers:
+            self._queue.put(None)
+        for worker in workers:
+            worker.join()
+        return self._results, time.perf_counter() - started_at
+
+    def _schedule(self, requests: List[CapturedRequest],
+                  started_at: float) -> Iterator[Tuple[CapturedRequest, float]]:
+        for captured in requests:
+            # NOTE: speed 0 sends the requests as fast as the connections take them
+            due_at = started_at + captured.offset / self._speed if self._speed > 0 else started_at
+            yield captured, due_at
+
+    def _work(self) -> None:
+        connection = None
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            captured, due_at = item
+            if connection is None:
+                connection = self._connect()
+
+            sent_at = time.perf_counter()
+            try:
+                status = self._send(connection, captured)
+            except (OSError, http.client.HTTPException):
+                # NOTE: the connection is in an unknown state after an error, a new one is opened
+                connection.close()
+                connection = None
+                status = None
+            result = Result(captured.route, status, captured.status, time.perf_counter() - sent_at,
+                            captured.duration, max(sent_at - due_at, 0))
+            with self._results_lock:
+                self._results.append(result)
+        if connection is not None:
+            connection.close()
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self._scheme == 'https':
+            return http.client.HTTPSConnection(self._netloc, timeout=self._timeout)
+        return http.client.HTTPConnection(self._netloc, timeout=self._timeout)
+
+    def _send(self, connection: http.client.HTTPConnection, captured: CapturedRequest) -> int:
+        path = captured.path
+        if captured.args:
+            path = f'{path}?{urlencode(captured.args, doseq=True)}'
+        headers = {**captured.headers, **self._headers}
+        if self._host:
+            headers['Host'] = self._host
+        body = None
+        if captured.body is not None:
+            body = json.dumps(captured.body).encode()
+            headers['Content-Type'] = 'application/json'
+
+        connection.request(captured.method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        # NOTE: the body is read, so the latency includes the transfer and the connection is reusable
+        response.read()
+        return response.status
+
+
+def get_percentile(sorted_values: List[float], percentile: float) -> float:
+    """Returns the nearest-rank percentile."""
+    if not sorted_values:
+        return math.nan
+    rank = max(math.ceil(percentile / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def format_report(results: List[Result], elapsed: float) -> str:
+    results_by_route: Dict[str, List[Result]] = defaultdict(list)
+    for result in results:
+        results_by_route[result.route].append(result)
+
+    percentile_columns = [f'p{percentile}' for percentile in _PERCENTILES]
+    header = ['route', 'count', 'rps', 'errors', 'changed', *percentile_columns, 'max', 'captured p50', 'lag p99']
+    rows = []
+    for route, route_results in sorted(results_by_route.items(), key=lambda item: -len(item[1])):
+        rows.append([route, *_get_summary(route_results, elapsed)])
+    rows.append(['total', *_get_summary(results, elapsed)])
+
+    widths = [max(len(str(row[i])) for row in [header] + rows) for i in range(len(header))]
+    lines = ['  '.join(str(cell).ljust(width) if i == 0 else str(cell).rjust(width)
+                       for i, (cell, width) in enumerate(zip(row, widths)))
+             for row in [header] + rows]
+    lines.append('')
+    lines.append('Latencies are in ms. "changed" counts responses with another status than the captured '
+                 'one, "lag" is the delay of sends behind the schedule.')
+    return '\n'.join(lines)
+
+
+def _get_summary(results: List[Result], elapsed: float) -> List[Any]:
+    latencies = sorted(result.latency * 1000 for result in results)
+    captured = sorted(result.captured_duration * 1000 for result in results)
+    lags = sorted(result.lag * 1000 for result in results)
+    errors = sum(1 for result in results if result.status is None or result.status >= _ERROR_STATUS)
+    changed = sum(1 for result in results if result.status != result.captured_status)
+    return [
+        len(results),
+        f'{len(results) / elapsed:.1f}' if elapsed else '-',
+        errors,
+        changed,
+        *(f'{get_percentile(latencies, percentile):.2f}' for percentile in _PERCENTILES),
+        f'{latencies[-1]:.2f}',
+        f'{get_percentile(captured, 50):.2f}',
+        f'{get_percentile(lags, 99):.2f}',
+    ]
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('capture', help='traffic capture file')
+    parser.add_argument('--target', default='http://127.0.0.1:5000', help='base URL of the instance')
+    parser.add_argument('--host', help='Host header, e.g. the SERVER_NAME of the instance')
+    parser.add_argument('--header', action='append', default=[], metavar='NAME:VALUE',
+                        help='header added to every request, e.g. an API key')
+    parser.add_argument('--speed', type=float, default=1,
+                        help='multiplier of the captured pace, 0 sends as fast as possible')
+    parser.add_argument('--concurrency', type=int, default=8, help='number of connections')
+    parser.add_argument('--timeout', type=float, default=30, help='request timeout in seconds')
+    parser.add_argument('--limit', type=int, help='replay only that many first requests')
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str]) -> int:
+    args = parse_args(argv)
+    headers = {}
+    for header in args.header:
+        name, _, value = header.partition(':')
+        headers[name.strip()] = value.strip()
+
+    requests = load_capture(args.capture, args.limit)
+    if not requests:
+        print('The capture is empty.', file=sys.stderr)
+        return 1
+
+    print(f'Replaying {len(requests)} requests over {requests[-1].offset:.1f} s captured at '
+          f'{args.speed}x speed with {args.concurrency} connections...', file=sys.stderr)
+    replayer = Replayer(args.target, args.host, headers, args.speed, args.concurrency, args.timeout)
+    results, elapsed = replayer.replay(requests)
+    print(format_report(results, elapsed))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,5 @@
+from .arbitrage import Anomaly, AnomalyMonitor, ArbitrageDetector
+from .baskets import BasketValuation, BasketValuator
+
+arbitrage_detector = ArbitrageDetector()
+basket_valuator = BasketValuator()
@@ -0,0 +1,231 @@
+import logging
+import math
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from flask import Flask
+
+from src.models import db, BestRate, Currency, Rate
+from src.enums import CurrencyStatuesInternal
+from src.invalidation import invalidation_bus
+from src.leadership import LeaderElectedWorker
+
+logger = logging.getLogger(__name__)
+
+# NOTE: BestRate is maintained by the Rate writes, so these generations cover it as well
+ANOMALY_TABLE_NAMES: Tuple[str, ...] = (Rate.__tablename__, Currency.__tablename__)
+
+
+class Edge(NamedTuple):
+    """Conversion of one unit of the source currency into rate units of the target one."""
+    source: int
+    target: int
+    # NOTE: -log(rate), a cycle is profitable when the sum of its weights is negative
+    weight: float
+    rate_id: int
+
+
+class Anomaly(NamedTuple):
+    is_cash: bool
+    # NOTE: currency codes of the cycle, the first one is repeated at the end
+    cycle: List[str]
+    rate_ids: List[int]
+    # NOTE: relative gain of converting a unit around the cycle
+    profit: float
+
+
+class _Component(NamedTuple):
+    is_cash: bool
+    nodes: List[int]
+    edges: List[Edge]
+
+
+class ArbitrageDetector:
+    """Finds cycles of the best quotes which allow arbitrage, it is a sign of bad rates.
+
+    Selling a currency at the best buy quote is an edge currency -> base currency with the rate as
+    the multiplier, buying it at the best sell quote is an edge base currency -> currency with 1/rate.
+    A cycle of multipliers with a product above 1 is a negative cycle of -log(multiplier) weights,
+    found by Bellman-Ford from a virtual source connected to every currency. Relaxations are
+    vectorized with NumPy.
+
+    Cash and non-cash quotes are separate markets. Every weakly connected component of a market
+    is checked separately and its result is reused until one of its quotes changes.
+    """
+    # NOTE: float noise of the log sums must not be reported as arbitrage
+    _TOLERANCE: float = 1e-9
+
+    def __init__(self):
+        self._lock: threading.Lock = threading.Lock()
+        self._generations: Optional[Tuple[int, ...]] = None
+        self._anomalies: List[Anomaly] = []
+        # NOTE: results by the component edges, only the components of the latest check are kept
+        self._component_results: Dict[Tuple[bool, Tuple[Edge, ...]], Optional[Anomaly]] = {}
+
+    def get_anomalies(self) -> List[Anomaly]:
+        """Returns the anomalies of the current data, it is checked again only after writes."""
+        generations = invalidation_bus.get_generations(*ANOMALY_TABLE_NAMES)
+        with self._lock:
+            if generations != self._generations:
+                self._anomalies = self._detect()
+                self._generations = generations
+            return self._anomalies
+
+    def _detect(self) -> List[Anomaly]:
+        codes, components = self._load_components()
+        results, reused = {}, 0
+        for component in components:
+            key = (component.is_cash, tuple(component.edges))
+            if key in self._component_results:
+                results[key] = self._component_results[key]
+                reused += 1
+                continue
+            results[key] = self._find_anomaly(component, codes)
+        self._component_results = results
+        logger.info('Checked %d rate graph components for arbitrage, %d of them were unchanged.',
+                    len(components), reused)
+        return [anomaly for anomaly in results.values() if anomaly is not None]
+
+    @staticmethod
+    def _load_components() -> Tuple[Dict[int, str], List[_Component]]:
+        codes = dict(db.session.query(Currency.id, Currency.code)
+                     .filter(Currency.status == CurrencyStatuesInternal.active.value)
+                     .all())
+        rows = db.session.query(BestRate.base_id, BestRate.currency_id, BestRate.operation_type,
+                                BestRate.is_cash, BestRate.rate_id, BestRate.rate) \
+            .order_by(BestRate.is_cash, BestRate.base_id, BestRate.currency_id, BestRate.operation_type) \
+            .all()
+
+        markets: Dict[bool, List[Edge]] = defaultdict(list)
+        for base_id, currency_id, operation_type, is_cash, rate_id, rate in rows:
+            if base_id not in codes or currency_id not in codes or not rate or rate <= 0:
+                continue
+            rate = float(rate)
+            if operation_type == 's':
+                markets[bool(is_cash)].append(Edge(base_id, currency_id, math.log(rate), rate_id))
+            else:
+                markets[bool(is_cash)].append(Edge(currency_id, base_id, -math.log(rate), rate_id))
+
+        components = []
+        for is_cash, edges in markets.items():
+            components.extend(_Component(is_cash, nodes, component_edges)
+                              for nodes, component_edges in _split_components(edges))
+        return codes, components
+
+    def _find_anomaly(self, component: _Component, codes: Dict[int, str]) -> Optional[Anomaly]:
+        indexes = {node: i for i, node in enumerate(component.nodes)}
+        sources = [indexes[edge.source] for edge in component.edges]
+        targets = [indexes[edge.target] for edge in component.edges]
+        weights = [edge.weight for edge in component.edges]
+
+        cycle_edges = _find_negative_cycle(len(component.nodes), sources, targets, weights, self._TOLERANCE)
+        if not cycle_edges:
+            return None
+
+        edges = [component.edges[i] for i in cycle_edges]
+        weight = sum(edge.weight for edge in edges)
+        if weight > -self._TOLERANCE:
+            return None
+        cycle = [codes[edge.source] for edge in edges] + [codes[edges[0].source]]
+        return Anomaly(component.is_cash, cycle, [edge.rate_id for edge in edges],
+                       math.exp(-weight) - 1)
+
+
+def _split_components(edges: List[Edge]) -> List[Tuple[List[int], List[Edge]]]:
+    """Splits the edges into weakly connected components, a cycle never spans two of them."""
+    parents: Dict[int, int] = {}
+
+    def find(node: int) -> int:
+        parents.setdefault(node, node)
+        while parents[node] != node:
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+        return node
+
+    for edge in edges:
+        parents[find(edge.source)] = find(edge.target)
+
+    nodes_by_root: Dict[int, List[int]] = defaultdict(list)
+    for node in parents:
+        nodes_by_root[find(node)].append(node)
+    edges_by_root: Dict[int, List[Edge]] = defaultdict(list)
+    for edge in edges:
+        edges_by_root[find(edge.source)].append(edge)
+    return [(sorted(nodes), edges_by_root[root]) for root, nodes in nodes_by_root.items()]
+
+
+def _find_negative_cycle(nodes_count: int, sources: Sequence[int], targets: Sequence[int],
+                         weights: Sequence[float], tolerance: float) -> Optional[List[int]]:
+    sources, targets, weights = np.asarray(sources), np.asarray(targets), np.asarray(weights)
+    distances = np.zeros(nodes_count)
+    predecessors = np.full(nodes_count, -1)
+    for _ in range(nodes_count):
+        candidates = distances[sources] + weights
+        relaxed_edges = np.flatnonzero(candidates < distances[targets] - tolerance)
+        if not len(relaxed_edges):
+            return None
+        # NOTE: several edges may relax the same node, the shortest one wins
+        np.minimum.at(distances, targets[relaxed_edges], candidates[relaxed_edges])
+        winners = relaxed_edges[candidates[relaxed_edges] == distances[targets[relaxed_edges]]]
+        predecessors[targets[winners]] = winners
+        cycle = _find_predecessors_cycle(predecessors.tolist(), sources.tolist())
+        if cycle:
+            return cycle
+    return None
+
+
+def _find_predecessors_cycle(predecessors: List[int], sources: Sequence[int]) -> Optional[List[int]]:
+    """Returns the edges of a cycle of the shortest paths tree in the conversion order, if any.
+
+    A cycle of the tree is a negative one. It is looked for after every round, an O(V) walk, so
+    a cycle is usually found long before the |V| rounds which prove it.
+    """
+    # NOTE: the walk which visited a node first, a walk meeting itself went around a cycle
+    visited_by = [-1] * len(predecessors)
+    for start in range(len(predecessors)):
+        node = start
+        while node >= 0 and visited_by[node] < 0:
+            visited_by[node] = start
+            edge = predecessors[node]
+            node = sources[edge] if edge >= 0 else -1
+        if node < 0 or visited_by[node] != start:
+            continue
+
+        cycle, current = [], node
+        while True:
+            edge = predecessors[current]
+            cycle.append(edge)
+            current = sources[edge]
+            if current == node:
+                return cycle[::-1]
+    return None
+
+
+class AnomalyMonitor(LeaderElectedWorker):
+    """Checks the rates for arbitrage periodically and logs the new anomalies.
+
+    Like the ingestion, it runs only in the process holding the lock file.
+    """
+
+    def __init__(self, app: Flask, detector: ArbitrageDetector, interval: float, lock_path: Path):
+        super().__init__('rate-anomaly-monitor', lock_path)
+        self._app: Flask = app
+        self._detector: ArbitrageDetector = detector
+        self._interval: float = interval
+        self._reported: List[Anomaly] = []
+
+    def check(self) -> None:
+        with self._app.app_context():
+            anomalies = self._detector.get_anomalies()
+        for anomaly in anomalies:
+            if anomaly not in self._reported:
+                logger.warning('Arbitrage over %s (cash: %s) yields %.6f%%, rates: %s',
+                               ' -> '.join(anomaly.cycle), anomaly.is_cash, anomaly.profit * 100,
+                               anomaly.rate_ids)
+        self._reported = anomalies
+
+    def _lead(self) -> None:
+        self._run_periodically(self.check, self._interval, 'Failed to check the rates for arbitrage.')
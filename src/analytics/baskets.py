@@ -0,0 +1,214 @@
+import logging
+import math
+import threading
+from collections import defaultdict, deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from src.models import db, Basket, BasketComponent, Currency
+from src.cache import rate_store, RateSnapshot
+from src.cache.snapshot import RATE_SCALE, IS_CASH_FLAG, SELL_FLAG
+from src.enums import CurrencyStatuesInternal
+from src.invalidation import invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+
+class BasketValuation(NamedTuple):
+    basket_id: int
+    base_currency: str
+    # NOTE: None when a component currency has no rate to the base currency
+    value: Optional[float]
+    missing_currencies: List[str]
+    data_version: int
+
+
+class _BasketDefinitions(NamedTuple):
+    """Weights of all baskets as a sparse baskets x (currency, base currency) matrix.
+
+    Component i adds weights[i] units of currencies[i] to the basket rows[i].
+    """
+    basket_ids: List[int]
+    base_currencies: List[str]
+    rows: List[int]
+    currencies: List[str]
+    # NOTE: a deleted currency is still a part of the basket, it just has no price anymore
+    is_active: List[bool]
+    weights: List[float]
+
+
+class BasketValuator:
+    """Values all baskets at once from one rate snapshot.
+
+    A quote of a pair is the middle of its best non-cash buy and sell rates, a pair without rates is
+    quoted by the inverted quote of the reversed pair. A currency without a quote to the base
+    currency is priced by the cross rate through a reference currency, the reference prices of all
+    currencies are derived once per snapshot. The values are the product of the weights matrix and
+    the prices vector, vectorized with NumPy.
+
+    The valuations are kept until the snapshot or a basket changes.
+    """
+
+    def __init__(self):
+        self._lock: threading.Lock = threading.Lock()
+        self._definitions: Optional[_BasketDefinitions] = None
+        self._definitions_generations: Optional[Tuple[int, ...]] = None
+        self._valuations: Dict[int, BasketValuation] = {}
+        self._valuations_key: Optional[Tuple[int, Tuple[int, ...]]] = None
+
+    def get_valuation(self, basket_id: int) -> Optional[BasketValuation]:
+        return self.get_valuations().get(basket_id)
+
+    def get_valuations(self) -> Dict[int, BasketValuation]:
+        # NOTE: currencies are a part of the snapshot and of the definitions, their codes may change
+        generations = invalidation_bus.get_generations(Basket.__tablename__, Currency.__tablename__)
+        snapshot = rate_store.get_snapshot()
+        key = (snapshot.data_version, generations)
+        if key == self._valuations_key:
+            return self._valuations
+
+        with self._lock:
+            if key != self._valuations_key:
+                if generations != self._definitions_generations:
+                    self._definitions = self._load_definitions()
+                    self._definitions_generations = generations
+                self._valuations = self._value(self._definitions, snapshot)
+                self._valuations_key = key
+                logger.info('Valued %d baskets at data version %d.', len(self._valuations),
+                            snapshot.data_version)
+        return self._valuations
+
+    @staticmethod
+    def _load_definitions() -> _BasketDefinitions:
+        base_currency = db.aliased(Currency, name='base_currency')
+        component_currency = db.aliased(Currency, name='component_currency')
+        rows = db.session.query(Basket.id, base_currency.code, component_currency.code,
+                                component_currency.status, BasketComponent.weight) \
+            .join(base_currency, Basket.base_id == base_currency.id) \
+            .outerjoin(BasketComponent, BasketComponent.basket_id == Basket.id) \
+            .outerjoin(component_currency, BasketComponent.currency_id == component_currency.id) \
+            .order_by(Basket.id) \
+            .all()
+
+        definitions = _BasketDefinitions([], [], [], [], [], [])
+        for basket_id, base_code, currency_code, status, weight in rows:
+            if not definitions.basket_ids or definitions.basket_ids[-1] != basket_id:
+                definitions.basket_ids.append(basket_id)
+                definitions.base_currencies.append(base_code)
+            if weight is None:
+                continue
+            definitions.rows.append(len(definitions.basket_ids) - 1)
+            definitions.currencies.append(currency_code)
+            definitions.is_active.append(status == CurrencyStatuesInternal.active.value)
+            definitions.weights.append(float(weight))
+        return definitions
+
+    def _value(self, definitions: _BasketDefinitions, snapshot: RateSnapshot) -> Dict[int, BasketValuation]:
+        quotes = self._load_quotes(snapshot)
+        code_indexes = snapshot.code_indexes
+        reference_prices = self._get_reference_prices(quotes)
+        prices = []
+        for row, currency, is_active in zip(definitions.rows, definitions.currencies, definitions.is_active):
+            base_currency = definitions.base_currencies[row]
+            if not is_active:
+                prices.append(math.nan)
+                continue
+            if currency == base_currency:
+                prices.append(1.0)
+                continue
+
+            currency_index, base_index = code_indexes.get(currency), code_indexes.get(base_currency)
+            price = quotes.get(currency_index, {}).get(base_index)
+            if price is None:
+                reference, currency_price = reference_prices.get(currency_index, (None, math.nan))
+                base_reference, base_price = reference_prices.get(base_index, (None, math.nan))
+                price = currency_price / base_price if reference == base_reference else math.nan
+            prices.append(price)
+
+        values = self._multiply(definitions, prices)
+        missing_currencies = defaultdict(list)
+        for row, currency, price in zip(definitions.rows, definitions.currencies, prices):
+            if math.isnan(price):
+                missing_currencies[row].append(currency)
+
+        return {
+            basket_id: BasketValuation(
+                basket_id=basket_id,
+                base_currency=definitions.base_currencies[row],
+                value=None if math.isnan(values[row]) else values[row],
+                missing_currencies=missing_currencies[row],
+                data_version=snapshot.data_version,
+            )
+            for row, basket_id in enumerate(definitions.basket_ids)
+        }
+
+    @staticmethod
+    def _multiply(definitions: _BasketDefinitions, prices: List[float]) -> List[float]:
+        """Returns the values of the baskets, NaN for the ones with a component without a price."""
+        products = np.asarray(definitions.weights) * np.asarray(prices)
+        # NOTE: a sparse matrix by vector product, the products are summed up per basket row
+        return np.bincount(np.asarray(definitions.rows, dtype=np.int64), weights=products,
+                           minlength=len(definitions.basket_ids)).tolist()
+
+    @classmethod
+    def _load_quotes(cls, snapshot: RateSnapshot) -> Dict[int, Dict[int, float]]:
+        """Returns the middle prices of the currencies by their base currencies, both ways."""
+        pairs, prices = cls._get_middle_prices(snapshot)
+
+        quotes: Dict[int, Dict[int, float]] = defaultdict(dict)
+        codes_count = len(snapshot.codes)
+        for pair, price in zip(pairs, prices):
+            if price <= 0:
+                continue
+            currency, base = divmod(pair, codes_count)
+            quotes[currency][base] = price
+            # NOTE: a direct quote of the reversed pair is preferred to the inverted one
+            quotes[base].setdefault(currency, 1 / price)
+        return quotes
+
+    @staticmethod
+    def _get_middle_prices(snapshot: RateSnapshot) -> Tuple[List[int], List[float]]:
+        flags = np.frombuffer(snapshot.flags, dtype=memoryview(snapshot.flags).format)
+        non_cash = (flags & IS_CASH_FLAG) == 0
+        is_sell = (flags[non_cash] & SELL_FLAG) != 0
+        currencies = np.frombuffer(snapshot.currency_indexes,
+                                   dtype=memoryview(snapshot.currency_indexes).format)[non_cash]
+        bases = np.frombuffer(snapshot.base_indexes, dtype=memoryview(snapshot.base_indexes).format)[non_cash]
+        rates = np.frombuffer(snapshot.scaled_rates,
+                              dtype=memoryview(snapshot.scaled_rates).format)[non_cash] / RATE_SCALE
+
+        pairs, pair_indexes = np.unique(currencies.astype(np.int64) * len(snapshot.codes) + bases,
+                                        return_inverse=True)
+        best_buy = np.full(len(pairs), -np.inf)
+        np.maximum.at(best_buy, pair_indexes[~is_sell], rates[~is_sell])
+        best_sell = np.full(len(pairs), np.inf)
+        np.minimum.at(best_sell, pair_indexes[is_sell], rates[is_sell])
+
+        has_buy, has_sell = np.isfinite(best_buy), np.isfinite(best_sell)
+        with np.errstate(invalid='ignore'):
+            prices = np.where(has_buy & has_sell, (best_buy + best_sell) / 2,
+                              np.where(has_buy, best_buy, best_sell))
+        return pairs.tolist(), prices.tolist()
+
+    @staticmethod
+    def _get_reference_prices(quotes: Dict[int, Dict[int, float]]) -> Dict[int, Tuple[int, float]]:
+        """Returns the reference currency of every currency and its price in that currency.
+
+        Currencies connected by quotes share the reference currency, their cross rate is the ratio
+        of their reference prices. Every price is derived through the fewest quotes.
+        """
+        reference_prices: Dict[int, Tuple[int, float]] = {}
+        for reference in quotes:
+            if reference in reference_prices:
+                continue
+            reference_prices[reference] = (reference, 1.0)
+            queue = deque([reference])
+            while queue:
+                pivot = queue.popleft()
+                pivot_price = reference_prices[pivot][1]
+                for currency in quotes[pivot]:
+                    if currency not in reference_prices:
+                        reference_prices[currency] = (reference, quotes[currency][pivot] * pivot_price)
+                        queue.append(currency)
+        return reference_prices
@@ -1,14 +1,31 @@
 from flask import Blueprint
+from .views.change_view import ChangesView
+from .views.basket_view import BasketsView, BasketView, BasketValueView
+from .views.debug_view import SlowQueriesView, MemoryProfileView
 from .views.currency_view import CurrenciesView, CurrencyView
-from .views.rate_view import RatesView, RateView
+from .views.rate_view import (RatesView, RateView, BestRatesView, RatesOhlcView,
+                              RatesStreamView, RatesAnomaliesView)
 
 currencies_view = CurrenciesView().as_view('currencies_view')
 currency_view = CurrencyView().as_view('currency_view')
 rate_view = RateView().as_view('rate_view')
 rates_view = RatesView().as_view('rates_view')
+best_rates_view = BestRatesView().as_view('best_rates_view')
+rates_ohlc_view = RatesOhlcView().as_view('rates_ohlc_view')
+rates_stream_view = RatesStreamView().as_view('rates_stream_view')
+rates_anomalies_view = RatesAnomaliesView().as_view('rates_anomalies_view')
+changes_view = ChangesView().as_view('changes_view')
+baskets_view = BasketsView().as_view('baskets_view')
+basket_view = BasketView().as_view('basket_view')
+basket_value_view = BasketValueView().as_view('basket_value_view')
+slow_queries_view = SlowQueriesView().as_view('slow_queries_view')
+memory_profile_view = MemoryProfileView().as_view('memory_profile_view')
 
 rate_api = Blueprint('rate_api', __name__, url_prefix='/api/v1')
 currency_api = Blueprint('currency_api', __name__, url_prefix='/api/v1')
+change_api = Blueprint('change_api', __name__, url_prefix='/api/v1')
+basket_api = Blueprint('basket_api', __name__, url_prefix='/api/v1')
+debug_api = Blueprint('debug_api', __name__, url_prefix='/api/v1/debug')
 
 # currencies
 currency_api.add_url_rule('/currencies', view_func=currencies_view)
@@ -16,3 +33,16 @@ currency_api.add_url_rule('/currencies/<int:record_id>', view_func=currency_view
 # rates
 rate_api.add_url_rule('/rates', view_func=rates_view)
 rate_api.add_url_rule('/rates/<int:record_id>', view_func=rate_view)
+rate_api.add_url_rule('/rates/best', view_func=best_rates_view)
+rate_api.add_url_rule('/rates/ohlc', view_func=rates_ohlc_view)
+rate_api.add_url_rule('/rates/stream', view_func=rates_stream_view)
+rate_api.add_url_rule('/rates/anomalies', view_func=rates_anomalies_view)
+# changes
+change_api.add_url_rule('/changes', view_func=changes_view)
+# baskets
+basket_api.add_url_rule('/baskets', view_func=baskets_view)
+basket_api.add_url_rule('/baskets/<int:record_id>', view_func=basket_view)
+basket_api.add_url_rule('/baskets/<int:record_id>/value', view_func=basket_value_view)
+# debug
+debug_api.add_url_rule('/slow-queries', view_func=slow_queries_view)
+debug_api.add_url_rule('/memory', view_func=memory_profile_view)
@@ -0,0 +1,141 @@
+import logging
+from http import HTTPStatus
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import abort
+from marshmallow import ValidationError
+
+from .basic_service import BaseService
+from src.structured_logging import get_sampled_logger
+from src.models import db, Basket, BasketComponent, Currency
+from src.analytics import basket_valuator
+from src.enums import BasketExternalReprFieldNames as BasketExternalRepr
+from src.enums import BasketInternalReprFieldNames as BasketInternalRepr
+from src.enums import ResponseStatuses, ResponseFields, CurrencyStatuesInternal
+from src.schemas.basket_schema import BasketSchema, BasketValueSchema
+from src.exceptions import CreateError, DeleteError, VersionMismatchError
+
+logger = logging.getLogger(__name__)
+# NOTE: records of the hot read paths, they are sampled
+read_logger = get_sampled_logger(f'{__name__}.reads')
+
+
+class BasketService(BaseService):
+    _BASKET_NOT_FOUND_MSG: str = 'Basket with id: {} not found'
+    _CURRENCY_NOT_FOUND_MSG: str = 'Currency with code: {} not found'
+
+    def __init__(self):
+        self._basket_schema: BasketSchema = BasketSchema()
+        self._baskets_schema: BasketSchema = BasketSchema(many=True)
+        self._basket_value_schema: BasketValueSchema = BasketValueSchema()
+
+    def get_baskets(self) -> Tuple[Dict[str, Any], int]:
+        read_logger.info('Getting all baskets...')
+        baskets = Basket.query.order_by(Basket.id).all()
+        response = {
+            ResponseFields.next_page_link.value: None,
+            **self._baskets_schema.dump(self._get_baskets_data(baskets)),
+        }
+        return response, HTTPStatus.OK
+
+    def get_basket_by_id(self, record_id: int) -> Tuple[Dict[str, Any], int]:
+        read_logger.info('Getting basket information by id: %s...', record_id)
+        basket = Basket.get(record_id)
+        if not basket:
+            abort(HTTPStatus.NOT_FOUND, self._BASKET_NOT_FOUND_MSG.format(record_id))
+        return self._basket_schema.dump(self._get_baskets_data([basket])[0]), HTTPStatus.OK
+
+    def get_basket_value(self, record_id: int) -> Tuple[Dict[str, Any], int]:
+        read_logger.info('Getting value of basket with id: %s...', record_id)
+        valuation = basket_valuator.get_valuation(record_id)
+        if not valuation:
+            abort(HTTPStatus.NOT_FOUND, self._BASKET_NOT_FOUND_MSG.format(record_id))
+        return self._basket_value_schema.dump(valuation), HTTPStatus.OK
+
+    def create_basket(self, data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        logger.info('Creating a new basket...')
+        try:
+            basket_data = self._basket_schema.load(data)
+        except ValidationError as e:
+            logger.error('Invalid request body was provided! Error: %s', e)
+            abort(HTTPStatus.BAD_REQUEST, e.messages)
+
+        components = basket_data[BasketInternalRepr.components.value]
+        base_code = basket_data[BasketInternalRepr.base_currency.value]
+        currency_ids = self._get_currency_ids(
+            [base_code] + [component[BasketInternalRepr.currency.value] for component in components]
+        )
+        try:
+            new_basket = Basket.create(
+                name=basket_data[BasketInternalRepr.name_.value],
+                base_id=currency_ids[base_code],
+                components=[
+                    BasketComponent(currency_id=currency_ids[component[BasketInternalRepr.currency.value]],
+                                    weight=component[BasketInternalRepr.weight.value])
+                    for component in components
+                ],
+            )
+        except CreateError as e:
+            abort(HTTPStatus.UNPROCESSABLE_ENTITY, str(e))
+
+        response = {
+            ResponseFields.status.value: ResponseStatuses.created.value,
+            BasketExternalRepr.id.value: new_basket.id,
+        }
+        return response, HTTPStatus.CREATED
+
+    def delete_basket(self, record_id: int,
+                      expected_version: Optional[int] = None) -> Tuple[Dict[str, Any], int]:
+        logger.info('Deleting basket with id: %s...', record_id)
+        basket = Basket.get(record_id)
+        if not basket:
+            abort(HTTPStatus.NOT_FOUND, self._BASKET_NOT_FOUND_MSG.format(record_id))
+        try:
+            basket.hard_delete(expected_version)
+        except VersionMismatchError as e:
+            abort(HTTPStatus.PRECONDITION_FAILED, str(e))
+        except DeleteError as e:
+            abort(HTTPStatus.CONFLICT, e.reason)
+
+        return {}, HTTPStatus.NO_CONTENT
+
+    def get_basket_records(self, ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Returns the external representations of the existing baskets by their ids."""
+        if not ids:
+            return {}
+        baskets = Basket.query.filter(Basket.id.in_(ids)).all()
+        return {basket_data[BasketInternalRepr.id.value]: self._basket_schema.dump(basket_data)
+                for basket_data in self._get_baskets_data(baskets)}
+
+    def _get_currency_ids(self, codes: List[str]) -> Dict[str, int]:
+        currency_ids = dict(db.session.query(Currency.code, Currency.id)
+                            .filter(Currency.code.in_(codes),
+                                    Currency.status == CurrencyStatuesInternal.active.value)
+                            .all())
+        for code in codes:
+            if code not in currency_ids:
+                abort(HTTPStatus.BAD_REQUEST, self._CURRENCY_NOT_FOUND_MSG.format(code))
+        return currency_ids
+
+    @staticmethod
+    def _get_baskets_data(baskets: Iterable[Basket]) -> List[Dict[str, Any]]:
+        # NOTE: deleted currencies keep their codes, so they are shown in the definitions as well
+        codes = dict(db.session.query(Currency.id, Currency.code).all())
+        return [
+            {
+                BasketInternalRepr.id.value: basket.id,
+                BasketInternalRepr.name_.value: basket.name,
+                BasketInternalRepr.base_currency.value: codes.get(basket.base_id),
+                BasketInternalRepr.components.value: [
+                    {
+                        BasketInternalRepr.currency.value: codes.get(component.currency_id),
+                        BasketInternalRepr.weight.value: component.weight,
+                    }
+                    for component in basket.components
+                ],
+                BasketInternalRepr.created.value: basket.created,
+                BasketInternalRepr.updated.value: basket.updated,
+                BasketInternalRepr.version.value: basket.version,
+            }
+            for basket in baskets
+        ]
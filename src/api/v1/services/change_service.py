@@ -0,0 +1,126 @@
+import logging
+from http import HTTPStatus
+from typing import Dict, Any, Tuple, List, Iterable
+
+from flask import abort, url_for
+from marshmallow import ValidationError
+from werkzeug.datastructures import MultiDict
+
+from .basic_service import BaseService
+from .basket_service import BasketService
+from src.structured_logging import get_sampled_logger
+from src.models import db, ChangeLog, Rate, Currency, Basket
+from src.enums import ChangeInternalReprFieldNames as ChangeInternalRepr
+from src.enums import ChangeExternalReprFieldNames as ChangeExternalRepr
+from src.enums import RateInternalReprFieldFieldNames as RateInternalRepr
+from src.enums import ChangeOperationsInternal, ResponseFields
+from src.schemas.change_schema import ChangesArgsSchema, ChangeSchema
+from src.schemas.currency_schema import CurrencySchema
+from src.schemas.rate_schema import RateSchema
+
+logger = logging.getLogger(__name__)
+# NOTE: records of the hot read paths, they are sampled
+read_logger = get_sampled_logger(f'{__name__}.reads')
+
+
+class ChangeService(BaseService):
+    _RATES_TABLE: str = 'rates'
+    _CURRENCIES_TABLE: str = 'currencies'
+    _BASKETS_TABLE: str = 'baskets'
+    _EXTERNAL_TABLE_NAMES: Dict[str, str] = {
+        Rate.__tablename__: _RATES_TABLE,
+        Currency.__tablename__: _CURRENCIES_TABLE,
+        Basket.__tablename__: _BASKETS_TABLE,
+    }
+
+    def __init__(self):
+        self._changes_args_schema: ChangesArgsSchema = ChangesArgsSchema()
+        self._changes_schema: ChangeSchema = ChangeSchema(many=True)
+        self._currency_schema: CurrencySchema = CurrencySchema()
+        self._rate_schema: RateSchema = RateSchema()
+        self._basket_service: BasketService = BasketService()
+
+    def get_changes(self, request_args: MultiDict) -> Tuple[Dict[str, Any], int]:
+        read_logger.info('Getting changes...')
+        try:
+            args = self._changes_args_schema.load(request_args)
+        except ValidationError as e:
+            logger.error('Invalid request args were provided! Error: %s', e)
+            abort(HTTPStatus.BAD_REQUEST, e.messages)
+        since = args[ChangeInternalRepr.since.value]
+        limit = args[ChangeInternalRepr.limit.value]
+
+        entries = ChangeLog.query \
+            .filter(ChangeLog.seq > since) \
+            .order_by(ChangeLog.seq) \
+            .limit(limit) \
+            .all()
+        last_seq = entries[-1].seq if entries else since
+
+        # NOTE: a page may contain several entries of a record until the log is compacted,
+        #  the latest one is enough as the current state of the record is returned anyway
+        latest_entries = {(entry.table_name, entry.record_id): entry for entry in entries}
+        changes = self._get_changes(sorted(latest_entries.values(), key=lambda entry: entry.seq))
+
+        next_page_link = None
+        if len(entries) == limit:
+            next_page_link = url_for('change_api.changes_view', since=last_seq, limit=limit)
+        response = {
+            ResponseFields.next_page_link.value: next_page_link,
+            ChangeExternalRepr.last_seq.value: last_seq,
+            **self._changes_schema.dump(changes),
+        }
+        return response, HTTPStatus.OK
+
+    def _get_changes(self, entries: List[ChangeLog]) -> List[Dict[str, Any]]:
+        ids_to_load = {Rate.__tablename__: set(), Currency.__tablename__: set(), Basket.__tablename__: set()}
+        for entry in entries:
+            if entry.operation != ChangeOperationsInternal.deleted.value:
+                ids_to_load.setdefault(entry.table_name, set()).add(entry.record_id)
+
+        records = {
+            Rate.__tablename__: self._get_rate_records(ids_to_load[Rate.__tablename__]),
+            Currency.__tablename__: self._get_currency_records(ids_to_load[Currency.__tablename__]),
+            Basket.__tablename__: self._basket_service.get_basket_records(ids_to_load[Basket.__tablename__]),
+        }
+        return [
+            {
+                ChangeInternalRepr.seq.value: entry.seq,
+                ChangeInternalRepr.table.value: self._EXTERNAL_TABLE_NAMES.get(entry.table_name,
+                                                                               entry.table_name),
+                ChangeInternalRepr.record_id.value: entry.record_id,
+                ChangeInternalRepr.operation.value: entry.operation,
+                ChangeInternalRepr.record.value: records.get(entry.table_name, {}).get(entry.record_id),
+            }
+            for entry in entries
+        ]
+
+    def _get_currency_records(self, ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        if not ids:
+            return {}
+        currencies = Currency.query.filter(Currency.id.in_(ids)).all()
+        return {currency.id: self._currency_schema.dump(currency) for currency in currencies}
+
+    def _get_rate_records(self, ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        if not ids:
+            return {}
+        base_currency = db.aliased(Currency, name='base_currency')
+        rates_info = db.session.query(Rate.id, Rate.rate, Rate.operation_type, Rate.is_cash,
+                                      Currency.code, base_currency.code) \
+            .join(Currency, Rate.currency_id == Currency.id) \
+            .join(base_currency, Rate.base_id == base_currency.id) \
+            .filter(Rate.id.in_(ids)) \
+            .all()
+
+        records = {}
+        for rate_id, rate, operation_type, is_cash, currency_code, base_currency_code in rates_info:
+            rate_data = {
+                RateInternalRepr.id.value: rate_id,
+                RateInternalRepr.currency.value: currency_code,
+                RateInternalRepr.base_currency.value: base_currency_code,
+                RateInternalRepr.rate.value: rate,
+                RateInternalRepr.operation_type.value: operation_type,
+                RateInternalRepr.is_cash.value: is_cash,
+            }
+            records[rate_id] = self._rate_schema.dump(rate_data)
+        return records
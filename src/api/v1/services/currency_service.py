@@ -1,20 +1,23 @@
 import logging
 from http import HTTPStatus
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple
 
 from flask import abort
 from marshmallow import ValidationError
 
 from .basic_service import BaseService
-from src.models import Currency
+from src.structured_logging import get_sampled_logger
+from src.models import db, Currency, currency_search_index
 from src.enums import CurrencyExternalReprFieldNames as CurrExternalRepr
 from src.enums import CurrencyInternalReprFieldNames as CurrInternalRepr
 from src.enums import ResponseStatuses, CurrencyStatuesInternal, ResponseFields
-from src.schemas.currency_schema import CurrencySchema, CurrencyDetailedSchema
-from src.exceptions import UpdateError, DeleteError, CreateError
+from src.schemas.currency_schema import CurrencySchema, CurrencyDetailedSchema, CurrencySearchArgsSchema
+from src.exceptions import UpdateError, DeleteError, CreateError, DuplicateError, VersionMismatchError
 from werkzeug.datastructures import MultiDict
 
 logger = logging.getLogger(__name__)
+# NOTE: records of the hot read paths, they are sampled
+read_logger = get_sampled_logger(f'{__name__}.reads')
 
 
 class CurrencyService(BaseService):
@@ -22,19 +25,26 @@ class CurrencyService(BaseService):
         CurrExternalRepr.code.value,
         CurrExternalRepr.name_.value,
     )
+    # NOTE: reads select only the dumped columns, plain rows are not tracked by the session
+    _LIST_COLUMNS: Tuple[db.Column, ...] = (Currency.id, Currency.status, Currency.code, Currency.name,
+                                            Currency.version)
+    _DETAILS_COLUMNS: Tuple[db.Column, ...] = _LIST_COLUMNS + (Currency.created, Currency.updated)
 
     def __init__(self):
         self._currency_schema: CurrencySchema = CurrencySchema()
         self._currencies_schema: CurrencySchema = CurrencySchema(many=True)
         self._currency_details_schema: CurrencyDetailedSchema = CurrencyDetailedSchema()
+        self._search_args_schema: CurrencySearchArgsSchema = CurrencySearchArgsSchema()
 
     def get_currencies(self, request_args: MultiDict) -> Tuple[Dict[str, Any], int]:
-        logger.info('Getting all currencies...')
-        if len(request_args):
+        read_logger.info('Getting all currencies...')
+        if CurrExternalRepr.query.value in request_args:
+            currencies = self._search_currencies(request_args)
+        elif len(request_args):
             currencies = self._get_currencies_by_args(request_args)
         else:
             currencies = Currency.get_by(status=CurrencyStatuesInternal.active.value)
-        result = self._currencies_schema.dump(currencies) if currencies else []
+        result = self._currencies_schema.dump(currencies.with_entities(*self._LIST_COLUMNS))
 
         response = {
             ResponseFields.next_page_link.value: None,
@@ -43,9 +53,10 @@ class CurrencyService(BaseService):
         return response, HTTPStatus.OK
 
     def get_currency_by_id(self, record_id: int) -> Tuple[Dict[str, Any], int]:
-        logger.info(f'Getting currency information by id: {record_id}...')
-        currency = Currency.get_by_first_or_404(id=record_id,
-                                                status=CurrencyStatuesInternal.active.value)
+        read_logger.info('Getting currency information by id: %s...', record_id)
+        currency = Currency.get_by(id=record_id, status=CurrencyStatuesInternal.active.value) \
+            .with_entities(*self._DETAILS_COLUMNS) \
+            .first_or_404()
         response = self._currency_details_schema.dump(currency)
         return response, HTTPStatus.OK
 
@@ -54,20 +65,13 @@ class CurrencyService(BaseService):
         try:
             dict_currency_repr = self._currency_schema.load(data)
         except ValidationError as e:
-            logger.error(f'Invalid request body was provided! Error: {e}')
+            logger.error('Invalid request body was provided! Error: %s', e)
             abort(HTTPStatus.BAD_REQUEST, e.messages)
 
-        filtering_rules = {
-            CurrInternalRepr.code.value: dict_currency_repr[CurrExternalRepr.code.value],
-            CurrInternalRepr.status.value: CurrencyStatuesInternal.active.value,
-        }
-        duplicate = Currency.get_by(**filtering_rules).first()
-        if duplicate:
-            msg = f'Currency with the same code already exists. Duplicated ID: {duplicate.id}'
-            abort(HTTPStatus.CONFLICT, msg)
-
         try:
             new_currency = Currency.create(**dict_currency_repr)
+        except DuplicateError:
+            self._abort_duplicated_code(dict_currency_repr[CurrInternalRepr.code.value])
         except CreateError as e:
             abort(HTTPStatus.UNPROCESSABLE_ENTITY, str(e))
 
@@ -77,8 +81,9 @@ class CurrencyService(BaseService):
         }
         return response, HTTPStatus.CREATED
 
-    def update_currency(self, record_id: int, data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
-        logger.info(f'Updating currency with id: {record_id}...')
+    def update_currency(self, record_id: int, data: Dict[str, Any],
+                        expected_version: Optional[int] = None) -> Tuple[Dict[str, Any], int]:
+        logger.info('Updating currency with id: %s...', record_id)
         currency_to_update: Currency = Currency.get_by(
             id=record_id,
             status=CurrencyStatuesInternal.active.value
@@ -86,22 +91,21 @@ class CurrencyService(BaseService):
         if not currency_to_update:
             abort(HTTPStatus.NOT_FOUND, f'Currency with id: {record_id} does not exist.')
 
-        duplicate = Currency.get_by(code=data.get(CurrExternalRepr.code.value)).first()
-        if duplicate and duplicate.id != record_id:
-            msg = f'Currency with the same code already exists. Duplicated ID: {duplicate.id}'
-            abort(HTTPStatus.CONFLICT, msg)
-
         if CurrExternalRepr.id.value in data:
             abort(HTTPStatus.BAD_REQUEST, 'The \'id\' field is not allowed to be updated.')
 
         try:
             dumped_currency_data = self._currency_schema.load(data)
         except ValidationError as e:
-            logger.error(f'Invalid request body was provided! Error: {e}')
+            logger.error('Invalid request body was provided! Error: %s', e)
             abort(HTTPStatus.BAD_REQUEST, e.messages)
 
         try:
-            currency_to_update.update(dumped_currency_data)
+            currency_to_update.update(dumped_currency_data, expected_version)
+        except VersionMismatchError as e:
+            abort(HTTPStatus.PRECONDITION_FAILED, str(e))
+        except DuplicateError:
+            self._abort_duplicated_code(dumped_currency_data[CurrInternalRepr.code.value])
         except UpdateError as e:
             abort(HTTPStatus.BAD_REQUEST, e.reason)
 
@@ -112,18 +116,29 @@ class CurrencyService(BaseService):
         return context, HTTPStatus.OK
 
     @staticmethod
-    def delete_currency(record_id: int) -> Tuple[Dict[str, Any], int]:
+    def delete_currency(record_id: int,
+                        expected_version: Optional[int] = None) -> Tuple[Dict[str, Any], int]:
         # todo: delete all relevant rates
-        logger.info(f'Deleting currency with id: {record_id}...')
+        logger.info('Deleting currency with id: %s...', record_id)
         currency = Currency.get_by(id=record_id,
                                    status=CurrencyStatuesInternal.active.value).first_or_404()
         try:
-            currency.soft_delete()
+            currency.soft_delete(expected_version)
+        except VersionMismatchError as e:
+            abort(HTTPStatus.PRECONDITION_FAILED, str(e))
         except DeleteError as e:
             abort(HTTPStatus.CONFLICT, e.reason)
 
         return {}, HTTPStatus.NO_CONTENT
 
+    @staticmethod
+    def _abort_duplicated_code(code: str) -> None:
+        # NOTE: the conflict itself is detected by the unique index, this lookup is only for the message
+        duplicate = Currency.get_by(code=code, status=CurrencyStatuesInternal.active.value).first()
+        duplicate_id = duplicate.id if duplicate else None
+        msg = f'Currency with the same code already exists. Duplicated ID: {duplicate_id}'
+        abort(HTTPStatus.CONFLICT, msg)
+
     def _get_currencies_by_args(self, request_args: MultiDict) -> Currency:
         validated_args = self._validate_args(request_args, self._ALLOWED_GET_PARAMS)
 
@@ -137,3 +152,14 @@ class CurrencyService(BaseService):
             CurrExternalRepr.status.value: CurrencyStatuesInternal.active.value
         })
         return Currency.get_by(**params)
+
+    def _search_currencies(self, request_args: MultiDict) -> Currency:
+        try:
+            args = self._search_args_schema.load(request_args)
+        except ValidationError as e:
+            logger.error('Invalid request args were provided! Error: %s', e)
+            abort(HTTPStatus.BAD_REQUEST, e.messages)
+
+        # NOTE: ranked by relevance, the most relevant first
+        return currency_search_index.search(args[CurrInternalRepr.query.value],
+                                            args[CurrInternalRepr.limit.value])
@@ -0,0 +1,28 @@
+import logging
+from http import HTTPStatus
+from typing import Any, Dict, Tuple
+
+from flask import abort
+
+from .basic_service import BaseService
+from src.slow_queries import slow_query_detector
+from src.memory_profiler import memory_profiler
+from src.schemas.debug_schema import SlowQuerySchema, MemoryProfileSchema
+
+logger = logging.getLogger(__name__)
+
+
+class DebugService(BaseService):
+
+    def __init__(self):
+        self._slow_queries_schema: SlowQuerySchema = SlowQuerySchema(many=True)
+        self._memory_profile_schema: MemoryProfileSchema = MemoryProfileSchema()
+
+    def get_slow_queries(self) -> Tuple[Dict[str, Any], int]:
+        return self._slow_queries_schema.dump(slow_query_detector.get_records()), HTTPStatus.OK
+
+    def get_memory_profile(self) -> Tuple[Dict[str, Any], int]:
+        if not memory_profiler.is_enabled:
+            abort(HTTPStatus.NOT_FOUND, 'Memory profiling is not enabled.')
+        logger.info('Taking a memory snapshot...')
+        return self._memory_profile_schema.dump(memory_profiler.get_profile()), HTTPStatus.OK
@@ -1,25 +1,52 @@
 import copy
+import datetime
 import logging
 from http import HTTPStatus
-from typing import Dict, Any, Tuple, List, Optional
+from typing import Dict, Any, Tuple, List, NamedTuple, Optional, Mapping
 
 from flask import abort
 from marshmallow import ValidationError
 from sqlalchemy.engine.row import Row
 
 from .basic_service import BaseService
-from src.models import db, Rate, Currency
+from src.structured_logging import get_sampled_logger
+from src.models import db, Rate, Currency, BestRate, RateCandle, RateCompactionState
 from src.enums import RateExternalReprFieldFieldNames as RateExternalRepr
 from src.enums import RateInternalReprFieldFieldNames as RateInternalRepr
-from src.enums import ResponseStatuses, ResponseFields, CurrencyStatuesInternal
-from src.exceptions import UpdateError, DeleteError, CreateError
+from src.enums import CurrencyInternalReprFieldNames as CurrInternalRepr
+from src.enums import ResponseStatuses, ResponseFields, CurrencyStatuesInternal, RateOhlcIntervals
+from src.enums import RateEventTypes
+from src.enums import RateCandleFieldNames as CandleRepr
+from src.enums import MemoryProfileStages
+from src.events import rate_events, Subscription, encode_event
+from src.cache import rate_store
+from src.memory_profiler import memory_profiler
+from src.analytics import arbitrage_detector
+from src.coalescer import WriteCoalescer
+from src.exceptions import UpdateError, DeleteError, CreateError, QueueFullError, VersionMismatchError
 from werkzeug.datastructures import MultiDict
 from src.schemas.rate_schema import (
     RateSchema, RateDetailsExternalSchema, CreateRateExternalSchema, CreateRateInternalSchema,
-    UpdateRateExternalSchema
+    UpdateRateExternalSchema, BestRateSchema, BestRateArgsSchema, OhlcArgsSchema, CandleSchema,
+    RateFilterArgsSchema, AnomalySchema
 )
 
 logger = logging.getLogger(__name__)
+# NOTE: records of the hot read paths, they are sampled
+read_logger = get_sampled_logger(f'{__name__}.reads')
+
+
+class _OhlcRow(NamedTuple):
+    bucket: str
+    operation_type: str
+    open: Any
+    high: Any
+    low: Any
+    close: Any
+    ticks: int
+    # NOTE: creation times of the open and the close rates
+    opened: datetime.datetime
+    closed: datetime.datetime
 
 
 class RateService(BaseService):
@@ -31,7 +58,25 @@ class RateService(BaseService):
         RateExternalRepr.rate.value,
         RateExternalRepr.is_cash.value,
         RateExternalRepr.operation_type.value,
+        RateExternalRepr.min_rate.value,
+        RateExternalRepr.max_rate.value,
+    )
+    # NOTE: every bucket is rendered into the same "%Y-%m-%d %H:%M:%S" shape
+    _OHLC_BUCKET_FORMATS: Dict[str, str] = {
+        RateOhlcIntervals.minute.value: '%Y-%m-%d %H:%M:00',
+        RateOhlcIntervals.hour.value: '%Y-%m-%d %H:00:00',
+        RateOhlcIntervals.day.value: '%Y-%m-%d 00:00:00',
+    }
+    _OHLC_BUCKET_PARSE_FORMAT: str = '%Y-%m-%d %H:%M:%S'
+    _RATE_PLACES: int = 5
+    _STREAM_FILTER_PARAMS: Tuple[str, ...] = (
+        RateExternalRepr.currency.value,
+        RateExternalRepr.base_currency.value,
     )
+    _OPERATION_TYPE_CANDLE_FIELDS: Dict[str, str] = {
+        'b': CandleRepr.buy.value,
+        's': CandleRepr.sell.value,
+    }
 
     def __init__(self):
         self._rate_schema: RateSchema = RateSchema()
@@ -40,10 +85,21 @@ class RateService(BaseService):
         self._create_rate_external_schema: CreateRateExternalSchema = CreateRateExternalSchema()
         self._create_rate_internal_schema: CreateRateInternalSchema = CreateRateInternalSchema()
         self._update_rate_external_schema: UpdateRateExternalSchema = UpdateRateExternalSchema()
+        self._best_rates_schema: BestRateSchema = BestRateSchema(many=True)
+        self._best_rate_args_schema: BestRateArgsSchema = BestRateArgsSchema()
+        self._rate_filter_args_schema: RateFilterArgsSchema = RateFilterArgsSchema()
+        self._ohlc_args_schema: OhlcArgsSchema = OhlcArgsSchema()
+        self._candles_schema: CandleSchema = CandleSchema(many=True)
+        self._anomalies_schema: AnomalySchema = AnomalySchema(many=True)
 
     def get_rates(self, request_args: MultiDict) -> Tuple[Dict[str, Any], int]:
-        logger.info('Getting rates...')
-        rates = self._get_rates_by_args(request_args) if len(request_args) else self._get_all_rates()
+        read_logger.info('Getting rates...')
+        if rate_store.is_enabled:
+            rates = self._get_rates_from_store(request_args)
+        elif len(request_args):
+            rates = self._get_rates_by_args(request_args)
+        else:
+            rates = self._get_all_rates()
 
         response = {
             ResponseFields.next_page_link.value: None,
@@ -52,33 +108,127 @@ class RateService(BaseService):
         return response, HTTPStatus.OK
 
     def get_rate_by_id(self, record_id: int) -> Tuple[Dict[str, Any], int]:
-        logger.info(f'Getting rate information by id: {record_id}...')
+        read_logger.info('Getting rate information by id: %s...', record_id)
 
         record_info = self._get_joined_rate_and_currencies_by_rate_id(record_id)
         if not record_info:
             abort(HTTPStatus.NOT_FOUND, self._RATE_NOT_FOUND_MSG.format(record_id))
 
-        rate, currency_code, base_currency_code = record_info
         # NOTE: "updated" not used
         rate_data = {
-            RateInternalRepr.currency.value: currency_code,
-            RateInternalRepr.base_currency.value: base_currency_code,
-            RateInternalRepr.id.value: rate.id,
-            RateInternalRepr.rate.value: rate.rate,
-            RateInternalRepr.operation_type.value: rate.operation_type,
-            RateInternalRepr.is_cash.value: rate.is_cash,
-            RateInternalRepr.created.value: rate.created,
+            RateInternalRepr.currency.value: {
+                CurrInternalRepr.id.value: record_info.currency_id,
+                CurrInternalRepr.code.value: record_info.currency_code,
+            },
+            RateInternalRepr.base_currency.value: {
+                CurrInternalRepr.id.value: record_info.base_currency_id,
+                CurrInternalRepr.code.value: record_info.base_currency_code,
+            },
+            RateInternalRepr.id.value: record_info.id,
+            RateInternalRepr.rate.value: record_info.rate,
+            RateInternalRepr.operation_type.value: record_info.operation_type,
+            RateInternalRepr.is_cash.value: record_info.is_cash,
+            RateInternalRepr.created.value: record_info.created,
+            RateInternalRepr.version.value: record_info.version,
         }
+        # NOTE: makes not yet flushed asynchronous writes visible
+        pending_changes = rate_write_coalescer.get_pending(record_id)
+        if pending_changes:
+            rate_data.update(pending_changes)
         response = self._rate_detailed_external_schema.dump(rate_data)
 
         return response, HTTPStatus.OK
 
+    def get_best_rates(self, request_args: MultiDict) -> Tuple[Dict[str, Any], int]:
+        read_logger.info('Getting best rates...')
+        try:
+            args = self._best_rate_args_schema.load(request_args)
+        except ValidationError as e:
+            logger.error('Invalid request args were provided! Error: %s', e)
+            abort(HTTPStatus.BAD_REQUEST, e.messages)
+
+        base_currency_id, currency_id = self._get_rate_currency_info(request_args)
+        if not base_currency_id:
+            abort(HTTPStatus.NOT_FOUND,
+                  self._CURRENCY_NOT_FOUND_MSG.format(args[RateInternalRepr.base_currency.value]))
+        if not currency_id:
+            abort(HTTPStatus.NOT_FOUND,
+                  self._CURRENCY_NOT_FOUND_MSG.format(args[RateInternalRepr.currency.value]))
+
+        operation_type = args.get(RateInternalRepr.operation_type.value)
+        is_cash = args.get(RateInternalRepr.is_cash.value)
+        # NOTE: a primary key lookup for the full key, otherwise still a primary key range scan since
+        #  the pair is the key prefix. Columns only, plain rows are not tracked by the session
+        filtering_rules = {
+            RateInternalRepr.base_id.value: base_currency_id,
+            RateInternalRepr.currency_id.value: currency_id,
+        }
+        if operation_type is not None:
+            filtering_rules[RateInternalRepr.operation_type.value] = operation_type
+        if is_cash is not None:
+            filtering_rules[RateInternalRepr.is_cash.value] = is_cash
+        best_rates = db.session.query(BestRate.operation_type, BestRate.is_cash, BestRate.rate,
+                                      BestRate.rate_id, BestRate.updated) \
+            .filter_by(**filtering_rules) \
+            .all()
+
+        best_rates_data = [
+            {
+                RateInternalRepr.currency.value: args[RateInternalRepr.currency.value],
+                RateInternalRepr.base_currency.value: args[RateInternalRepr.base_currency.value],
+                RateInternalRepr.operation_type.value: best_rate.operation_type,
+                RateInternalRepr.is_cash.value: best_rate.is_cash,
+                RateInternalRepr.rate.value: best_rate.rate,
+                RateInternalRepr.rate_id.value: best_rate.rate_id,
+                RateInternalRepr.updated.value: best_rate.updated,
+            }
+            for best_rate in best_rates
+        ]
+        response = {
+            ResponseFields.next_page_link.value: None,
+            **self._best_rates_schema.dump(best_rates_data),
+        }
+        return response, HTTPStatus.OK
+
+    def get_ohlc(self, request_args: MultiDict) -> Tuple[Dict[str, Any], int]:
+        read_logger.info('Getting rate candles...')
+        try:
+            args = self._ohlc_args_schema.load(request_args)
+        except ValidationError as e:
+            logger.error('Invalid request args were provided! Error: %s', e)
+            abort(HTTPStatus.BAD_REQUEST, e.messages)
+
+        base_currency_id, currency_id = self._get_rate_currency_info(request_args)
+        if not base_currency_id:
+            abort(HTTPStatus.NOT_FOUND,
+                  self._CURRENCY_NOT_FOUND_MSG.format(args[RateInternalRepr.base_currency.value]))
+        if not currency_id:
+            abort(HTTPStatus.NOT_FOUND,
+                  self._CURRENCY_NOT_FOUND_MSG.format(args[RateInternalRepr.currency.value]))
+
+        rows = self._get_ohlc_rows(base_currency_id, currency_id, args)
+        candles = self._build_candles(rows)
+        response = {
+            ResponseFields.next_page_link.value: None,
+            **self._candles_schema.dump(candles),
+        }
+        return response, HTTPStatus.OK
+
+    def get_anomalies(self) -> Tuple[Dict[str, Any], int]:
+        read_logger.info('Getting rate anomalies...')
+        anomalies = arbitrage_detector.get_anomalies()
+        response = {
+            ResponseFields.next_page_link.value: None,
+            **self._anomalies_schema.dump(anomalies),
+        }
+        return response, HTTPStatus.OK
+
     def create_rate(self, data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
         logger.info('Creating a new rate...')
         try:
             self._create_rate_external_schema.load(data)
         except ValidationError as e:
-            logger.error(f'Invalid request body was provided! Error: {e}')
+            logger.error('Invalid request body was provided! Error: %s', e)
             abort(HTTPStatus.BAD_REQUEST, e.messages)
         data_copy = copy.deepcopy(data)
         base_currency_id, currency_id = self._get_rate_currency_info(data)
@@ -98,119 +248,344 @@ class RateService(BaseService):
         except CreateError as e:
             abort(HTTPStatus.UNPROCESSABLE_ENTITY, str(e))
 
+        self.publish_rate_event(RateEventTypes.created.value, new_rate,
+                                data[RateExternalRepr.currency.value],
+                                data[RateExternalRepr.base_currency.value])
+
         response = {
             ResponseFields.status.value: ResponseStatuses.created.value,
             ResponseFields.id.value: new_rate.id
         }
         return response, HTTPStatus.CREATED
 
-    def update_rate(self, record_id: int, data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
-        # тут жидкий момент в том, что я не проверяю валюту рейта на то что у нее активный статус
+    def update_rate(self, record_id: int, data: Dict[str, Any],
+                    expected_version: Optional[int] = None) -> Tuple[Dict[str, Any], int]:
         logger.info('Updating currency...')
-        rate_to_update: Rate = Rate.get_by(id=record_id).first()
-        if not rate_to_update:
-            abort(HTTPStatus.NOT_FOUND, f'Rate with id: {record_id} does not exist.')
-
-        if RateExternalRepr.id.value in data:
-            abort(HTTPStatus.BAD_REQUEST, 'The \'id\' field is not allowed to be updated.')
-
-        try:
-            loaded_data = self._update_rate_external_schema.load(data)
-        except ValidationError as e:
-            logger.error(f'Invalid request body was provided! Error: {e}')
-            abort(HTTPStatus.BAD_REQUEST, e.messages)
+        rate_to_update, loaded_data = self._load_rate_update(record_id, data)
 
         try:
-            rate_to_update.update(loaded_data)
+            is_updated = rate_to_update.update(loaded_data, expected_version)
+        except VersionMismatchError as e:
+            abort(HTTPStatus.PRECONDITION_FAILED, str(e))
         except UpdateError as e:
             abort(HTTPStatus.BAD_REQUEST, e.reason)
 
+        if is_updated:
+            self.publish_rate_event(RateEventTypes.updated.value, rate_to_update,
+                                    *self._get_rate_currency_codes(rate_to_update))
+
         context = {
             ResponseFields.status.value: ResponseStatuses.updated.value,
             ResponseFields.record.value: self._rate_schema.dump(rate_to_update),
         }
         return context, HTTPStatus.OK
 
-    @staticmethod
-    def delete_rate(record_id: int) -> Tuple[Dict[str, Any], int]:
-        logger.info(f'Deleting rate with Id: {record_id}...')
+    def update_rate_async(self, record_id: int, data: Dict[str, Any],
+                          expected_version: Optional[int] = None) -> Tuple[Dict[str, Any], int]:
+        """Queues the update into the write coalescer, falls back to update_rate if it is disabled.
+
+        The expected version is checked only when the update is queued, coalesced updates are
+        merged with each other and applied later on top of whatever version is stored then.
+        """
+        if not rate_write_coalescer.is_enabled:
+            return self.update_rate(record_id, data, expected_version)
+
+        logger.info('Queueing rate update with id: %s...', record_id)
+        rate_to_update, loaded_data = self._load_rate_update(record_id, data)
+        try:
+            rate_to_update.check_version(expected_version)
+        except VersionMismatchError as e:
+            abort(HTTPStatus.PRECONDITION_FAILED, str(e))
+        try:
+            pending_changes = rate_write_coalescer.submit(record_id, loaded_data)
+        except QueueFullError as e:
+            abort(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+
+        rate_data = {
+            RateInternalRepr.id.value: rate_to_update.id,
+            RateInternalRepr.rate.value: rate_to_update.rate,
+            RateInternalRepr.operation_type.value: rate_to_update.operation_type,
+            RateInternalRepr.is_cash.value: rate_to_update.is_cash,
+            **pending_changes,
+        }
+        context = {
+            ResponseFields.status.value: ResponseStatuses.accepted.value,
+            ResponseFields.record.value: self._rate_schema.dump(rate_data),
+        }
+        return context, HTTPStatus.ACCEPTED
+
+    def delete_rate(self, record_id: int,
+                    expected_version: Optional[int] = None) -> Tuple[Dict[str, Any], int]:
+        logger.info('Deleting rate with Id: %s...', record_id)
         rate = Rate.get_by(id=record_id).first_or_404()
+        currency_codes = self._get_rate_currency_codes(rate)
         try:
-            rate.hard_delete()
+            rate.hard_delete(expected_version)
+        except VersionMismatchError as e:
+            abort(HTTPStatus.PRECONDITION_FAILED, str(e))
         except DeleteError as e:
             abort(HTTPStatus.CONFLICT, e.reason)
 
+        self.publish_rate_event(RateEventTypes.deleted.value, rate, *currency_codes)
+
         return {}, HTTPStatus.NO_CONTENT
 
-    def _get_all_rates(self) -> List[Dict[str, Any]]:
-        rates_info = self._get_joined_rate_and_currencies()
+    def subscribe_to_rate_events(self, request_args: MultiDict) -> Subscription:
+        logger.info('Subscribing to rate events...')
+        validated_args = self._validate_args(request_args, self._STREAM_FILTER_PARAMS)
+        if not validated_args:
+            return rate_events.subscribe()
+        if len(validated_args) != len(self._STREAM_FILTER_PARAMS):
+            abort(HTTPStatus.BAD_REQUEST, 'Both \'currency\' and \'baseCurrency\' are required to '
+                                          'filter events by a currency pair.')
+
+        topic = self._get_pair_topic(validated_args[RateExternalRepr.currency.value],
+                                     validated_args[RateExternalRepr.base_currency.value])
+        return rate_events.subscribe(topic)
+
+    def publish_rate_event(self, event_type: str, rate: Rate, currency_code: str,
+                           base_currency_code: str) -> None:
+        rate_data = {
+            RateInternalRepr.id.value: rate.id,
+            RateInternalRepr.currency.value: currency_code,
+            RateInternalRepr.base_currency.value: base_currency_code,
+            RateInternalRepr.rate.value: rate.rate,
+            RateInternalRepr.operation_type.value: rate.operation_type,
+            RateInternalRepr.is_cash.value: rate.is_cash,
+        }
+        frame = encode_event(event_type, self._rate_schema.dump(rate_data))
+        rate_events.publish(self._get_pair_topic(currency_code, base_currency_code), frame)
+
+    def publish_updated_rates(self, rates: List[Rate]) -> None:
+        self._publish_rate_events(RateEventTypes.updated.value, rates)
+
+    def publish_deleted_rates(self, rates: List[Rate]) -> None:
+        """Publishes rates deleted in bulk, the rates might also be rows with the same attributes."""
+        self._publish_rate_events(RateEventTypes.deleted.value, rates)
+
+    def _publish_rate_events(self, event_type: str, rates: List[Rate]) -> None:
+        currency_ids = {rate.currency_id for rate in rates} | {rate.base_id for rate in rates}
+        codes = dict(db.session.query(Currency.id, Currency.code)
+                     .filter(Currency.id.in_(currency_ids))
+                     .all())
+        for rate in rates:
+            self.publish_rate_event(event_type, rate, codes.get(rate.currency_id), codes.get(rate.base_id))
+
+    def _load_rate_update(self, record_id: int, data: Dict[str, Any]) -> Tuple[Rate, Dict[str, Any]]:
+        # тут жидкий момент в том, что я не проверяю валюту рейта на то что у нее активный статус
+        rate_to_update: Rate = Rate.get_by(id=record_id).first()
+        if not rate_to_update:
+            abort(HTTPStatus.NOT_FOUND, f'Rate with id: {record_id} does not exist.')
+
+        if RateExternalRepr.id.value in data:
+            abort(HTTPStatus.BAD_REQUEST, 'The \'id\' field is not allowed to be updated.')
+
+        try:
+            loaded_data = self._update_rate_external_schema.load(data)
+        except ValidationError as e:
+            logger.error('Invalid request body was provided! Error: %s', e)
+            abort(HTTPStatus.BAD_REQUEST, e.messages)
+
+        return rate_to_update, loaded_data
+
+    @staticmethod
+    def _get_pair_topic(currency_code: str, base_currency_code: str) -> str:
+        return f'{currency_code}/{base_currency_code}'
+
+    @staticmethod
+    def _get_rate_currency_codes(rate: Rate) -> Tuple[Optional[str], Optional[str]]:
+        currencies_info = db.session.query(Currency.id, Currency.code) \
+            .filter(Currency.id.in_([rate.currency_id, rate.base_id])) \
+            .all()
+        codes = dict(currencies_info)
+        return codes.get(rate.currency_id), codes.get(rate.base_id)
+
+    def _get_rates_from_store(self, request_args: MultiDict) -> Dict[str, List[Dict[str, Any]]]:
+        try:
+            args = self._rate_filter_args_schema.load(request_args)
+        except ValidationError as e:
+            logger.error('Invalid request args were provided! Error: %s', e)
+            abort(HTTPStatus.BAD_REQUEST, e.messages)
+
+        # NOTE: the store renders the external representation itself, no schema dump is needed
+        with memory_profiler.stage(MemoryProfileStages.query.value):
+            rates = rate_store.get_rates(**args)
+        return {self._rates_schema.get_envelope_key(many=True): rates}
+
+    def _get_all_rates(self) -> Dict[str, List[Dict[str, Any]]]:
+        with memory_profiler.stage(MemoryProfileStages.query.value):
+            rates_info = self._get_joined_rate_and_currencies()
         if not rates_info:
-            return []
-
-        rates = []
-        for rate_info in rates_info:
-            rate, currency_code, base_currency_code = rate_info
-            rate = {
-                RateInternalRepr.id.value: rate.id,
-                RateInternalRepr.currency.value: currency_code.code,
-                RateInternalRepr.base_currency.value: base_currency_code.code,
-                RateInternalRepr.rate.value: rate.rate,
-                RateInternalRepr.is_cash.value: rate.is_cash,
-                RateInternalRepr.operation_type.value: rate.operation_type,
-            }
-            rates.append(rate)
+            return self._rates_schema.dump([])
 
-        return self._rates_schema.dump(rates)
+        # NOTE: the rows already have the attributes the schema needs
+        with memory_profiler.stage(MemoryProfileStages.dump.value):
+            return self._rates_schema.dump(rates_info)
 
-    def _get_rates_by_args(self, request_args: MultiDict) -> List[Dict[str, Any]]:
+    def _get_rates_by_args(self, request_args: MultiDict) -> Dict[str, List[Dict[str, Any]]]:
         validated_args = self._validate_args(request_args, self._ALLOWED_GET_PARAMS)
         if not validated_args:
             return self._get_all_rates()
 
-        parsed_args = self._parser_args(validated_args)
+        try:
+            args = self._rate_filter_args_schema.load(validated_args)
+        except ValidationError as e:
+            logger.error('Invalid request args were provided! Error: %s', e)
+            abort(HTTPStatus.BAD_REQUEST, e.messages)
 
-        rates_info = Rate.query.filter_by(**parsed_args).all()
+        with memory_profiler.stage(MemoryProfileStages.query.value):
+            rates_info = self._get_joined_rate_and_currencies(args)
         if not rates_info:
-            return []
-
-        rates = []
-        for rate_info in rates_info:
-            rate, currency_code, base_currency_code = rate_info
-            rate = {
-                RateInternalRepr.id.value: rate.id,
-                RateInternalRepr.currency.value: currency_code.code,
-                RateInternalRepr.base_currency.value: base_currency_code.code,
-                RateInternalRepr.rate.value: rate.rate,
-                RateInternalRepr.is_cash.value: rate.is_cash,
-                RateInternalRepr.operation_type.value: rate.operation_type,
+            return self._rates_schema.dump([])
+
+        with memory_profiler.stage(MemoryProfileStages.dump.value):
+            return self._rates_schema.dump(rates_info)
+
+    def _get_ohlc_rows(self, base_currency_id: int, currency_id: int,
+                       args: Dict[str, Any]) -> List[_OhlcRow]:
+        """Returns one row per (bucket, operation type) ordered by bucket.
+
+        The compacted rates are read from the stored candles, the rest is aggregated from the rates.
+        A bucket may have both parts, the stored one holds its earlier rates.
+        """
+        watermark = RateCompactionState.get_watermark()
+        live_rows = self._get_live_ohlc_rows(base_currency_id, currency_id, args, watermark)
+        if watermark is None:
+            return [_OhlcRow(*row) for row in live_rows]
+
+        rows: Dict[Tuple[str, str], _OhlcRow] = {}
+        for row in self._get_stored_ohlc_rows(base_currency_id, currency_id, args) + live_rows:
+            key = (row.bucket, row.operation_type)
+            merged = rows.get(key)
+            if merged is None:
+                rows[key] = _OhlcRow(*row)
+                continue
+            if row.opened < merged.opened:
+                merged = merged._replace(open=row.open, opened=row.opened)
+            if row.closed >= merged.closed:
+                merged = merged._replace(close=row.close, closed=row.closed)
+            rows[key] = merged._replace(
+                high=max(merged.high, row.high),
+                low=min(merged.low, row.low),
+                ticks=merged.ticks + row.ticks,
+            )
+        return sorted(rows.values(), key=lambda row: row.bucket)
+
+    @staticmethod
+    def _get_stored_ohlc_rows(base_currency_id: int, currency_id: int, args: Dict[str, Any]) -> List[Row]:
+        # NOTE: the stored candles are filtered by their start, not by the time of their rates
+        query_filters = [
+            RateCandle.base_id == base_currency_id,
+            RateCandle.currency_id == currency_id,
+            RateCandle.interval == args[RateInternalRepr.interval.value],
+        ]
+        if RateInternalRepr.is_cash.value in args:
+            query_filters.append(RateCandle.is_cash == args[RateInternalRepr.is_cash.value])
+        if RateInternalRepr.date_from.value in args:
+            query_filters.append(RateCandle.start >= args[RateInternalRepr.date_from.value])
+        if RateInternalRepr.date_to.value in args:
+            query_filters.append(RateCandle.start < args[RateInternalRepr.date_to.value])
+
+        return db.session.query(
+            db.func.strftime('%Y-%m-%d %H:%M:%S', RateCandle.start).label('bucket'),
+            RateCandle.operation_type.label('operation_type'),
+            RateCandle.open.label('open'),
+            RateCandle.high.label('high'),
+            RateCandle.low.label('low'),
+            RateCandle.close.label('close'),
+            RateCandle.ticks.label('ticks'),
+            RateCandle.opened.label('opened'),
+            RateCandle.closed.label('closed'),
+        ) \
+            .filter(db.and_(*query_filters)) \
+            .all()
+
+    def _get_live_ohlc_rows(self, base_currency_id: int, currency_id: int, args: Dict[str, Any],
+                            watermark: Optional[Tuple[datetime.datetime, int]]) -> List[Row]:
+        """Aggregates rates into candles on the DB side.
+
+        Returns one row per (bucket, operation type) ordered by bucket. "open" and "close" are taken
+        from the first and the last quotes of a bucket, ranked by window functions. Only the rates
+        after the compaction watermark are aggregated.
+        """
+        bucket_format = self._OHLC_BUCKET_FORMATS[args[RateInternalRepr.interval.value]]
+        bucket = db.func.strftime(bucket_format, Rate.created)
+
+        query_filters = [Rate.base_id == base_currency_id, Rate.currency_id == currency_id]
+        if watermark is not None:
+            query_filters.append(db.tuple_(Rate.created, Rate.id) > watermark)
+        if RateInternalRepr.is_cash.value in args:
+            query_filters.append(Rate.is_cash == args[RateInternalRepr.is_cash.value])
+        if RateInternalRepr.date_from.value in args:
+            query_filters.append(Rate.created >= args[RateInternalRepr.date_from.value])
+        if RateInternalRepr.date_to.value in args:
+            query_filters.append(Rate.created < args[RateInternalRepr.date_to.value])
+
+        partition = (bucket, Rate.operation_type)
+        ranked = db.session.query(
+            bucket.label('bucket'),
+            Rate.operation_type.label('operation_type'),
+            Rate.rate.label('rate'),
+            Rate.created.label('created'),
+            db.func.row_number().over(partition_by=partition,
+                                      order_by=(Rate.created, Rate.id)).label('first_rank'),
+            db.func.row_number().over(partition_by=partition,
+                                      order_by=(Rate.created.desc(), Rate.id.desc())).label('last_rank'),
+        ).filter(db.and_(*query_filters)).subquery()
+
+        return db.session.query(
+            ranked.c.bucket,
+            ranked.c.operation_type,
+            db.func.max(db.case((ranked.c.first_rank == 1, ranked.c.rate))).label('open'),
+            db.func.max(ranked.c.rate).label('high'),
+            db.func.min(ranked.c.rate).label('low'),
+            db.func.max(db.case((ranked.c.last_rank == 1, ranked.c.rate))).label('close'),
+            db.func.count().label('ticks'),
+            db.func.min(ranked.c.created).label('opened'),
+            db.func.max(ranked.c.created).label('closed'),
+        ) \
+            .group_by(ranked.c.bucket, ranked.c.operation_type) \
+            .order_by(ranked.c.bucket) \
+            .all()
+
+    def _build_candles(self, rows: List[_OhlcRow]) -> List[Dict[str, Any]]:
+        # NOTE: rows are ordered by bucket, so a single pass merges buy and sell sides of a bucket
+        candles = []
+        candle = None
+        for row in rows:
+            if not candle or candle[CandleRepr.start.value] != row.bucket:
+                candle = {
+                    CandleRepr.start.value: row.bucket,
+                    CandleRepr.buy.value: None,
+                    CandleRepr.sell.value: None,
+                    CandleRepr.spread.value: None,
+                    CandleRepr.ticks.value: 0,
+                }
+                candles.append(candle)
+            side = self._OPERATION_TYPE_CANDLE_FIELDS.get(row.operation_type)
+            if not side:
+                continue
+            candle[side] = {
+                CandleRepr.open.value: row.open,
+                CandleRepr.high.value: row.high,
+                CandleRepr.low.value: row.low,
+                CandleRepr.close.value: row.close,
+                CandleRepr.ticks.value: row.ticks,
             }
-            rates.append(rate)
-
-        return self._rates_schema.dump(rates)
-
-    def _parser_args(self, args: MultiDict) -> Dict[str, Any]:
-        # todo: finish later
-        parsed_args = dict(args)
-
-        if RateExternalRepr.base_currency.value in args:
-            currency = Currency.get_by(
-                code=args[RateExternalRepr.base_currency.value],
-                status=CurrencyStatuesInternal.active.value
-            ).first()
-            parsed_args[RateInternalRepr.base_currency.value] = currency.id
-        if RateExternalRepr.currency.value in args:
-            currency = Currency.get_by(
-                code=args[RateExternalRepr.currency.value],
-                status=CurrencyStatuesInternal.active.value
-            ).first()
-            parsed_args[RateInternalRepr.currency.value] = currency.id
-        if RateExternalRepr.operation_type.value in args:
-            parsed_args[RateInternalRepr.operation_type] = args[RateExternalRepr.operation_type.value]
-
-        return self._rate_schema.dump(parsed_args)
+            candle[CandleRepr.ticks.value] += row.ticks
+
+        for candle in candles:
+            buy, sell = candle[CandleRepr.buy.value], candle[CandleRepr.sell.value]
+            if buy and sell:
+                spread = float(sell[CandleRepr.close.value]) - float(buy[CandleRepr.close.value])
+                candle[CandleRepr.spread.value] = round(spread, self._RATE_PLACES)
+            candle[CandleRepr.start.value] = datetime.datetime.strptime(
+                candle[CandleRepr.start.value], self._OHLC_BUCKET_PARSE_FORMAT
+            )
+        return candles
 
     @staticmethod
-    def _get_rate_currency_info(data: Dict[str, Any]) -> Tuple[Optional[int], Optional[int]]:
+    def _get_rate_currency_info(data: Mapping[str, Any]) -> Tuple[Optional[int], Optional[int]]:
         base_curr_code = data[RateExternalRepr.base_currency.value]
         curr_code = data[RateExternalRepr.currency.value]
         query_filter = db.and_(Currency.status == CurrencyStatuesInternal.active.value,
@@ -239,7 +614,13 @@ class RateService(BaseService):
             )
         )
 
-        query_result = db.session.query(Rate, Currency, base_currency) \
+        # NOTE: columns only, plain rows are not tracked by the session
+        query_result = db.session.query(Rate.id, Rate.rate, Rate.operation_type, Rate.is_cash,
+                                        Rate.created, Rate.version,
+                                        Currency.id.label('currency_id'),
+                                        Currency.code.label('currency_code'),
+                                        base_currency.id.label('base_currency_id'),
+                                        base_currency.code.label('base_currency_code')) \
             .join(Currency, Rate.currency_id == Currency.id) \
             .join(base_currency, Rate.base_id == base_currency.id) \
             .filter(query_filter) \
@@ -247,16 +628,36 @@ class RateService(BaseService):
         return query_result
 
     @staticmethod
-    def _get_joined_rate_and_currencies() -> Optional[List[Row]]:
+    def _get_joined_rate_and_currencies(args: Optional[Mapping[str, Any]] = None) -> Optional[List[Row]]:
+        """Returns the rates of active currencies matching the loaded RateFilterArgsSchema args."""
+        args = args or {}
         base_currency = db.aliased(Currency, name='base_currency')
-        query_filter = db.and_(
+        query_filters = [
             Currency.status == CurrencyStatuesInternal.active.value,
-            base_currency.status == CurrencyStatuesInternal.active.value
-        )
-
-        query_result = db.session.query(Rate, Currency, base_currency) \
+            base_currency.status == CurrencyStatuesInternal.active.value,
+        ]
+        for column, arg_name in ((Currency.code, RateInternalRepr.currency.value),
+                                 (base_currency.code, RateInternalRepr.base_currency.value),
+                                 (Rate.rate, RateInternalRepr.rate.value),
+                                 (Rate.operation_type, RateInternalRepr.operation_type.value),
+                                 (Rate.is_cash, RateInternalRepr.is_cash.value)):
+            if arg_name in args:
+                query_filters.append(column == args[arg_name])
+        # NOTE: the bounds are compared exactly when the rates are stored as scaled integers
+        if RateInternalRepr.min_rate.value in args:
+            query_filters.append(Rate.rate >= args[RateInternalRepr.min_rate.value])
+        if RateInternalRepr.max_rate.value in args:
+            query_filters.append(Rate.rate <= args[RateInternalRepr.max_rate.value])
+
+        query_result = db.session.query(Rate.id, Rate.get_output_rate().label(RateInternalRepr.rate.value),
+                                        Rate.operation_type, Rate.is_cash,
+                                        Currency.code.label(RateInternalRepr.currency.value),
+                                        base_currency.code.label(RateInternalRepr.base_currency.value)) \
             .join(Currency, Rate.currency_id == Currency.id) \
             .join(base_currency, Rate.base_id == base_currency.id) \
-            .filter(query_filter) \
+            .filter(db.and_(*query_filters)) \
             .all()
         return query_result
+
+
+rate_write_coalescer = WriteCoalescer(Rate, on_flushed=RateService().publish_updated_rates)
@@ -1,6 +1,7 @@
 from http import HTTPStatus
+from typing import Optional
 
-from flask import request as request_obj
+from flask import request as request_obj, Response
 from flask.views import MethodView
 from flask import abort
 
@@ -17,3 +18,31 @@ class BasicView(MethodView):
         except ValidatorError as e:
             error_message = e.args[0]
             abort(HTTPStatus.BAD_REQUEST, error_message)
+
+    @staticmethod
+    def is_async_requested(request: request_obj) -> bool:
+        return 'respond-async' in request.headers.get('Prefer', '')
+
+    @staticmethod
+    def get_expected_version(request: request_obj) -> Optional[int]:
+        """Parses the record version from the 'If-Match' header. No header or "*" mean any version."""
+        if not request.if_match or request.if_match.star_tag:
+            return None
+
+        # NOTE: weak tags are ignored, If-Match uses the strong comparison
+        entity_tags = request.if_match.as_set()
+        if len(entity_tags) > 1:
+            abort(HTTPStatus.BAD_REQUEST, 'Only one entity tag is supported in \'If-Match\' header.')
+        if not entity_tags:
+            abort(HTTPStatus.PRECONDITION_FAILED, 'Weak entity tags never match in \'If-Match\' header.')
+        entity_tag = entity_tags.pop()
+        if not entity_tag.isdigit():
+            abort(HTTPStatus.PRECONDITION_FAILED, f'Entity tag \'{entity_tag}\' does not match '
+                                                  f'any version of the record.')
+        return int(entity_tag)
+
+    @staticmethod
+    def set_version_etag(response: Response, version: Optional[int]) -> Response:
+        if version is not None:
+            response.set_etag(str(version))
+        return response
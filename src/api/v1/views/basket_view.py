@@ -0,0 +1,51 @@
+import logging
+from typing import Tuple
+
+from flask import jsonify, Response
+from flask import request as request_obj
+
+from .basic_view import BasicView
+from src.idempotency import idempotent
+from src.enums import BasketExternalReprFieldNames as BasketRepr
+from src.api.v1.services.basket_service import BasketService
+
+logger = logging.getLogger(__name__)
+
+
+class BasicBasketView(BasicView):
+
+    def __init__(self):
+        super().__init__()
+        self._basket_service: BasketService = BasketService()
+
+
+class BasketView(BasicBasketView):
+
+    def get(self, record_id: int) -> Tuple[Response, int]:
+        context, status = self._basket_service.get_basket_by_id(record_id)
+        return self.set_version_etag(jsonify(context), context.get(BasketRepr.version.value)), status
+
+    def delete(self, record_id: int) -> Tuple[Response, int]:
+        context, status = self._basket_service.delete_basket(record_id,
+                                                             self.get_expected_version(request_obj))
+        return jsonify(context), status
+
+
+class BasketsView(BasicBasketView):
+
+    def get(self) -> Tuple[Response, int]:
+        context, status = self._basket_service.get_baskets()
+        return jsonify(context), status
+
+    @idempotent
+    def post(self) -> Tuple[Response, int]:
+        self.validate_request(request_obj)
+        context, status = self._basket_service.create_basket(request_obj.json)
+        return jsonify(context), status
+
+
+class BasketValueView(BasicBasketView):
+
+    def get(self, record_id: int) -> Tuple[Response, int]:
+        context, status = self._basket_service.get_basket_value(record_id)
+        return jsonify(context), status
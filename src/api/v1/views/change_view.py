@@ -0,0 +1,24 @@
+import logging
+from typing import Tuple
+
+from flask import jsonify, Response
+from flask import request as request_obj
+
+from .basic_view import BasicView
+from src.rate_limiter import rate_limit_cost
+from src.constans import RATE_LIMIT_COLLECTION_COST
+from src.api.v1.services.change_service import ChangeService
+
+logger = logging.getLogger(__name__)
+
+
+class ChangesView(BasicView):
+
+    def __init__(self):
+        super().__init__()
+        self._change_service: ChangeService = ChangeService()
+
+    @rate_limit_cost(RATE_LIMIT_COLLECTION_COST)
+    def get(self) -> Tuple[Response, int]:
+        context, status = self._change_service.get_changes(request_obj.args)
+        return jsonify(context), status
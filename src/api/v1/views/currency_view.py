@@ -5,11 +5,22 @@ from flask import jsonify, Response
 from flask import request as request_obj
 
 from .basic_view import BasicView
+from src.idempotency import idempotent
+from src.rate_limiter import rate_limit_cost
+from src.compression import compression_cache
+from src.invalidation import invalidation_bus
+from src.models import Currency
+from src.constans import RATE_LIMIT_COLLECTION_COST
+from src.enums import CurrencyExternalReprFieldNames as CurrRepr
 from src.api.v1.services.currency_service import CurrencyService
 
 logger = logging.getLogger(__name__)
 
 
+def _get_currencies_version() -> Tuple[int, ...]:
+    return invalidation_bus.get_generations(Currency.__tablename__)
+
+
 class BasicCurrencyView(BasicView):
 
     def __init__(self):
@@ -22,24 +33,30 @@ class CurrencyView(BasicCurrencyView):
 
     def get(self, record_id: int) -> Tuple[Response, int]:
         context, status = self._currency_service.get_currency_by_id(record_id)
-        return jsonify(context), status
+        return self.set_version_etag(jsonify(context), context.get(CurrRepr.version.value)), status
 
+    @idempotent
     def patch(self, record_id: int) -> Tuple[Response, int]:
         self.validate_request(request_obj)
-        context, status = self._currency_service.update_currency(record_id, request_obj.json)
-        return jsonify(context), status
+        context, status = self._currency_service.update_currency(record_id, request_obj.json,
+                                                                 self.get_expected_version(request_obj))
+        return self.set_version_etag(jsonify(context), context.get(CurrRepr.version.value)), status
 
     def delete(self, record_id: int) -> Tuple[Response, int]:
-        context, status = self._currency_service.delete_currency(record_id)
+        context, status = self._currency_service.delete_currency(record_id,
+                                                                 self.get_expected_version(request_obj))
         return jsonify(context), status
 
 
 class CurrenciesView(BasicCurrencyView):
 
+    @rate_limit_cost(RATE_LIMIT_COLLECTION_COST)
+    @compression_cache(_get_currencies_version)
     def get(self) -> Tuple[Response, int]:
         context, status = self._currency_service.get_currencies(request_obj.args)
         return jsonify(context), status
 
+    @idempotent
     def post(self) -> Tuple[Response, int]:
         self.validate_request(request_obj)
         context, status = self._currency_service.create_currency(request_obj.json)
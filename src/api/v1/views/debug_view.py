@@ -0,0 +1,48 @@
+import hmac
+import logging
+from http import HTTPStatus
+from typing import Tuple
+
+from flask import abort, current_app, jsonify, Response
+from flask import request as request_obj
+
+from .basic_view import BasicView
+from src.api.v1.services.debug_service import DebugService
+
+logger = logging.getLogger(__name__)
+
+
+class BasicDebugView(BasicView):
+    """Diagnostics of the running worker, available only with the 'X-Debug-Token' header.
+
+    NOTE: the endpoints do not exist unless the token is configured.
+    """
+    _TOKEN_HEADER: str = 'X-Debug-Token'
+
+    def __init__(self):
+        super().__init__()
+        self._debug_service: DebugService = DebugService()
+
+    def dispatch_request(self, *args, **kwargs):
+        expected_token = current_app.config['DEBUG_TOKEN']
+        if not expected_token:
+            abort(HTTPStatus.NOT_FOUND)
+        token = request_obj.headers.get(self._TOKEN_HEADER, '')
+        if not hmac.compare_digest(token.encode(), expected_token.encode()):
+            logger.warning('Debug endpoint %s was requested with an invalid token.', request_obj.path)
+            abort(HTTPStatus.FORBIDDEN, f'Valid \'{self._TOKEN_HEADER}\' header is required.')
+        return super().dispatch_request(*args, **kwargs)
+
+
+class SlowQueriesView(BasicDebugView):
+
+    def get(self) -> Tuple[Response, int]:
+        context, status = self._debug_service.get_slow_queries()
+        return jsonify(context), status
+
+
+class MemoryProfileView(BasicDebugView):
+
+    def get(self) -> Tuple[Response, int]:
+        context, status = self._debug_service.get_memory_profile()
+        return jsonify(context), status
@@ -1,5 +1,5 @@
 from http import HTTPStatus
-from typing import Tuple
+from typing import Dict, Tuple
 
 from flask import jsonify, Response
 
@@ -17,6 +17,15 @@ def bad_request(e: exc.BadRequest) -> Tuple[Response, int]:
     return jsonify(context), HTTPStatus.BAD_REQUEST
 
 
+def forbidden(e: exc.Forbidden) -> Tuple[Response, int]:
+    context = {
+        'status': ResponseStatuses.failed.value,
+        'message': 'Access to the requested URL is forbidden.',
+        'details': e.description,
+    }
+    return jsonify(context), HTTPStatus.FORBIDDEN
+
+
 def page_not_found(e: exc.NotFound) -> Tuple[Response, int]:
     context = {
         'status': ResponseStatuses.failed.value,
@@ -44,6 +53,15 @@ def conflict(e: exc.Conflict) -> Tuple[Response, int]:
     return jsonify(context), HTTPStatus.CONFLICT
 
 
+def precondition_failed(e: exc.PreconditionFailed) -> Tuple[Response, int]:
+    context = {
+        'status': ResponseStatuses.failed.value,
+        'message': 'The record was changed since it was read, fetch it again.',
+        'details': e.description,
+    }
+    return jsonify(context), HTTPStatus.PRECONDITION_FAILED
+
+
 def unprocessed_entity(e: exc.UnprocessableEntity) -> Tuple[Response, int]:
     context = {
         'status': ResponseStatuses.failed.value,
@@ -53,6 +71,16 @@ def unprocessed_entity(e: exc.UnprocessableEntity) -> Tuple[Response, int]:
     return jsonify(context), HTTPStatus.UNPROCESSABLE_ENTITY
 
 
+def too_many_requests(e: exc.TooManyRequests) -> Tuple[Response, int, Dict[str, str]]:
+    context = {
+        'status': ResponseStatuses.failed.value,
+        'message': 'Too many requests, slow down.',
+        'details': e.description,
+    }
+    headers = {'Retry-After': str(e.retry_after)} if e.retry_after is not None else {}
+    return jsonify(context), HTTPStatus.TOO_MANY_REQUESTS, headers
+
+
 # 5xx
 def internal_server_error(e: exc.InternalServerError) -> Tuple[Response, int]:
     context = {
@@ -61,3 +89,12 @@ def internal_server_error(e: exc.InternalServerError) -> Tuple[Response, int]:
         'details': e.description,
     }
     return jsonify(context), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def service_unavailable(e: exc.ServiceUnavailable) -> Tuple[Response, int]:
+    context = {
+        'status': ResponseStatuses.failed.value,
+        'message': 'The service is overloaded, try again later.',
+        'details': e.description,
+    }
+    return jsonify(context), HTTPStatus.SERVICE_UNAVAILABLE
@@ -1,15 +1,30 @@
 import logging
-from typing import Tuple
+from http import HTTPStatus
+from typing import Tuple, Iterator
 
-from flask import jsonify, Response
+from flask import jsonify, Response, current_app, stream_with_context
 from flask import request as request_obj
 
 from .basic_view import BasicView
+from src.idempotency import idempotent
+from src.rate_limiter import rate_limit_cost
+from src.compression import compression_cache
+from src.memory_profiler import memory_profiler
+from src.invalidation import invalidation_bus
+from src.models import Rate, Currency
+from src.constans import RATE_LIMIT_COLLECTION_COST
+from src.enums import ResponseFields, MemoryProfileStages
+from src.enums import RateExternalReprFieldFieldNames as RateRepr
 from src.api.v1.services.rate_service import RateService
+from src.events import rate_events, Subscription, KEEP_ALIVE_FRAME, encode_retry
 
 logger = logging.getLogger(__name__)
 
 
+def _get_rates_version() -> Tuple[int, ...]:
+    return invalidation_bus.get_generations(Rate.__tablename__, Currency.__tablename__)
+
+
 class BasicRateView(BasicView):
 
     def __init__(self):
@@ -21,25 +36,95 @@ class RateView(BasicRateView):
 
     def get(self, record_id: int) -> Tuple[Response, int]:
         context, status = self._rate_service.get_rate_by_id(record_id)
-        return jsonify(context), status
+        return self.set_version_etag(jsonify(context), context.get(RateRepr.version.value)), status
 
+    @idempotent
     def patch(self, record_id: int) -> Tuple[Response, int]:
         self.validate_request(request_obj)
-        context, status = self._rate_service.update_rate(record_id, request_obj.json)
-        return jsonify(context), status
+        expected_version = self.get_expected_version(request_obj)
+        if not self.is_async_requested(request_obj):
+            context, status = self._rate_service.update_rate(record_id, request_obj.json,
+                                                             expected_version)
+            record = context[ResponseFields.record.value]
+            return self.set_version_etag(jsonify(context), record.get(RateRepr.version.value)), status
+
+        context, status = self._rate_service.update_rate_async(record_id, request_obj.json,
+                                                               expected_version)
+        response = jsonify(context)
+        if status == HTTPStatus.ACCEPTED:
+            # NOTE: no ETag, the version of the record is not known until the update is flushed
+            response.headers['Preference-Applied'] = 'respond-async'
+        else:
+            record = context[ResponseFields.record.value]
+            self.set_version_etag(response, record.get(RateRepr.version.value))
+        return response, status
 
     def delete(self, record_id: int) -> Tuple[Response, int]:
-        context, status = self._rate_service.delete_rate(record_id)
+        context, status = self._rate_service.delete_rate(record_id,
+                                                         self.get_expected_version(request_obj))
         return jsonify(context), status
 
 
 class RatesView(BasicRateView):
 
+    @rate_limit_cost(RATE_LIMIT_COLLECTION_COST)
+    @compression_cache(_get_rates_version)
     def get(self) -> Tuple[Response, int]:
         context, status = self._rate_service.get_rates(request_obj.args)
-        return jsonify(context), status
+        with memory_profiler.stage(MemoryProfileStages.encode.value):
+            return jsonify(context), status
 
+    @idempotent
     def post(self) -> Tuple[Response, int]:
         self.validate_request(request_obj)
         context, status = self._rate_service.create_rate(request_obj.json)
         return jsonify(context), status
+
+
+class BestRatesView(BasicRateView):
+
+    def get(self) -> Tuple[Response, int]:
+        context, status = self._rate_service.get_best_rates(request_obj.args)
+        return jsonify(context), status
+
+
+class RatesOhlcView(BasicRateView):
+
+    @rate_limit_cost(RATE_LIMIT_COLLECTION_COST)
+    def get(self) -> Tuple[Response, int]:
+        context, status = self._rate_service.get_ohlc(request_obj.args)
+        return jsonify(context), status
+
+
+class RatesAnomaliesView(BasicRateView):
+
+    @rate_limit_cost(RATE_LIMIT_COLLECTION_COST)
+    def get(self) -> Tuple[Response, int]:
+        context, status = self._rate_service.get_anomalies()
+        return jsonify(context), status
+
+
+class RatesStreamView(BasicRateView):
+    _RETRY_MILLISECONDS: int = 3000
+
+    def get(self) -> Response:
+        subscription = self._rate_service.subscribe_to_rate_events(request_obj.args)
+        heartbeat_interval = current_app.config['EVENTS_HEARTBEAT_INTERVAL']
+        headers = {
+            'Cache-Control': 'no-cache',
+            # NOTE: disables response buffering of nginx
+            'X-Accel-Buffering': 'no',
+        }
+        return Response(stream_with_context(self._stream(subscription, heartbeat_interval)),
+                        mimetype='text/event-stream', headers=headers)
+
+    def _stream(self, subscription: Subscription, heartbeat_interval: float) -> Iterator[bytes]:
+        try:
+            yield encode_retry(self._RETRY_MILLISECONDS)
+            while True:
+                frame = subscription.get(timeout=heartbeat_interval)
+                yield frame if frame is not None else KEEP_ALIVE_FRAME
+        except EOFError:
+            logger.info('Rate events subscription was closed.')
+        finally:
+            rate_events.unsubscribe(subscription)
@@ -1,18 +1,72 @@
+import json
+import logging
+import uuid
 from http import HTTPStatus
+from pathlib import Path
+from typing import Tuple
 
-from flask import Flask
+from flask import Flask, request, Response
+from sqlalchemy import inspect
+from sqlalchemy.exc import SQLAlchemyError
 
 # NOTE: it is IMPORTANT to all models here to create all tables
-from .api.v1 import rate_api, currency_api
+from .api.v1 import rate_api, currency_api, change_api, basket_api, debug_api
 # todo: mb refact v1.views -> just v1 (__init__)
 from .api.v1.views import errors_view as err
-from .models import db
+from .models import (db, Rate, BestRate, RateCandle, create_read_only_engine, use_read_session,
+                     currency_search_index, migrate_scaled_columns)
 from .schemas.core import ma
-from .constans import DB_URI
+from .events import init_events
+from .ingestion import IngestionScheduler, create_provider
+from .api.v1.services.rate_service import rate_write_coalescer
+from .idempotency import idempotency_store
+from .invalidation import invalidation_bus
+from .rate_limiter import rate_limiter
+from .compression import response_compressor
+from .structured_logging import logging_pipeline, request_id_var
+from .slow_queries import slow_query_detector
+from .traffic_capture import traffic_recorder
+from .memory_profiler import memory_profiler
+from .compaction import RateCompactor, ChangeLogCompactor
+from .cache import rate_store, RateSnapshotFile, SnapshotPublisher
+from .analytics import arbitrage_detector, AnomalyMonitor
+from .constans import DB_URI, DB_READ_ONLY_ENGINE_ENABLED, RATE_FIXED_POINT_STORAGE_ENABLED, RATE_STORAGE_SCALE
+from .constans import EVENTS_SOCKET_DIR, EVENTS_MAX_PENDING, EVENTS_HEARTBEAT_INTERVAL
+from .constans import INGESTION_CONFIG_PATH, INGESTION_MAX_WORKERS, INGESTION_LOCK_PATH
+from .constans import (RATE_WRITE_COALESCING_ENABLED, RATE_WRITE_COALESCING_INTERVAL,
+                       RATE_WRITE_COALESCING_MAX_PENDING, RATE_WRITE_COALESCING_SUBMIT_TIMEOUT)
+from .constans import IDEMPOTENCY_MAX_KEYS, IDEMPOTENCY_KEY_TTL, IDEMPOTENCY_RESERVATION_TIMEOUT
+from .constans import INVALIDATION_GENERATIONS_PATH
+from .constans import (RATE_RETENTION_ENABLED, RATE_RAW_RETENTION, RATE_CANDLE_RETENTION, RATE_COMPACTION_INTERVAL,
+                       RATE_COMPACTION_BATCH_SIZE, RATE_COMPACTION_BATCH_PAUSE, RATE_COMPACTION_VACUUM_PAGES,
+                       RATE_COMPACTION_ANALYZE_INTERVAL, RATE_COMPACTION_LOCK_PATH)
+from .constans import (CHANGE_LOG_COMPACTION_INTERVAL, CHANGE_LOG_COMPACTION_BATCH_SIZE,
+                       CHANGE_LOG_COMPACTION_BATCH_PAUSE, CHANGE_LOG_COMPACTION_LOCK_PATH)
+from .constans import (RATE_STORE_ENABLED, RATE_SNAPSHOT_PATH, RATE_SNAPSHOT_INTERVAL,
+                       RATE_SNAPSHOT_LOCK_PATH)
+from .constans import (RATE_LIMIT_ENABLED, RATE_LIMIT_CAPACITY, RATE_LIMIT_REFILL_RATE, RATE_LIMIT_SLOTS,
+                       RATE_LIMIT_PATH, RATE_LIMIT_API_KEYS)
+from .constans import (RESPONSE_COMPRESSION_ENABLED, RESPONSE_COMPRESSION_MIN_SIZE, RESPONSE_COMPRESSION_LEVELS,
+                       RESPONSE_COMPRESSION_CACHE_MAX_ENTRIES)
+from .constans import WORKER_MODE, WORKER_MODES, WORKER_DB_THREADS
+from .constans import (MEMORY_PROFILER_ENABLED, MEMORY_PROFILER_FRAMES, MEMORY_PROFILER_SNAPSHOT_INTERVAL,
+                       MEMORY_PROFILER_LEAK_SNAPSHOTS, MEMORY_PROFILER_TOP_SITES)
+from .constans import SLOW_QUERY_LOG_ENABLED, SLOW_QUERY_THRESHOLD, SLOW_QUERY_MAX_RECORDS, SLOW_QUERY_LOG_PATH
+from .constans import (TRAFFIC_CAPTURE_ENABLED, TRAFFIC_CAPTURE_PATH, TRAFFIC_CAPTURE_SAMPLE_RATE,
+                       TRAFFIC_CAPTURE_MAX_BODY_SIZE)
+from .constans import ANOMALY_MONITOR_ENABLED, ANOMALY_MONITOR_INTERVAL, ANOMALY_MONITOR_LOCK_PATH
+from .constans import DEBUG_TOKEN
+from .constans import LOG_LEVEL, LOG_QUEUE_SIZE, LOG_SAMPLE_RATES, REQUEST_ID_HEADER, REQUEST_ID_MAX_LENGTH
 from config import Config
 
+logger = logging.getLogger(__name__)
+
 
 class Application:
+    _READ_METHODS: Tuple[str, ...] = ('GET', 'HEAD')
+    # NOTE: bit of the "user_version" pragma set while the rates are stored as scaled integers
+    _RATE_FIXED_POINT_FLAG: int = 0b1
+
     def __init__(self, name: str):
         self._app: Flask = Flask(name)
 
@@ -23,13 +77,114 @@ class Application:
         self._app.config['ENV'] = 'development'
         # NOTE: I do not remember why I did that, fuck...
         self._app.config['JSON_SORT_KEYS'] = False
+        # logging configs
+        self._app.config['LOG_LEVEL'] = LOG_LEVEL
+        self._app.config['LOG_QUEUE_SIZE'] = LOG_QUEUE_SIZE
+        self._app.config['LOG_SAMPLE_RATES'] = LOG_SAMPLE_RATES
+        self._app.config['REQUEST_ID_HEADER'] = REQUEST_ID_HEADER
+        self._app.config['REQUEST_ID_MAX_LENGTH'] = REQUEST_ID_MAX_LENGTH
+        # debug configs
+        self._app.config['DEBUG_TOKEN'] = DEBUG_TOKEN
         # db configs
         self._app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DB_URI}'
         self._app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        # workers configs
+        self._app.config['WORKER_MODE'] = WORKER_MODE
+        self._app.config['WORKER_DB_THREADS'] = WORKER_DB_THREADS
+        self._app.config['DB_READ_ONLY_ENGINE_ENABLED'] = DB_READ_ONLY_ENGINE_ENABLED
+        self._app.config['RATE_FIXED_POINT_STORAGE_ENABLED'] = RATE_FIXED_POINT_STORAGE_ENABLED
+        self._app.config['RATE_STORAGE_SCALE'] = RATE_STORAGE_SCALE
+        self._app.config['SLOW_QUERY_LOG_ENABLED'] = SLOW_QUERY_LOG_ENABLED
+        self._app.config['SLOW_QUERY_THRESHOLD'] = SLOW_QUERY_THRESHOLD
+        self._app.config['SLOW_QUERY_MAX_RECORDS'] = SLOW_QUERY_MAX_RECORDS
+        self._app.config['SLOW_QUERY_LOG_PATH'] = SLOW_QUERY_LOG_PATH
+        # memory profiling configs
+        self._app.config['MEMORY_PROFILER_ENABLED'] = MEMORY_PROFILER_ENABLED
+        self._app.config['MEMORY_PROFILER_FRAMES'] = MEMORY_PROFILER_FRAMES
+        self._app.config['MEMORY_PROFILER_SNAPSHOT_INTERVAL'] = MEMORY_PROFILER_SNAPSHOT_INTERVAL
+        self._app.config['MEMORY_PROFILER_LEAK_SNAPSHOTS'] = MEMORY_PROFILER_LEAK_SNAPSHOTS
+        self._app.config['MEMORY_PROFILER_TOP_SITES'] = MEMORY_PROFILER_TOP_SITES
+        # traffic capture configs
+        self._app.config['TRAFFIC_CAPTURE_ENABLED'] = TRAFFIC_CAPTURE_ENABLED
+        self._app.config['TRAFFIC_CAPTURE_PATH'] = TRAFFIC_CAPTURE_PATH
+        self._app.config['TRAFFIC_CAPTURE_SAMPLE_RATE'] = TRAFFIC_CAPTURE_SAMPLE_RATE
+        self._app.config['TRAFFIC_CAPTURE_MAX_BODY_SIZE'] = TRAFFIC_CAPTURE_MAX_BODY_SIZE
+        # events configs
+        self._app.config['EVENTS_SOCKET_DIR'] = EVENTS_SOCKET_DIR
+        self._app.config['EVENTS_MAX_PENDING'] = EVENTS_MAX_PENDING
+        self._app.config['EVENTS_HEARTBEAT_INTERVAL'] = EVENTS_HEARTBEAT_INTERVAL
+        # ingestion configs
+        self._app.config['INGESTION_CONFIG_PATH'] = INGESTION_CONFIG_PATH
+        self._app.config['INGESTION_MAX_WORKERS'] = INGESTION_MAX_WORKERS
+        self._app.config['INGESTION_LOCK_PATH'] = INGESTION_LOCK_PATH
+        # write coalescing configs
+        self._app.config['RATE_WRITE_COALESCING_ENABLED'] = RATE_WRITE_COALESCING_ENABLED
+        self._app.config['RATE_WRITE_COALESCING_INTERVAL'] = RATE_WRITE_COALESCING_INTERVAL
+        self._app.config['RATE_WRITE_COALESCING_MAX_PENDING'] = RATE_WRITE_COALESCING_MAX_PENDING
+        self._app.config['RATE_WRITE_COALESCING_SUBMIT_TIMEOUT'] = RATE_WRITE_COALESCING_SUBMIT_TIMEOUT
+        # idempotency configs
+        self._app.config['IDEMPOTENCY_MAX_KEYS'] = IDEMPOTENCY_MAX_KEYS
+        self._app.config['IDEMPOTENCY_KEY_TTL'] = IDEMPOTENCY_KEY_TTL
+        self._app.config['IDEMPOTENCY_RESERVATION_TIMEOUT'] = IDEMPOTENCY_RESERVATION_TIMEOUT
+        # invalidation configs
+        self._app.config['INVALIDATION_GENERATIONS_PATH'] = (INVALIDATION_GENERATIONS_PATH
+                                                             or f'{DB_URI}.generations')
+        # read models configs
+        self._app.config['RATE_STORE_ENABLED'] = RATE_STORE_ENABLED
+        self._app.config['RATE_SNAPSHOT_PATH'] = RATE_SNAPSHOT_PATH
+        self._app.config['RATE_SNAPSHOT_INTERVAL'] = RATE_SNAPSHOT_INTERVAL
+        self._app.config['RATE_SNAPSHOT_LOCK_PATH'] = RATE_SNAPSHOT_LOCK_PATH
+        # retention configs
+        self._app.config['RATE_RETENTION_ENABLED'] = RATE_RETENTION_ENABLED
+        self._app.config['RATE_RAW_RETENTION'] = RATE_RAW_RETENTION
+        self._app.config['RATE_CANDLE_RETENTION'] = RATE_CANDLE_RETENTION
+        self._app.config['RATE_COMPACTION_INTERVAL'] = RATE_COMPACTION_INTERVAL
+        self._app.config['RATE_COMPACTION_BATCH_SIZE'] = RATE_COMPACTION_BATCH_SIZE
+        self._app.config['RATE_COMPACTION_BATCH_PAUSE'] = RATE_COMPACTION_BATCH_PAUSE
+        self._app.config['RATE_COMPACTION_VACUUM_PAGES'] = RATE_COMPACTION_VACUUM_PAGES
+        self._app.config['RATE_COMPACTION_ANALYZE_INTERVAL'] = RATE_COMPACTION_ANALYZE_INTERVAL
+        self._app.config['RATE_COMPACTION_LOCK_PATH'] = RATE_COMPACTION_LOCK_PATH
+        # change log configs
+        self._app.config['CHANGE_LOG_COMPACTION_INTERVAL'] = CHANGE_LOG_COMPACTION_INTERVAL
+        self._app.config['CHANGE_LOG_COMPACTION_BATCH_SIZE'] = CHANGE_LOG_COMPACTION_BATCH_SIZE
+        self._app.config['CHANGE_LOG_COMPACTION_BATCH_PAUSE'] = CHANGE_LOG_COMPACTION_BATCH_PAUSE
+        self._app.config['CHANGE_LOG_COMPACTION_LOCK_PATH'] = CHANGE_LOG_COMPACTION_LOCK_PATH
+        # rate limiting configs
+        self._app.config['RATE_LIMIT_ENABLED'] = RATE_LIMIT_ENABLED
+        self._app.config['RATE_LIMIT_CAPACITY'] = RATE_LIMIT_CAPACITY
+        self._app.config['RATE_LIMIT_REFILL_RATE'] = RATE_LIMIT_REFILL_RATE
+        self._app.config['RATE_LIMIT_SLOTS'] = RATE_LIMIT_SLOTS
+        self._app.config['RATE_LIMIT_PATH'] = RATE_LIMIT_PATH
+        self._app.config['RATE_LIMIT_API_KEYS'] = RATE_LIMIT_API_KEYS
+        # compression configs
+        self._app.config['RESPONSE_COMPRESSION_ENABLED'] = RESPONSE_COMPRESSION_ENABLED
+        self._app.config['RESPONSE_COMPRESSION_MIN_SIZE'] = RESPONSE_COMPRESSION_MIN_SIZE
+        self._app.config['RESPONSE_COMPRESSION_LEVELS'] = RESPONSE_COMPRESSION_LEVELS
+        self._app.config['RESPONSE_COMPRESSION_CACHE_MAX_ENTRIES'] = RESPONSE_COMPRESSION_CACHE_MAX_ENTRIES
+        # analytics configs
+        self._app.config['ANOMALY_MONITOR_ENABLED'] = ANOMALY_MONITOR_ENABLED
+        self._app.config['ANOMALY_MONITOR_INTERVAL'] = ANOMALY_MONITOR_INTERVAL
+        self._app.config['ANOMALY_MONITOR_LOCK_PATH'] = ANOMALY_MONITOR_LOCK_PATH
 
         # init_stuff
+        self._init_logging()
+        self._init_slow_query_log()
+        self._init_traffic_capture()
+        self._init_memory_profiler()
+        self._init_worker_mode()
         self._init_db()
         self._init_marshmallow()
+        self._init_events()
+        self._init_invalidation()
+        self._init_ingestion()
+        self._init_write_coalescing()
+        self._init_idempotency()
+        self._init_read_models()
+        self._init_retention()
+        self._init_change_log_compaction()
+        self._init_rate_limiting()
+        self._init_compression()
+        self._init_anomaly_monitor()
 
         # add routes
         self._register_blueprints()
@@ -42,18 +197,271 @@ class Application:
     def _register_blueprints(self, ) -> None:
         self._app.register_blueprint(rate_api)
         self._app.register_blueprint(currency_api)
+        self._app.register_blueprint(change_api)
+        self._app.register_blueprint(basket_api)
+        self._app.register_blueprint(debug_api)
 
     def _register_error_handlers(self) -> None:
         self._app.register_error_handler(HTTPStatus.BAD_REQUEST, err.bad_request)
+        self._app.register_error_handler(HTTPStatus.FORBIDDEN, err.forbidden)
         self._app.register_error_handler(HTTPStatus.NOT_FOUND, err.page_not_found)
         self._app.register_error_handler(HTTPStatus.METHOD_NOT_ALLOWED, err.method_not_allowed)
         self._app.register_error_handler(HTTPStatus.CONFLICT, err.conflict)
+        self._app.register_error_handler(HTTPStatus.PRECONDITION_FAILED, err.precondition_failed)
         self._app.register_error_handler(HTTPStatus.UNPROCESSABLE_ENTITY, err.unprocessed_entity)
+        self._app.register_error_handler(HTTPStatus.TOO_MANY_REQUESTS, err.too_many_requests)
         self._app.register_error_handler(HTTPStatus.INTERNAL_SERVER_ERROR, err.internal_server_error)
+        self._app.register_error_handler(HTTPStatus.SERVICE_UNAVAILABLE, err.service_unavailable)
+
+    def _init_logging(self) -> None:
+        logging_pipeline.configure(self._app.config['LOG_LEVEL'], self._app.config['LOG_SAMPLE_RATES'],
+                                   self._app.config['LOG_QUEUE_SIZE'])
+        header = self._app.config['REQUEST_ID_HEADER']
+        max_length = self._app.config['REQUEST_ID_MAX_LENGTH']
+
+        @self._app.before_request
+        def _set_request_id() -> None:
+            # NOTE: the id of a proxy or a client is kept to correlate their logs with ours
+            request_id = request.headers.get(header, '')
+            if not request_id or len(request_id) > max_length:
+                request_id = uuid.uuid4().hex
+            request_id_var.set(request_id)
+
+        @self._app.after_request
+        def _add_request_id(response: Response) -> Response:
+            response.headers[header] = request_id_var.get()
+            return response
+
+        @self._app.teardown_request
+        def _reset_request_id(exc) -> None:
+            request_id_var.set(None)
+
+    def _init_slow_query_log(self) -> None:
+        if not self._app.config['SLOW_QUERY_LOG_ENABLED']:
+            return
+
+        log_path = self._app.config['SLOW_QUERY_LOG_PATH']
+        slow_query_detector.init_app(self._app.config['SLOW_QUERY_THRESHOLD'],
+                                     self._app.config['SLOW_QUERY_MAX_RECORDS'],
+                                     Path(log_path) if log_path else None)
+
+    def _init_traffic_capture(self) -> None:
+        if not self._app.config['TRAFFIC_CAPTURE_ENABLED']:
+            return
+
+        # NOTE: registered before the other hooks, so rejected requests, e.g. rate limited ones, are
+        #  recorded as well
+        traffic_recorder.init_app(self._app, Path(self._app.config['TRAFFIC_CAPTURE_PATH']),
+                                  self._app.config['TRAFFIC_CAPTURE_SAMPLE_RATE'],
+                                  self._app.config['TRAFFIC_CAPTURE_MAX_BODY_SIZE'])
+
+    def _init_memory_profiler(self) -> None:
+        if not self._app.config['MEMORY_PROFILER_ENABLED']:
+            return
+
+        memory_profiler.init_app(self._app, self._app.config['MEMORY_PROFILER_FRAMES'],
+                                 self._app.config['MEMORY_PROFILER_SNAPSHOT_INTERVAL'],
+                                 self._app.config['MEMORY_PROFILER_LEAK_SNAPSHOTS'],
+                                 self._app.config['MEMORY_PROFILER_TOP_SITES'])
+
+    def _init_worker_mode(self) -> None:
+        worker_mode = self._app.config['WORKER_MODE']
+        if worker_mode not in WORKER_MODES:
+            raise ValueError(f'Unknown worker mode: {worker_mode}, expected one of: {", ".join(WORKER_MODES)}')
+
+        # NOTE: sync and gthread workers need nothing else, sessions are scoped to the app contexts
+        #  and sqlite3 releases the GIL while a statement runs
+        if worker_mode == 'gevent':
+            # NOTE: imported here, gevent is needed only by the gevent workers
+            from .models.cooperative import get_offloading_engine_options
+            self._app.config['SQLALCHEMY_ENGINE_OPTIONS'] = get_offloading_engine_options(
+                self._app.config['WORKER_DB_THREADS']
+            )
+        logger.info('Application is configured for the %s workers.', worker_mode)
 
     def _init_db(self) -> None:
         db.init_app(self._app)
         db.create_all(app=self._app)
+        self._create_missing_columns()
+        self._migrate_rate_storage()
+        self._create_missing_indexes()
+        self._create_search_indexes()
+        self._init_materializations()
+        self._init_read_session()
+
+    def _create_missing_columns(self) -> None:
+        # NOTE: create_all() does not alter the existing tables either. Only nullable columns and
+        #  the ones with a server default can be added this way
+        with self._app.app_context():
+            inspector = inspect(db.engine)
+            for table in db.metadata.sorted_tables:
+                existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing_columns:
+                        continue
+                    column_ddl = f'{column.name} {column.type.compile(dialect=db.engine.dialect)}'
+                    if column.server_default is not None:
+                        column_ddl += f' DEFAULT {column.server_default.arg}'
+                    if not column.nullable:
+                        column_ddl += ' NOT NULL'
+                    db.session.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {column_ddl}'))
+                    db.session.commit()
+                    logger.info('Added column %s to table %s.', column.name, table.name)
+
+    def _migrate_rate_storage(self) -> None:
+        is_fixed_point = self._app.config['RATE_FIXED_POINT_STORAGE_ENABLED']
+        candle_columns = RateCandle.__table__.c
+        columns = (Rate.__table__.c.Rate, BestRate.__table__.c.Rate, candle_columns.Open,
+                   candle_columns.High, candle_columns.Low, candle_columns.Close)
+        with self._app.app_context():
+            is_migrated = migrate_scaled_columns(db.engine, columns, is_fixed_point,
+                                                 self._app.config['RATE_STORAGE_SCALE'],
+                                                 self._RATE_FIXED_POINT_FLAG)
+        if is_migrated:
+            logger.info('Rates were converted to the %s storage.',
+                        'fixed-point' if is_fixed_point else 'decimal')
+
+    def _create_missing_indexes(self) -> None:
+        # NOTE: create_all() skips tables that already exist, so indexes added later have to be
+        #  created separately for the existing databases
+        with self._app.app_context():
+            for table in db.metadata.sorted_tables:
+                for index in table.indexes:
+                    try:
+                        index.create(bind=db.engine, checkfirst=True)
+                    except SQLAlchemyError as e:
+                        # NOTE: e.g. a unique index can not be created over already duplicated data
+                        logger.error('Failed to create index %s. Error: %s', index.name, e)
+                        # NOTE: the unique indexes are the conflict targets of INSERT ... ON CONFLICT,
+                        #  every insert would fail without them, so the app is not started
+                        if index.unique:
+                            raise RuntimeError(f'The unique index {index.name} is missing, '
+                                               f'resolve the duplicates of table {table.name}.') from e
+
+    def _create_search_indexes(self) -> None:
+        with self._app.app_context():
+            currency_search_index.create(db.engine)
+
+    def _init_materializations(self) -> None:
+        with self._app.app_context():
+            if Rate.query.first() and not BestRate.query.first():
+                BestRate.rebuild()
+
+    def _init_read_session(self) -> None:
+        read_only_engine = None
+        if self._app.config['DB_READ_ONLY_ENGINE_ENABLED']:
+            read_only_engine = create_read_only_engine(self._app.config['SQLALCHEMY_DATABASE_URI'],
+                                                       self._app.config.get('SQLALCHEMY_ENGINE_OPTIONS'))
+
+        @self._app.before_request
+        def _use_read_session() -> None:
+            if request.method in self._READ_METHODS:
+                use_read_session(read_only_engine)
 
     def _init_marshmallow(self) -> None:
         ma.init_app(self._app)
+
+    def _init_events(self) -> None:
+        socket_dir = self._app.config['EVENTS_SOCKET_DIR']
+        init_events(Path(socket_dir) if socket_dir else None, self._app.config['EVENTS_MAX_PENDING'])
+
+    def _init_invalidation(self) -> None:
+        socket_dir = self._app.config['EVENTS_SOCKET_DIR']
+        invalidation_bus.configure(Path(self._app.config['INVALIDATION_GENERATIONS_PATH']),
+                                   Path(socket_dir) / 'invalidations' if socket_dir else None)
+
+    def _init_ingestion(self) -> None:
+        config_path = self._app.config['INGESTION_CONFIG_PATH']
+        if not config_path:
+            return
+
+        providers_specs = json.loads(Path(config_path).read_text())
+        providers = [create_provider(spec) for spec in providers_specs]
+        scheduler = IngestionScheduler(self._app, providers, self._app.config['INGESTION_MAX_WORKERS'],
+                                       Path(self._app.config['INGESTION_LOCK_PATH']))
+        scheduler.start()
+        logger.info('Ingestion scheduler started.')
+
+    def _init_write_coalescing(self) -> None:
+        if not self._app.config['RATE_WRITE_COALESCING_ENABLED']:
+            return
+
+        rate_write_coalescer.init_app(
+            self._app,
+            flush_interval=self._app.config['RATE_WRITE_COALESCING_INTERVAL'],
+            max_pending=self._app.config['RATE_WRITE_COALESCING_MAX_PENDING'],
+            submit_timeout=self._app.config['RATE_WRITE_COALESCING_SUBMIT_TIMEOUT'],
+        )
+
+    def _init_idempotency(self) -> None:
+        idempotency_store.configure(self._app.config['IDEMPOTENCY_MAX_KEYS'],
+                                    self._app.config['IDEMPOTENCY_KEY_TTL'],
+                                    self._app.config['IDEMPOTENCY_RESERVATION_TIMEOUT'])
+
+    def _init_read_models(self) -> None:
+        snapshot_path = self._app.config['RATE_SNAPSHOT_PATH']
+        if not self._app.config['RATE_STORE_ENABLED'] or not snapshot_path:
+            rate_store.init_app(self._app.config['RATE_STORE_ENABLED'])
+            return
+
+        snapshot_file = RateSnapshotFile(Path(snapshot_path))
+        rate_store.init_app(True, snapshot_file)
+        publisher = SnapshotPublisher(self._app, snapshot_file, self._app.config['RATE_SNAPSHOT_INTERVAL'],
+                                      Path(self._app.config['RATE_SNAPSHOT_LOCK_PATH']))
+        publisher.start()
+        logger.info('Rate snapshot publisher started.')
+
+    def _init_retention(self) -> None:
+        if not self._app.config['RATE_RETENTION_ENABLED']:
+            return
+
+        compactor = RateCompactor(
+            self._app,
+            raw_retention=self._app.config['RATE_RAW_RETENTION'],
+            candle_retention=self._app.config['RATE_CANDLE_RETENTION'],
+            interval=self._app.config['RATE_COMPACTION_INTERVAL'],
+            batch_size=self._app.config['RATE_COMPACTION_BATCH_SIZE'],
+            batch_pause=self._app.config['RATE_COMPACTION_BATCH_PAUSE'],
+            vacuum_pages=self._app.config['RATE_COMPACTION_VACUUM_PAGES'],
+            analyze_interval=self._app.config['RATE_COMPACTION_ANALYZE_INTERVAL'],
+            lock_path=Path(self._app.config['RATE_COMPACTION_LOCK_PATH']),
+        )
+        compactor.start()
+        logger.info('Rate compactor started.')
+
+    def _init_change_log_compaction(self) -> None:
+        compactor = ChangeLogCompactor(self._app,
+                                       interval=self._app.config['CHANGE_LOG_COMPACTION_INTERVAL'],
+                                       batch_size=self._app.config['CHANGE_LOG_COMPACTION_BATCH_SIZE'],
+                                       batch_pause=self._app.config['CHANGE_LOG_COMPACTION_BATCH_PAUSE'],
+                                       lock_path=Path(self._app.config['CHANGE_LOG_COMPACTION_LOCK_PATH']))
+        compactor.start()
+        logger.info('Change log compactor started.')
+
+    def _init_rate_limiting(self) -> None:
+        if not self._app.config['RATE_LIMIT_ENABLED']:
+            return
+
+        rate_limiter.init_app(self._app, Path(self._app.config['RATE_LIMIT_PATH']),
+                              slots=self._app.config['RATE_LIMIT_SLOTS'],
+                              capacity=self._app.config['RATE_LIMIT_CAPACITY'],
+                              refill_rate=self._app.config['RATE_LIMIT_REFILL_RATE'],
+                              api_keys=self._app.config['RATE_LIMIT_API_KEYS'])
+
+    def _init_compression(self) -> None:
+        if not self._app.config['RESPONSE_COMPRESSION_ENABLED']:
+            return
+
+        response_compressor.init_app(self._app,
+                                     min_size=self._app.config['RESPONSE_COMPRESSION_MIN_SIZE'],
+                                     levels=self._app.config['RESPONSE_COMPRESSION_LEVELS'],
+                                     max_entries=self._app.config['RESPONSE_COMPRESSION_CACHE_MAX_ENTRIES'])
+
+    def _init_anomaly_monitor(self) -> None:
+        if not self._app.config['ANOMALY_MONITOR_ENABLED']:
+            return
+
+        monitor = AnomalyMonitor(self._app, arbitrage_detector, self._app.config['ANOMALY_MONITOR_INTERVAL'],
+                                 Path(self._app.config['ANOMALY_MONITOR_LOCK_PATH']))
+        monitor.start()
+        logger.info('Rate anomaly monitor started.')
@@ -0,0 +1,4 @@
+from .rate_store import RateStore
+from .snapshot import RateSnapshot, RateSnapshotFile, SnapshotPublisher
+
+rate_store = RateStore()
@@ -0,0 +1,135 @@
+import logging
+import operator
+import threading
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .snapshot import (RateSnapshot, RateSnapshotFile, get_data_version, load_rate_snapshot,
+                       scale_rate, RATE_SCALE, IS_CASH_FLAG, SELL_FLAG, SNAPSHOT_TABLE_NAMES)
+from src.invalidation import invalidation_bus
+from src.enums import RateOperationTypes
+from src.enums import RateExternalReprFieldFieldNames as RateExternalRepr
+
+logger = logging.getLogger(__name__)
+
+
+class RateStore:
+    """Columnar read model of the rates of active currencies.
+
+    A rate takes ~21 bytes in the typed arrays instead of a Rate and two Currency ORM objects.
+    Filters are vectorized with NumPy.
+
+    The columns come either from the shared snapshot file, then reads do not touch the database at
+    all, or are loaded by every worker from the database when the generation of the rate or currency
+    table is moved by a write. The file is used only while its generations are the current ones.
+    """
+    _OPERATION_TYPES: Dict[int, str] = {
+        0: RateOperationTypes.buy.value,
+        SELL_FLAG: RateOperationTypes.sell.value,
+    }
+
+    def __init__(self):
+        self._is_enabled: bool = False
+        self._snapshot: Optional[RateSnapshot] = None
+        self._snapshot_file: Optional[RateSnapshotFile] = None
+        self._refresh_lock: threading.Lock = threading.Lock()
+
+    def init_app(self, is_enabled: bool, snapshot_file: Optional[RateSnapshotFile] = None) -> None:
+        self._is_enabled = is_enabled
+        self._snapshot = None
+        self._snapshot_file = snapshot_file
+
+    @property
+    def is_enabled(self) -> bool:
+        return self._is_enabled
+
+    def get_rates(self, currency: Optional[str] = None, base_currency: Optional[str] = None,
+                  operation_type: Optional[str] = None, is_cash: Optional[bool] = None,
+                  rate: Optional[Decimal] = None, min_rate: Optional[Decimal] = None,
+                  max_rate: Optional[Decimal] = None) -> List[Dict[str, Any]]:
+        """Returns the rates matching all given filters in the external representation."""
+        snapshot = self._get_snapshot()
+
+        # NOTE: (column, bits mask or None, comparison, value)
+        conditions = []
+        for column, code in ((snapshot.currency_indexes, currency),
+                             (snapshot.base_indexes, base_currency)):
+            if code is None:
+                continue
+            if code not in snapshot.code_indexes:
+                return []
+            conditions.append((column, None, operator.eq, snapshot.code_indexes[code]))
+        for comparison, value in ((operator.eq, rate), (operator.ge, min_rate), (operator.le, max_rate)):
+            if value is not None:
+                conditions.append((snapshot.scaled_rates, None, comparison, scale_rate(value)))
+        if operation_type is not None:
+            conditions.append((snapshot.flags, SELL_FLAG, operator.eq,
+                               SELL_FLAG if operation_type == 's' else 0))
+        if is_cash is not None:
+            conditions.append((snapshot.flags, IS_CASH_FLAG, operator.eq, IS_CASH_FLAG if is_cash else 0))
+
+        return [self._render(snapshot, i) for i in self._select(len(snapshot.ids), conditions)]
+
+    def get_snapshot(self) -> RateSnapshot:
+        """Returns the current rates, e.g. to compute something over all of them at once."""
+        return self._get_snapshot()
+
+    def get_memory_usage(self) -> int:
+        """Returns the size of the rate columns in bytes."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return 0
+        columns = (snapshot.ids, snapshot.currency_indexes, snapshot.base_indexes,
+                   snapshot.scaled_rates, snapshot.flags)
+        return sum(column.itemsize * len(column) for column in columns)
+
+    def _get_snapshot(self) -> RateSnapshot:
+        # NOTE: the generations are read before the data, so a write committed in between only
+        #  causes one more reload
+        generations = invalidation_bus.get_generations(*SNAPSHOT_TABLE_NAMES)
+        if self._snapshot_file is not None:
+            snapshot = self._snapshot_file.read()
+            # NOTE: nothing was published yet, e.g. right after the first start, or the file lags
+            #  behind a write. The snapshot is loaded from the database until the leader catches up,
+            #  a stale one would also be cached by the compression cache under the new generations
+            if snapshot is not None and snapshot.generations == generations:
+                self._snapshot = snapshot
+                return snapshot
+
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.generations == generations:
+            return snapshot
+
+        with self._refresh_lock:
+            # NOTE: another thread might have refreshed it while this one was waiting for the lock
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.generations != generations:
+                snapshot = load_rate_snapshot(get_data_version(), generations)
+                logger.info('Rate store loaded %d rates of data version %d.',
+                            len(snapshot.ids), snapshot.data_version)
+                self._snapshot = snapshot
+        return snapshot
+
+    @staticmethod
+    def _select(size: int, conditions: List[tuple]) -> Sequence[int]:
+        if not conditions or not size:
+            return range(size)
+
+        mask = np.ones(size, dtype=bool)
+        for column, bits, comparison, value in conditions:
+            values = np.frombuffer(column, dtype=memoryview(column).format)
+            mask &= comparison((values & bits) if bits is not None else values, value)
+        return np.flatnonzero(mask).tolist()
+
+    def _render(self, snapshot: RateSnapshot, i: int) -> Dict[str, Any]:
+        flags = snapshot.flags[i]
+        return {
+            RateExternalRepr.id.value: snapshot.ids[i],
+            RateExternalRepr.currency.value: snapshot.codes[snapshot.currency_indexes[i]],
+            RateExternalRepr.base_currency.value: snapshot.codes[snapshot.base_indexes[i]],
+            RateExternalRepr.rate.value: snapshot.scaled_rates[i] / RATE_SCALE,
+            RateExternalRepr.operation_type.value: self._OPERATION_TYPES[flags & SELL_FLAG],
+            RateExternalRepr.is_cash.value: bool(flags & IS_CASH_FLAG),
+        }
@@ -0,0 +1,203 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+from array import array
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from flask import Flask
+
+from src.models import db, ChangeLog, Rate, Currency
+from src.enums import CurrencyStatuesInternal
+from src.invalidation import invalidation_bus
+from src.leadership import LeaderElectedWorker
+
+logger = logging.getLogger(__name__)
+
+RATE_SCALE: int = 10 ** 5
+IS_CASH_FLAG: int = 0b01
+SELL_FLAG: int = 0b10
+# NOTE: a snapshot has to be rebuilt whenever one of these tables is written
+SNAPSHOT_TABLE_NAMES: Tuple[str, ...] = (Rate.__tablename__, Currency.__tablename__)
+
+
+class RateSnapshot(NamedTuple):
+    """Columns of the rates of active currencies at some data version.
+
+    The columns are either arrays loaded from the database or memoryviews over a mapped file.
+    """
+    data_version: int
+    # NOTE: generations of SNAPSHOT_TABLE_NAMES read before the data was loaded
+    generations: Tuple[int, ...]
+    # NOTE: interned currency codes, the currency columns keep indexes of this list
+    codes: List[str]
+    code_indexes: Dict[str, int]
+    ids: Sequence[int]
+    currency_indexes: Sequence[int]
+    base_indexes: Sequence[int]
+    scaled_rates: Sequence[int]
+    flags: Sequence[int]
+
+
+def get_data_version() -> int:
+    """Every CRUDMixin write moves the change log sequence, so it is a version of the whole data."""
+    return db.session.query(db.func.max(ChangeLog.seq)).scalar() or 0
+
+
+def scale_rate(rate: Decimal) -> int:
+    return int(round(Decimal(rate) * RATE_SCALE))
+
+
+def load_rate_snapshot(data_version: int, generations: Tuple[int, ...]) -> RateSnapshot:
+    base_currency = db.aliased(Currency, name='base_currency')
+    rows = db.session.query(Rate.id, Currency.code, base_currency.code, Rate.rate,
+                            Rate.operation_type, Rate.is_cash) \
+        .join(Currency, Rate.currency_id == Currency.id) \
+        .join(base_currency, Rate.base_id == base_currency.id) \
+        .filter(Currency.status == CurrencyStatuesInternal.active.value,
+                base_currency.status == CurrencyStatuesInternal.active.value) \
+        .order_by(Rate.id) \
+        .all()
+
+    codes, code_indexes = [], {}
+    ids, currency_indexes, base_indexes = array('q'), array('H'), array('H')
+    scaled_rates, flags = array('q'), array('B')
+    for rate_id, currency_code, base_currency_code, rate, operation_type, is_cash in rows:
+        for code in (currency_code, base_currency_code):
+            if code not in code_indexes:
+                code_indexes[code] = len(codes)
+                codes.append(code)
+        ids.append(rate_id)
+        currency_indexes.append(code_indexes[currency_code])
+        base_indexes.append(code_indexes[base_currency_code])
+        scaled_rates.append(scale_rate(rate))
+        flags.append((SELL_FLAG if operation_type == 's' else 0) | (IS_CASH_FLAG if is_cash else 0))
+
+    return RateSnapshot(data_version, generations, codes, code_indexes, ids, currency_indexes,
+                        base_indexes, scaled_rates, flags)
+
+
+class RateSnapshotFile:
+    """Binary layout of a rate snapshot, shared by the worker processes through mmap.
+
+    Header: magic, format version, data version, generations of SNAPSHOT_TABLE_NAMES, rates count,
+    codes count. It is followed by the currency codes (3 ASCII bytes each) and by the columns in the
+    RateSnapshot order, every section is aligned to 8 bytes. Native byte order, the file never
+    leaves the host.
+    """
+    _MAGIC: bytes = b'RTSN'
+    _FORMAT_VERSION: int = 2
+    _HEADER: struct.Struct = struct.Struct(f'=4sHHQ{len(SNAPSHOT_TABLE_NAMES)}QII')
+    _CODE_LENGTH: int = 3
+    _ALIGNMENT: int = 8
+    # NOTE: (typecode, item size) of ids, currency indexes, base indexes, scaled rates and flags
+    _COLUMNS: Tuple[Tuple[str, int], ...] = (('q', 8), ('H', 2), ('H', 2), ('q', 8), ('B', 1))
+
+    def __init__(self, path: Path):
+        self._path: Path = path
+        self._file_id: Optional[Tuple[int, int, int]] = None
+        self._snapshot: Optional[RateSnapshot] = None
+        self._lock: threading.Lock = threading.Lock()
+
+    def write(self, snapshot: RateSnapshot) -> None:
+        """Publishes the snapshot atomically, readers see either the previous file or the new one."""
+        codes = b''.join(code.encode('ascii').ljust(self._CODE_LENGTH) for code in snapshot.codes)
+        columns = zip(self._COLUMNS, self._get_columns(snapshot))
+        sections = [codes] + [array(typecode, column).tobytes() for (typecode, _), column in columns]
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self._path.with_name(f'{self._path.name}.{os.getpid()}.tmp')
+        with open(temp_path, 'wb') as file:
+            file.write(self._HEADER.pack(self._MAGIC, self._FORMAT_VERSION, 0, snapshot.data_version,
+                                         *snapshot.generations, len(snapshot.ids), len(snapshot.codes)))
+            for section in sections:
+                file.write(section)
+                file.write(b'\0' * self._get_padding(len(section)))
+        os.replace(temp_path, self._path)
+
+    def read(self) -> Optional[RateSnapshot]:
+        """Returns the latest published snapshot, the file is remapped only when it was replaced.
+
+        Returns:
+            None if nothing was published yet
+        """
+        try:
+            stat = os.stat(self._path)
+        except FileNotFoundError:
+            return None
+        file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if file_id == self._file_id:
+            return self._snapshot
+
+        with self._lock:
+            if file_id != self._file_id:
+                self._snapshot = self._map()
+                self._file_id = file_id
+        return self._snapshot
+
+    def _map(self) -> RateSnapshot:
+        with open(self._path, 'rb') as file:
+            # NOTE: the mapping outlives the file object. It is never closed explicitly: requests
+            #  may still read the previous snapshot, it is unmapped once its last view is collected
+            buffer = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+        magic, format_version, _, data_version, *generations, rates_count, codes_count = \
+            self._HEADER.unpack_from(buffer)
+        if magic != self._MAGIC or format_version != self._FORMAT_VERSION:
+            raise ValueError(f'{self._path} is not a rate snapshot of version {self._FORMAT_VERSION}.')
+
+        offset = self._HEADER.size
+        codes_size = codes_count * self._CODE_LENGTH
+        codes = [bytes(buffer[i:i + self._CODE_LENGTH]).decode('ascii').rstrip()
+                 for i in range(offset, offset + codes_size, self._CODE_LENGTH)]
+        offset += codes_size + self._get_padding(codes_size)
+
+        columns = []
+        for typecode, item_size in self._COLUMNS:
+            size = rates_count * item_size
+            columns.append(buffer[offset:offset + size].cast(typecode))
+            offset += size + self._get_padding(size)
+
+        logger.info('Mapped rate snapshot of data version %d with %d rates.', data_version, rates_count)
+        code_indexes = {code: index for index, code in enumerate(codes)}
+        return RateSnapshot(data_version, tuple(generations), codes, code_indexes, *columns)
+
+    @staticmethod
+    def _get_columns(snapshot: RateSnapshot) -> Tuple[Sequence[int], ...]:
+        return (snapshot.ids, snapshot.currency_indexes, snapshot.base_indexes, snapshot.scaled_rates,
+                snapshot.flags)
+
+    def _get_padding(self, size: int) -> int:
+        return -size % self._ALIGNMENT
+
+
+class SnapshotPublisher(LeaderElectedWorker):
+    """Rebuilds the snapshot file whenever the rate or currency table is written.
+
+    Like the ingestion, it runs only in the process holding the lock file. It polls the shared
+    table generations, which is a memory read, and queries the database only after a write.
+    The other workers only stat the file.
+    """
+
+    def __init__(self, app: Flask, snapshot_file: RateSnapshotFile, interval: float, lock_path: Path):
+        super().__init__('rate-snapshot-publisher', lock_path)
+        self._app: Flask = app
+        self._snapshot_file: RateSnapshotFile = snapshot_file
+        self._interval: float = interval
+        self._published_generations: Optional[Tuple[int, ...]] = None
+
+    def publish(self) -> None:
+        generations = invalidation_bus.get_generations(*SNAPSHOT_TABLE_NAMES)
+        if generations == self._published_generations:
+            return
+        with self._app.app_context():
+            snapshot = load_rate_snapshot(get_data_version(), generations)
+        self._snapshot_file.write(snapshot)
+        self._published_generations = generations
+        logger.info('Published rate snapshot of data version %d.', snapshot.data_version)
+
+    def _lead(self) -> None:
+        self._run_periodically(self.publish, self._interval, 'Failed to publish the rate snapshot.')
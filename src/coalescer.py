@@ -0,0 +1,161 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from flask import Flask
+from sqlalchemy.exc import SQLAlchemyError
+
+from .exceptions import QueueFullError, UpdateError, VersionMismatchError
+from .models.database import db
+
+logger = logging.getLogger(__name__)
+
+
+class WriteCoalescer:
+    """Asynchronous write path which coalesces updates of the same record.
+
+    Updates are merged per record id, the last written value of a field wins. A background flusher
+    applies everything collected within the flush interval in a single transaction. The queue is
+    bounded by the number of distinct records, submitting a new record into the full queue waits for
+    the next flush and fails if it does not happen in time.
+
+    A failed batch is requeued and retried with the next flushes. Records which failed too many
+    times are applied one by one, so a single bad record, e.g. one violating a constraint, is
+    dropped without blocking the others. The pending updates are flushed once more when the worker
+    process exits.
+
+    NOTE: updates are coalesced per worker process.
+    """
+    _MAX_FLUSH_ATTEMPTS: int = 3
+
+    def __init__(self, model: Type[db.Model],
+                 on_flushed: Optional[Callable[[List[db.Model]], None]] = None):
+        self._model: Type[db.Model] = model
+        self._on_flushed: Optional[Callable[[List[db.Model]], None]] = on_flushed
+        self._app: Optional[Flask] = None
+        self._flush_interval: float = 0
+        self._max_pending: int = 0
+        self._submit_timeout: float = 0
+        self._condition: threading.Condition = threading.Condition()
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._in_flight: Dict[int, Dict[str, Any]] = {}
+        # NOTE: failed flushes per record id, reset once the record is applied
+        self._failed_attempts: Dict[int, int] = {}
+        self._pid: Optional[int] = None
+
+    @property
+    def is_enabled(self) -> bool:
+        return self._app is not None
+
+    def init_app(self, app: Flask, flush_interval: float, max_pending: int,
+                 submit_timeout: float) -> None:
+        self._app = app
+        self._flush_interval = flush_interval
+        self._max_pending = max_pending
+        self._submit_timeout = submit_timeout
+
+    def submit(self, record_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Queues the update.
+        Raises:
+            QueueFullError: the queue stayed full for the whole submit timeout
+        Returns:
+            all pending changes of the record, including the submitted ones
+        """
+        self._ensure_flusher_started()
+        deadline = time.monotonic() + self._submit_timeout
+        with self._condition:
+            while record_id not in self._pending and len(self._pending) >= self._max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    raise QueueFullError(f'Write queue of {self._model.__name__.lower()} is full.')
+            pending = self._pending.setdefault(record_id, {})
+            pending.update(data)
+            return dict(pending)
+
+    def get_pending(self, record_id: int) -> Optional[Dict[str, Any]]:
+        """Returns not yet committed changes of the record, so a client can read its own writes."""
+        with self._condition:
+            if record_id not in self._pending and record_id not in self._in_flight:
+                return None
+            return {**self._in_flight.get(record_id, {}), **self._pending.get(record_id, {})}
+
+    def flush(self) -> None:
+        with self._condition:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            self._in_flight = batch
+            self._condition.notify_all()
+
+        try:
+            with self._app.app_context():
+                try:
+                    records = self._model.bulk_update(batch)
+                    self._reset_failed_attempts(batch)
+                except (UpdateError, VersionMismatchError, SQLAlchemyError) as e:
+                    records = self._retry(batch, e)
+                logger.info('Flushed %d coalesced %s updates.', len(records),
+                            self._model.__name__.lower())
+                if self._on_flushed and records:
+                    self._on_flushed(records)
+        finally:
+            with self._condition:
+                self._in_flight = {}
+
+    def _retry(self, batch: Dict[int, Dict[str, Any]], error: Exception) -> List[db.Model]:
+        """Requeues the failed batch, the records which failed too many times are applied one by one.
+        Returns:
+            the records applied one by one
+        """
+        exhausted = {}
+        with self._condition:
+            for record_id, data in batch.items():
+                attempts = self._failed_attempts.get(record_id, 0) + 1
+                if attempts >= self._MAX_FLUSH_ATTEMPTS:
+                    exhausted[record_id] = data
+                    continue
+                self._failed_attempts[record_id] = attempts
+                self._pending[record_id] = {**data, **self._pending.get(record_id, {})}
+        logger.error('Failed to flush %d coalesced %s updates, requeued %d of them. Error: %s',
+                     len(batch), self._model.__name__.lower(), len(batch) - len(exhausted), error)
+
+        records = []
+        for record_id, data in exhausted.items():
+            try:
+                records.extend(self._model.bulk_update({record_id: data}))
+            except (UpdateError, VersionMismatchError, SQLAlchemyError) as e:
+                logger.error('Dropped coalesced update of %s with id: %s, it failed %d times. '
+                             'Update: %s. Error: %s', self._model.__name__.lower(), record_id,
+                             self._MAX_FLUSH_ATTEMPTS, data, e)
+        self._reset_failed_attempts(exhausted)
+        return records
+
+    def _reset_failed_attempts(self, batch: Dict[int, Dict[str, Any]]) -> None:
+        with self._condition:
+            for record_id in batch:
+                self._failed_attempts.pop(record_id, None)
+
+    def _ensure_flusher_started(self) -> None:
+        # NOTE: threads do not survive a fork, so the flusher is started in every worker process
+        if self._pid == os.getpid():
+            return
+        with self._condition:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name=f'{self._model.__name__.lower()}-write-flusher',
+                             daemon=True).start()
+            # NOTE: the flusher is a daemon thread, the updates queued since its last run are
+            #  flushed synchronously when the worker process exits
+            atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self._flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.exception('Coalesced writes flusher failed. Error: %s', e)
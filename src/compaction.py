@@ -0,0 +1,281 @@
+import datetime
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from flask import Flask
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .models import db, Rate, BestRate, RateCandle, RateCompactionState, ChangeLog
+from .invalidation import invalidation_bus
+from .enums import RateOhlcIntervals, ChangeOperationsInternal
+from .leadership import LeaderElectedWorker
+from .api.v1.services.rate_service import RateService
+
+logger = logging.getLogger(__name__)
+
+# NOTE: candles are aligned to the multiples of their length since the epoch, like strftime buckets
+_INTERVAL_SECONDS: Dict[str, int] = {
+    RateOhlcIntervals.minute.value: 60,
+    RateOhlcIntervals.hour.value: 60 * 60,
+    RateOhlcIntervals.day.value: 24 * 60 * 60,
+}
+_EPOCH: datetime.datetime = datetime.datetime(1970, 1, 1)
+
+
+def get_candle_start(created: datetime.datetime, interval: str) -> datetime.datetime:
+    seconds = _INTERVAL_SECONDS[interval]
+    return _EPOCH + datetime.timedelta(seconds=(created - _EPOCH) // datetime.timedelta(seconds=seconds)
+                                       * seconds)
+
+
+class RateCompactor(LeaderElectedWorker):
+    """Keeps the rates table bounded by the retention policies.
+
+    The rates older than the raw retention are downsampled into the candles of every retained
+    interval and deleted, the candles older than their retention are deleted too. All of it is done
+    in small batches, every batch is a short transaction, so request writers wait for the write
+    lock for a single batch at most. Freed pages are returned by the incremental vacuum and the
+    planner statistics are refreshed by ANALYZE from time to time. The database is switched to the
+    incremental auto vacuum offline, by scripts/enable_incremental_vacuum.py.
+
+    Downsampling walks the rates in the (created, id) order and merges every batch into the stored
+    candles, so a candle may be built by several batches. The current best rates are downsampled
+    but kept until they are not the best ones anymore.
+
+    Every deleted batch is recorded in the change log, published to the other processes and to the
+    rate events subscribers, so the clients syncing by the change log or by the events and the caches
+    drop the expired rates too. The delete entries
+    replace the create entries of the same rates when the change log is compacted.
+
+    Like the ingestion, it runs only in the process holding the lock file.
+    """
+    # NOTE: auto_vacuum modes of the SQLite header
+    _INCREMENTAL_AUTO_VACUUM: int = 2
+    # NOTE: rows sampled per index by ANALYZE, it is an approximate but bounded pass
+    _ANALYSIS_LIMIT: int = 1000
+
+    def __init__(self, app: Flask, raw_retention: float, candle_retention: Dict[str, Optional[float]],
+                 interval: float, batch_size: int, batch_pause: float, vacuum_pages: int,
+                 analyze_interval: float, lock_path: Path):
+        super().__init__('rate-compactor', lock_path)
+        self._app: Flask = app
+        self._raw_retention: datetime.timedelta = datetime.timedelta(seconds=raw_retention)
+        self._candle_retention: Dict[str, Optional[float]] = candle_retention
+        self._interval: float = interval
+        self._batch_size: int = batch_size
+        self._batch_pause: float = batch_pause
+        self._vacuum_pages: int = vacuum_pages
+        self._analyze_interval: float = analyze_interval
+        self._analyzed_at: float = time.monotonic()
+        self._rate_service: RateService = RateService()
+
+    def compact(self) -> None:
+        with self._app.app_context():
+            now = datetime.datetime.utcnow()
+            downsampled, deleted = self._compact_rates(now - self._raw_retention)
+            deleted_candles = self._delete_expired_candles(now)
+            if time.monotonic() - self._analyzed_at >= self._analyze_interval:
+                self._analyze()
+
+        if downsampled or deleted or deleted_candles:
+            logger.info('Rates compaction downsampled %d rates, deleted %d rates and %d candles.',
+                        downsampled, deleted, deleted_candles)
+
+    def _compact_rates(self, cutoff: datetime.datetime) -> Tuple[int, int]:
+        downsampled, deleted = 0, 0
+        while not self._stopped.is_set():
+            batch_downsampled = self._downsample_batch(cutoff)
+            batch_deleted = self._delete_downsampled_batch()
+            downsampled += batch_downsampled
+            deleted += batch_deleted
+            if batch_downsampled < self._batch_size and batch_deleted < self._batch_size:
+                break
+            self._stopped.wait(self._batch_pause)
+        return downsampled, deleted
+
+    def _downsample_batch(self, cutoff: datetime.datetime) -> int:
+        query = db.session.query(Rate.id, Rate.base_id, Rate.currency_id, Rate.operation_type, Rate.is_cash,
+                                 Rate.created, Rate.rate) \
+            .filter(Rate.created < cutoff)
+        watermark = RateCompactionState.get_watermark()
+        if watermark is not None:
+            query = query.filter(db.tuple_(Rate.created, Rate.id) > watermark)
+        rates = query.order_by(Rate.created, Rate.id).limit(self._batch_size).all()
+        if not rates:
+            db.session.rollback()
+            return 0
+
+        # NOTE: (base id, currency id, interval, start, operation type, is cash) -> candle values
+        candles: Dict[tuple, Dict[str, object]] = {}
+        for rate in rates:
+            for interval in self._candle_retention:
+                key = (rate.base_id, rate.currency_id, interval, get_candle_start(rate.created, interval),
+                       rate.operation_type, rate.is_cash)
+                candle = candles.get(key)
+                if candle is None:
+                    candles[key] = {'open': rate.rate, 'high': rate.rate, 'low': rate.rate, 'close': rate.rate,
+                                    'ticks': 1, 'opened': rate.created, 'closed': rate.created}
+                    continue
+                candle['high'] = max(candle['high'], rate.rate)
+                candle['low'] = min(candle['low'], rate.rate)
+                candle['close'] = rate.rate
+                candle['closed'] = rate.created
+                candle['ticks'] += 1
+
+        if candles:
+            self._merge_candles(candles)
+        RateCompactionState.set_watermark(rates[-1].created, rates[-1].id)
+        db.session.commit()
+        return len(rates)
+
+    @staticmethod
+    def _merge_candles(candles: Dict[tuple, Dict[str, object]]) -> None:
+        table = RateCandle.__table__
+        values = [
+            {
+                'BaseCurrencyId': base_id, 'CurrencyId': currency_id, 'Interval': interval, 'Start': start,
+                'OperationType': operation_type, 'IsCash': is_cash, 'Open': candle['open'],
+                'High': candle['high'], 'Low': candle['low'], 'Close': candle['close'], 'Ticks': candle['ticks'],
+                'Opened': candle['opened'], 'Closed': candle['closed'],
+            }
+            for (base_id, currency_id, interval, start, operation_type, is_cash), candle in candles.items()
+        ]
+        statement = sqlite_insert(table).values(values)
+        # NOTE: batches go in the creation order, so a stored candle keeps its open and takes the close
+        statement = statement.on_conflict_do_update(
+            index_elements=[column for column in table.primary_key.columns],
+            set_={
+                'High': db.func.max(table.c.High, statement.excluded.High),
+                'Low': db.func.min(table.c.Low, statement.excluded.Low),
+                'Close': statement.excluded.Close,
+                'Closed': statement.excluded.Closed,
+                'Ticks': table.c.Ticks + statement.excluded.Ticks,
+            },
+        )
+        db.session.execute(statement)
+
+    def _delete_downsampled_batch(self) -> int:
+        watermark = RateCompactionState.get_watermark()
+        if watermark is None:
+            db.session.rollback()
+            return 0
+
+        best_rate_ids = db.session.query(BestRate.rate_id)
+        rates = db.session.query(Rate.id, Rate.currency_id, Rate.base_id, Rate.rate, Rate.operation_type,
+                                 Rate.is_cash) \
+            .filter(db.tuple_(Rate.created, Rate.id) <= watermark, Rate.id.notin_(best_rate_ids)) \
+            .order_by(Rate.created, Rate.id) \
+            .limit(self._batch_size) \
+            .all()
+        if rates:
+            ids = [rate.id for rate in rates]
+            # NOTE: the exclusion is checked again by the DELETE, a rate might have become the best one
+            #  since the SELECT, e.g. when a better one was deleted. The DELETE takes the write lock,
+            #  so the rates it kept stay as they are until the commit
+            Rate.query \
+                .filter(Rate.id.in_(ids), Rate.id.notin_(best_rate_ids)) \
+                .delete(synchronize_session=False)
+            kept_ids = {rate_id for rate_id, in db.session.query(Rate.id).filter(Rate.id.in_(ids))}
+            rates = [rate for rate in rates if rate.id not in kept_ids]
+            for rate in rates:
+                ChangeLog.record(Rate.__tablename__, rate.id, ChangeOperationsInternal.deleted.value)
+        db.session.commit()
+        if rates:
+            # NOTE: published per batch, the caches would serve the deleted rates until the last one
+            invalidation_bus.publish(Rate.__tablename__, [rate.id for rate in rates])
+            self._rate_service.publish_deleted_rates(rates)
+        self._vacuum()
+        return len(rates)
+
+    def _delete_expired_candles(self, now: datetime.datetime) -> int:
+        deleted = 0
+        for interval, retention in self._candle_retention.items():
+            if retention is None:
+                continue
+            cutoff = now - datetime.timedelta(seconds=retention)
+            while not self._stopped.is_set():
+                rowid = db.literal_column('rowid')
+                expired = db.select(rowid) \
+                    .select_from(RateCandle.__table__) \
+                    .where(RateCandle.interval == interval, RateCandle.start < cutoff) \
+                    .limit(self._batch_size)
+                batch_deleted = RateCandle.query \
+                    .filter(rowid.in_(expired)) \
+                    .delete(synchronize_session=False)
+                db.session.commit()
+                self._vacuum()
+                deleted += batch_deleted
+                if batch_deleted < self._batch_size:
+                    break
+                self._stopped.wait(self._batch_pause)
+        return deleted
+
+    def _vacuum(self) -> None:
+        # NOTE: a no-op unless the database is in the incremental auto vacuum mode. The pragma frees
+        #  a page per step and the driver steps a statement only once, a script is run to the end
+        db.session.connection().connection.executescript(f'PRAGMA incremental_vacuum({self._vacuum_pages})')
+        db.session.commit()
+
+    def _analyze(self) -> None:
+        db.session.execute(db.text(f'PRAGMA analysis_limit = {self._ANALYSIS_LIMIT}'))
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+        self._analyzed_at = time.monotonic()
+        logger.info('Database statistics were refreshed.')
+
+    def _check_auto_vacuum(self) -> None:
+        # NOTE: the mode of an existing database is switched only by a full VACUUM, which rewrites
+        #  the whole file under the write lock, so it is not done by a serving process
+        with self._app.app_context():
+            with db.engine.connect() as connection:
+                auto_vacuum = connection.exec_driver_sql('PRAGMA auto_vacuum').scalar()
+        if auto_vacuum != self._INCREMENTAL_AUTO_VACUUM:
+            logger.warning('The database is not in the incremental auto vacuum mode, the pages freed by '
+                           'the compaction are not returned. Run scripts/enable_incremental_vacuum.py '
+                           'while the API is stopped.')
+
+    def _lead(self) -> None:
+        try:
+            self._check_auto_vacuum()
+        except Exception as e:
+            logger.exception('Failed to check the auto vacuum mode of the database. Error: %s', e)
+
+        self._run_periodically(self.compact, self._interval, 'Failed to compact the rates.')
+
+
+class ChangeLogCompactor(LeaderElectedWorker):
+    """Removes the change log entries superseded by a newer entry of the same record.
+
+    The entries written since the last run are walked in ranges of sequence numbers, every range is
+    compacted by a short transaction. The progress is kept in memory, so a new leader walks the
+    whole log once.
+
+    Like the ingestion, it runs only in the process holding the lock file.
+    """
+
+    def __init__(self, app: Flask, interval: float, batch_size: int, batch_pause: float, lock_path: Path):
+        super().__init__('change-log-compactor', lock_path)
+        self._app: Flask = app
+        self._interval: float = interval
+        self._batch_size: int = batch_size
+        self._batch_pause: float = batch_pause
+        # NOTE: the entries up to it are compacted
+        self._compacted_seq: int = 0
+
+    def compact(self) -> None:
+        removed = 0
+        with self._app.app_context():
+            last_seq = db.session.query(db.func.max(ChangeLog.seq)).scalar() or 0
+            while self._compacted_seq < last_seq and not self._stopped.is_set():
+                until_seq = min(self._compacted_seq + self._batch_size, last_seq)
+                removed += ChangeLog.compact(self._compacted_seq, until_seq)
+                self._compacted_seq = until_seq
+                self._stopped.wait(self._batch_pause)
+
+        if removed:
+            logger.info('Change log compaction removed %d entries up to seq %d.', removed, self._compacted_seq)
+
+    def _lead(self) -> None:
+        self._run_periodically(self.compact, self._interval, 'Failed to compact the change log.')
@@ -0,0 +1,148 @@
+import gzip
+import logging
+import threading
+from collections import OrderedDict
+from functools import wraps
+from http import HTTPStatus
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+import brotli
+import zstandard
+from flask import Flask, make_response, request, Response
+
+logger = logging.getLogger(__name__)
+
+# NOTE: called with the body and the level, returns the compressed body
+Compressor = Callable[[bytes, int], bytes]
+
+
+# NOTE: ordered by preference, it breaks ties between equally acceptable encodings
+_COMPRESSORS: Dict[str, Compressor] = {
+    'br': lambda body, level: brotli.compress(body, quality=level),
+    'zstd': lambda body, level: zstandard.ZstdCompressor(level=level).compress(body),
+    # NOTE: mtime is fixed, so the same body is always compressed to the same bytes
+    'gzip': lambda body, level: gzip.compress(body, compresslevel=level, mtime=0),
+}
+# NOTE: headers of the body, they are set again for the compressed one
+_BODY_HEADERS: Tuple[str, ...] = ('Content-Length', 'Content-Type', 'Content-Encoding')
+
+
+class _CachedResponse(NamedTuple):
+    status: int
+    mimetype: str
+    # NOTE: the headers set by the view, the ones of the after request handlers are set per request
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+
+def compression_cache(get_version: Callable[[], Hashable]) -> Callable:
+    """Keeps the compressed responses of the view method until the version of its data changes.
+
+    The cache is looked up before the view method is called, so a hit skips the view, its queries
+    and the serialization. The version is read before the view method is called too, so a response
+    is never stored under a version older than the data it was built from.
+    """
+
+    def decorator(view_method: Callable) -> Callable:
+        @wraps(view_method)
+        def wrapper(*args, **kwargs):
+            cache_key = (request.url, get_version())
+            cached_response = response_compressor.get_cached_response(cache_key)
+            if cached_response is not None:
+                return cached_response
+
+            response = make_response(view_method(*args, **kwargs))
+            response.compression_cache_key = cache_key
+            response.compression_cache_headers = [(name, value) for name, value in response.headers
+                                                  if name not in _BODY_HEADERS]
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+class ResponseCompressor:
+    """Compresses responses with the best encoding accepted by the client.
+
+    Small responses are sent as is, compressing them costs more than it saves. Compressed responses
+    of the views marked with compression_cache are kept in a bounded LRU cache and served without
+    calling the views.
+
+    NOTE: entries are cached per worker process.
+    """
+    _COMPRESSIBLE_MIMETYPES: Tuple[str, ...] = ('application/json', 'text/plain', 'text/html')
+
+    def __init__(self):
+        self._compressors: Dict[str, Compressor] = _COMPRESSORS
+        self._min_size: int = 1024
+        self._levels: Dict[str, int] = {}
+        self._max_entries: int = 256
+        self._lock: threading.Lock = threading.Lock()
+        self._entries: Dict[Tuple[Hashable, str], _CachedResponse] = OrderedDict()
+
+    def init_app(self, app: Flask, min_size: int, levels: Dict[str, int], max_entries: int) -> None:
+        self._min_size = min_size
+        self._levels = levels
+        self._max_entries = max_entries
+        app.after_request(self.compress)
+        logger.info('Response compression with %s is enabled.', ', '.join(self._compressors))
+
+    def get_cached_response(self, cache_key: Hashable) -> Optional[Response]:
+        """Returns the compressed response in the encoding accepted by the client, if it is cached."""
+        encoding = request.accept_encodings.best_match(list(self._compressors))
+        if encoding is None:
+            return None
+        cached_response = self._get_cached(cache_key, encoding)
+        if cached_response is None:
+            return None
+
+        response = Response(cached_response.body, cached_response.status, headers=cached_response.headers,
+                            mimetype=cached_response.mimetype)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def compress(self, response: Response) -> Response:
+        if not self._is_compressible(response):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(list(self._compressors))
+        if encoding is None:
+            return response
+
+        body = self._compressors[encoding](response.get_data(), self._levels.get(encoding, 6))
+        cache_key = getattr(response, 'compression_cache_key', None)
+        if cache_key is not None:
+            self._store(cache_key, encoding, _CachedResponse(response.status_code, response.mimetype,
+                                                             response.compression_cache_headers, body))
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def _is_compressible(self, response: Response) -> bool:
+        # NOTE: streamed responses, e.g. server-sent events, have no body to compress up front
+        return (response.status_code == HTTPStatus.OK
+                and not response.direct_passthrough
+                and not response.is_streamed
+                and 'Content-Encoding' not in response.headers
+                and response.mimetype in self._COMPRESSIBLE_MIMETYPES
+                and (response.content_length or 0) >= self._min_size)
+
+    def _get_cached(self, cache_key: Hashable, encoding: str) -> Optional[_CachedResponse]:
+        with self._lock:
+            cached_response = self._entries.get((cache_key, encoding))
+            if cached_response is not None:
+                self._entries.move_to_end((cache_key, encoding))
+            return cached_response
+
+    def _store(self, cache_key: Hashable, encoding: str, cached_response: _CachedResponse) -> None:
+        with self._lock:
+            self._entries[(cache_key, encoding)] = cached_response
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+response_compressor = ResponseCompressor()
@@ -1,3 +1,5 @@
+import os
+import tempfile
 from pathlib import Path
 
 # names
@@ -11,6 +13,155 @@ RESOURCES_DIR = Path.joinpath(PROJECT_DIR, RESOURCES_DIR_NAME)
 
 # DB
 DB_URI = Path.joinpath(RESOURCES_DIR, DB_NAME)
+# NOTE: GET requests use a separate connection pool which can not write
+DB_READ_ONLY_ENGINE_ENABLED = os.environ.get('DB_READ_ONLY_ENGINE_ENABLED', '').lower() == 'true'
+# NOTE: rates are stored as integers of 10^-RATE_STORAGE_SCALE units instead of DECIMAL
+RATE_FIXED_POINT_STORAGE_ENABLED = os.environ.get('RATE_FIXED_POINT_STORAGE_ENABLED', '').lower() == 'true'
+RATE_STORAGE_SCALE = 5
+
+# WORKERS
+# NOTE: "sync", "gthread" or "gevent", the gunicorn worker class is picked by it in gunicorn.conf.py
+WORKER_MODE = os.environ.get('WORKER_MODE') or 'sync'
+WORKER_MODES = ('sync', 'gthread', 'gevent')
+# NOTE: requests served at once by a gthread worker
+WORKER_THREADS = 8
+# NOTE: connections served at once by a gevent worker
+WORKER_CONNECTIONS = 1000
+# NOTE: threads running the SQLite calls of a gevent worker, a call blocks only its greenlet
+WORKER_DB_THREADS = 8
 
 # SCHEMAS
 DATETIME_FORMAT = '%d-%m-%Y %H:%M%:%S'
+
+# EVENTS
+# NOTE: cross-worker events relaying is enabled only when the socket dir is set
+EVENTS_SOCKET_DIR = os.environ.get('EVENTS_SOCKET_DIR')
+EVENTS_MAX_PENDING = 100
+EVENTS_HEARTBEAT_INTERVAL = 15
+
+# INGESTION
+# NOTE: JSON file with the providers list, the ingestion is disabled when it is not set
+INGESTION_CONFIG_PATH = os.environ.get('INGESTION_CONFIG_PATH')
+INGESTION_MAX_WORKERS = 4
+INGESTION_LOCK_PATH = Path(tempfile.gettempdir()).joinpath('currency-api-ingestion.lock')
+
+# WRITE COALESCING
+RATE_WRITE_COALESCING_ENABLED = os.environ.get('RATE_WRITE_COALESCING_ENABLED', '').lower() == 'true'
+RATE_WRITE_COALESCING_INTERVAL = 0.25
+RATE_WRITE_COALESCING_MAX_PENDING = 10000
+RATE_WRITE_COALESCING_SUBMIT_TIMEOUT = 1
+
+# IDEMPOTENCY
+IDEMPOTENCY_MAX_KEYS = 10000
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+# NOTE: a key of a request which did not complete in that time, e.g. its worker was killed, can be reused
+IDEMPOTENCY_RESERVATION_TIMEOUT = 60
+
+# READ MODELS
+# NOTE: serves GET /rates from the in-memory columnar store instead of the ORM
+RATE_STORE_ENABLED = os.environ.get('RATE_STORE_ENABLED', '').lower() == 'true'
+# NOTE: the store reads rates from a snapshot file shared by all workers when the path is set
+RATE_SNAPSHOT_PATH = os.environ.get('RATE_SNAPSHOT_PATH')
+# NOTE: the publisher polls shared memory, the database is queried only after writes
+RATE_SNAPSHOT_INTERVAL = 0.05
+RATE_SNAPSHOT_LOCK_PATH = Path(tempfile.gettempdir()).joinpath('currency-api-rate-snapshot.lock')
+
+# RETENTION
+RATE_RETENTION_ENABLED = os.environ.get('RATE_RETENTION_ENABLED', '').lower() == 'true'
+# NOTE: older rates are downsampled into candles and deleted, the current best rates are kept
+RATE_RAW_RETENTION = 7 * 24 * 60 * 60
+# NOTE: candle intervals to keep with their retention in seconds, None keeps them forever
+RATE_CANDLE_RETENTION = {
+    '1m': 90 * 24 * 60 * 60,
+    '1h': 90 * 24 * 60 * 60,
+    '1d': None,
+}
+RATE_COMPACTION_INTERVAL = 60 * 60
+# NOTE: rows written by one transaction, the write lock is released between the batches
+RATE_COMPACTION_BATCH_SIZE = 2000
+RATE_COMPACTION_BATCH_PAUSE = 0.05
+# NOTE: free pages returned to the file system after every batch
+RATE_COMPACTION_VACUUM_PAGES = 1000
+RATE_COMPACTION_ANALYZE_INTERVAL = 24 * 60 * 60
+RATE_COMPACTION_LOCK_PATH = Path(tempfile.gettempdir()).joinpath('currency-api-rate-compaction.lock')
+
+# CHANGE LOG
+CHANGE_LOG_COMPACTION_INTERVAL = 60
+# NOTE: sequence numbers compacted by one transaction, the write lock is released between the batches
+CHANGE_LOG_COMPACTION_BATCH_SIZE = 5000
+CHANGE_LOG_COMPACTION_BATCH_PAUSE = 0.05
+CHANGE_LOG_COMPACTION_LOCK_PATH = Path(tempfile.gettempdir()).joinpath('currency-api-change-log-compaction.lock')
+
+# INVALIDATION
+# NOTE: shared table generations file, defaults to a file next to the database
+INVALIDATION_GENERATIONS_PATH = os.environ.get('INVALIDATION_GENERATIONS_PATH')
+
+# RATE LIMITING
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '').lower() == 'true'
+# NOTE: a client can burst up to the capacity and then makes refill rate requests per second
+RATE_LIMIT_CAPACITY = 100
+RATE_LIMIT_REFILL_RATE = 10
+# NOTE: the shared buckets table takes 24 bytes per slot
+RATE_LIMIT_SLOTS = 2 ** 16
+RATE_LIMIT_PATH = Path(tempfile.gettempdir()).joinpath('currency-api-rate-limits')
+# NOTE: comma separated keys of the clients limited by their X-Api-Key, the others are limited by their address
+RATE_LIMIT_API_KEYS = frozenset(key.strip() for key in os.environ.get('RATE_LIMIT_API_KEYS', '').split(',')
+                                if key.strip())
+# NOTE: tokens taken by a request to a collection, other requests take one
+RATE_LIMIT_COLLECTION_COST = 10
+
+# COMPRESSION
+RESPONSE_COMPRESSION_ENABLED = os.environ.get('RESPONSE_COMPRESSION_ENABLED', '').lower() == 'true'
+# NOTE: smaller responses fit into a few packets anyway
+RESPONSE_COMPRESSION_MIN_SIZE = 1024
+# NOTE: fast levels, the compressed collections are cached until their data changes
+RESPONSE_COMPRESSION_LEVELS = {'br': 5, 'zstd': 3, 'gzip': 6}
+RESPONSE_COMPRESSION_CACHE_MAX_ENTRIES = 256
+
+# LOGGING
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+# NOTE: records are dropped when the writer thread falls behind by that many of them
+LOG_QUEUE_SIZE = 10000
+# NOTE: shares of the info records kept for the hot read paths, by logger names
+LOG_SAMPLE_RATES = {
+    'src.api.v1.services.rate_service.reads': 0.01,
+    'src.api.v1.services.currency_service.reads': 0.01,
+    'src.api.v1.services.change_service.reads': 0.01,
+    'src.api.v1.services.basket_service.reads': 0.01,
+}
+REQUEST_ID_HEADER = 'X-Request-Id'
+REQUEST_ID_MAX_LENGTH = 128
+
+# SLOW QUERIES
+SLOW_QUERY_LOG_ENABLED = os.environ.get('SLOW_QUERY_LOG_ENABLED', '').lower() == 'true'
+SLOW_QUERY_THRESHOLD = 0.1
+SLOW_QUERY_MAX_RECORDS = 100
+SLOW_QUERY_LOG_PATH = Path(os.environ.get('SLOW_QUERY_LOG_PATH') or RESOURCES_DIR.joinpath('slow_queries.log'))
+
+# TRAFFIC CAPTURE
+# NOTE: served requests are recorded for scripts/replay.py
+TRAFFIC_CAPTURE_ENABLED = os.environ.get('TRAFFIC_CAPTURE_ENABLED', '').lower() == 'true'
+TRAFFIC_CAPTURE_PATH = Path(os.environ.get('TRAFFIC_CAPTURE_PATH') or RESOURCES_DIR.joinpath('traffic.jsonl'))
+# NOTE: share of the requests recorded
+TRAFFIC_CAPTURE_SAMPLE_RATE = float(os.environ.get('TRAFFIC_CAPTURE_SAMPLE_RATE') or 1)
+# NOTE: larger bodies are not recorded
+TRAFFIC_CAPTURE_MAX_BODY_SIZE = 4096
+
+# MEMORY PROFILING
+MEMORY_PROFILER_ENABLED = os.environ.get('MEMORY_PROFILER_ENABLED', '').lower() == 'true'
+# NOTE: frames kept per allocation, the sites are reported by their innermost frame
+MEMORY_PROFILER_FRAMES = 1
+MEMORY_PROFILER_SNAPSHOT_INTERVAL = 5 * 60
+# NOTE: a site growing in that many snapshots in a row is reported as a suspected leak
+MEMORY_PROFILER_LEAK_SNAPSHOTS = 3
+MEMORY_PROFILER_TOP_SITES = 20
+
+# ANALYTICS
+ANOMALY_MONITOR_ENABLED = os.environ.get('ANOMALY_MONITOR_ENABLED', '').lower() == 'true'
+# NOTE: the rates are checked only when they were written since the last check
+ANOMALY_MONITOR_INTERVAL = 60
+ANOMALY_MONITOR_LOCK_PATH = Path(tempfile.gettempdir()).joinpath('currency-api-anomaly-monitor.lock')
+
+# DEBUG
+# NOTE: the debug endpoints are disabled when the token is not set
+DEBUG_TOKEN = os.environ.get('DEBUG_TOKEN')
@@ -1,5 +1,11 @@
 from .currency_enums import (CurrencyInternalReprFieldNames, CurrencyStatuesInternal,
                              CurrencyExternalReprFieldNames, CurrencyStatuesExternal)
 from .rate_enums import (RateExternalReprFieldFieldNames, RateInternalReprFieldFieldNames,
-                         RateOperationTypes)
+                         RateOperationTypes, RateOhlcIntervals, RateCandleFieldNames,
+                         RateAnomalyFieldNames, RateEventTypes)
 from .response_enums import ResponseStatuses, ResponseFields
+from .change_enums import (ChangeExternalReprFieldNames, ChangeInternalReprFieldNames,
+                           ChangeOperationsExternal, ChangeOperationsInternal)
+from .debug_enums import (SlowQueryFieldNames, MemoryProfileFieldNames, EndpointMemoryFieldNames,
+                          AllocationSiteFieldNames, MemoryProfileStages)
+from .basket_enums import BasketExternalReprFieldNames, BasketInternalReprFieldNames
@@ -0,0 +1,40 @@
+from enum import Enum, unique
+
+
+@unique
+class BasketExternalReprFieldNames(Enum):
+    id = 'id'
+    name_ = 'name'
+    base_currency = 'baseCurrency'
+    components = 'components'
+    currency = 'currency'
+    weight = 'weight'
+    value = 'value'
+    missing_currencies = 'missingCurrencies'
+    data_version = 'dataVersion'
+    created = 'created'
+    updated = 'updated'
+    version = 'version'
+    links = 'metadata'
+    links_self = 'self'
+    links_collection = 'collection'
+
+
+@unique
+class BasketInternalReprFieldNames(Enum):
+    id = 'id'
+    name_ = 'name'
+    base_currency = 'base_currency'
+    base_id = 'base_id'
+    components = 'components'
+    currency = 'currency'
+    currency_id = 'currency_id'
+    weight = 'weight'
+    basket_id = 'basket_id'
+    value = 'value'
+    missing_currencies = 'missing_currencies'
+    data_version = 'data_version'
+    created = 'created'
+    updated = 'updated'
+    version = 'version'
+    links = '_links'
@@ -0,0 +1,39 @@
+from enum import Enum, unique
+
+
+@unique
+class ChangeExternalReprFieldNames(Enum):
+    seq = 'seq'
+    table = 'table'
+    record_id = 'id'
+    operation = 'operation'
+    record = 'record'
+    since = 'since'
+    limit = 'limit'
+    last_seq = 'lastSeq'
+
+
+@unique
+class ChangeInternalReprFieldNames(Enum):
+    seq = 'seq'
+    table = 'table'
+    record_id = 'record_id'
+    operation = 'operation'
+    record = 'record'
+    since = 'since'
+    limit = 'limit'
+    last_seq = 'last_seq'
+
+
+@unique
+class ChangeOperationsExternal(Enum):
+    created = 'created'.upper()
+    updated = 'updated'.upper()
+    deleted = 'deleted'.upper()
+
+
+@unique
+class ChangeOperationsInternal(Enum):
+    created = 'c'
+    updated = 'u'
+    deleted = 'd'
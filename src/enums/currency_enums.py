@@ -9,6 +9,9 @@ class CurrencyExternalReprFieldNames(Enum):
     code = 'code'
     created = 'created'
     updated = 'updated'
+    version = 'version'
+    query = 'q'
+    limit = 'limit'
     links = 'metadata'
     links_self = 'self'
     links_collection = 'collection'
@@ -22,6 +25,9 @@ class CurrencyInternalReprFieldNames(Enum):
     code = 'code'
     created = 'created'
     updated = 'updated'
+    version = 'version'
+    query = 'query'
+    limit = 'limit'
     links = '_links'
 
 
@@ -0,0 +1,50 @@
+from enum import Enum, unique
+
+
+@unique
+class SlowQueryFieldNames(Enum):
+    recorded_at = 'recordedAt'
+    duration = 'durationMs'
+    statement = 'statement'
+    parameters = 'parameters'
+    endpoint = 'endpoint'
+    request_id = 'requestId'
+    plan = 'plan'
+
+
+@unique
+class MemoryProfileFieldNames(Enum):
+    traced = 'tracedBytes'
+    traced_peak = 'tracedPeakBytes'
+    snapshot_at = 'snapshotAt'
+    endpoints = 'endpoints'
+    top_sites = 'topSites'
+    suspected_leaks = 'suspectedLeaks'
+
+
+@unique
+class EndpointMemoryFieldNames(Enum):
+    endpoint = 'endpoint'
+    stage = 'stage'
+    count = 'count'
+    net_avg = 'netBytesAvg'
+    peak_avg = 'peakBytesAvg'
+    peak_max = 'peakBytesMax'
+
+
+@unique
+class AllocationSiteFieldNames(Enum):
+    site = 'site'
+    size = 'sizeBytes'
+    count = 'count'
+    size_diff = 'sizeDiffBytes'
+    count_diff = 'countDiff'
+    growth_snapshots = 'growthSnapshots'
+
+
+@unique
+class MemoryProfileStages(Enum):
+    request = 'request'
+    query = 'query'
+    dump = 'dump'
+    encode = 'encode'
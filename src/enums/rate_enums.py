@@ -9,8 +9,15 @@ class RateExternalReprFieldFieldNames(Enum):
     is_cash = 'isCash'
     base_currency = 'baseCurrency'
     currency = 'currency'
+    rate_id = 'rateId'
     created = 'created'
     updated = 'updated'
+    version = 'version'
+    interval = 'interval'
+    date_from = 'from'
+    date_to = 'to'
+    min_rate = 'minRate'
+    max_rate = 'maxRate'
     links = 'metadata'
     links_self = 'self'
     links_collection = 'collection'
@@ -26,8 +33,15 @@ class RateInternalReprFieldFieldNames(Enum):
     currency_id = 'currency_id'
     currency = 'currency'
     base_currency = 'base_currency'
+    rate_id = 'rate_id'
     created = 'created'
     updated = 'updated'
+    version = 'version'
+    interval = 'interval'
+    date_from = 'date_from'
+    date_to = 'date_to'
+    min_rate = 'min_rate'
+    max_rate = 'max_rate'
     links = '_links'
 
 
@@ -35,3 +49,38 @@ class RateInternalReprFieldFieldNames(Enum):
 class RateOperationTypes(Enum):
     buy = 'buy'.upper()
     sell = 'sell'.upper()
+
+
+@unique
+class RateOhlcIntervals(Enum):
+    minute = '1m'
+    hour = '1h'
+    day = '1d'
+
+
+@unique
+class RateCandleFieldNames(Enum):
+    start = 'start'
+    buy = 'buy'
+    sell = 'sell'
+    open = 'open'
+    high = 'high'
+    low = 'low'
+    close = 'close'
+    spread = 'spread'
+    ticks = 'ticks'
+
+
+@unique
+class RateAnomalyFieldNames(Enum):
+    is_cash = 'isCash'
+    cycle = 'cycle'
+    rate_ids = 'rateIds'
+    profit = 'profit'
+
+
+@unique
+class RateEventTypes(Enum):
+    created = 'created'
+    updated = 'updated'
+    deleted = 'deleted'
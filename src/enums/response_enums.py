@@ -6,6 +6,7 @@ class ResponseStatuses(Enum):
     failed = 'failed'.upper()
     updated = 'updated'.upper()
     created = 'created'.upper()
+    accepted = 'accepted'.upper()
     # todo: review later
     # deleted = 'deleted'.upper()
 
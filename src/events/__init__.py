@@ -0,0 +1,14 @@
+from pathlib import Path
+from typing import Optional
+
+from .broker import EventBroker, Subscription
+from .relay import UnixSocketRelay
+from .sse import KEEP_ALIVE_FRAME, encode_event, encode_retry
+
+rate_events = EventBroker()
+
+
+def init_events(socket_dir: Optional[Path], max_pending: int) -> None:
+    """Configures the brokers. Cross-worker relaying is enabled only if the socket dir is set."""
+    relay = UnixSocketRelay(socket_dir / 'rates', rate_events.dispatch) if socket_dir else None
+    rate_events.configure(max_pending, relay)
@@ -0,0 +1,127 @@
+import logging
+import queue
+import threading
+from typing import Dict, Optional, Set, Protocol
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """A single subscriber of an EventBroker.
+
+    Events are delivered as already encoded frames, the same bytes object is shared between all
+    subscribers.
+    """
+    _CLOSED: bytes = b''
+
+    def __init__(self, topic: Optional[str], max_pending: int):
+        self.topic: Optional[str] = topic
+        self._frames: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._is_closed: bool = False
+
+    @property
+    def is_closed(self) -> bool:
+        return self._is_closed
+
+    def get(self, timeout: float) -> Optional[bytes]:
+        """Waits for the next frame.
+
+        Returns:
+            the next frame, None if nothing arrived within the timeout
+        Raises:
+            EOFError: the subscription was closed, e.g. it could not keep up with the events
+        """
+        try:
+            frame = self._frames.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if frame is self._CLOSED:
+            raise EOFError('Subscription is closed.')
+        return frame
+
+    def put(self, frame: bytes) -> bool:
+        try:
+            self._frames.put_nowait(frame)
+        except queue.Full:
+            return False
+        return True
+
+    def close(self) -> None:
+        self._is_closed = True
+        try:
+            self._frames.put_nowait(self._CLOSED)
+        except queue.Full:
+            # NOTE: a reader is going to find out about it from the drained queue anyway
+            self._drop_one_and_close()
+
+    def _drop_one_and_close(self) -> None:
+        try:
+            self._frames.get_nowait()
+        except queue.Empty:
+            pass
+        self._frames.put_nowait(self._CLOSED)
+
+
+class Relay(Protocol):
+    def ensure_started(self) -> None:
+        ...
+
+    def broadcast(self, topic: Optional[str], frame: bytes) -> None:
+        ...
+
+
+class EventBroker:
+    """In-process pub/sub with topic based fan-out.
+
+    Subscribers are indexed by topic, so publishing costs O(matching subscribers). A subscriber
+    without a topic receives every event. Slow subscribers are disconnected instead of buffering
+    events for them without a limit.
+    """
+
+    def __init__(self, max_pending: int = 100):
+        self._max_pending: int = max_pending
+        self._lock: threading.Lock = threading.Lock()
+        self._by_topic: Dict[Optional[str], Set[Subscription]] = {}
+        self._relay: Optional[Relay] = None
+
+    def configure(self, max_pending: int, relay: Optional[Relay] = None) -> None:
+        """Sets up the broker. The relay forwards published events to other worker processes."""
+        self._max_pending = max_pending
+        self._relay = relay
+
+    def subscribe(self, topic: Optional[str] = None) -> Subscription:
+        if self._relay:
+            self._relay.ensure_started()
+        subscription = Subscription(topic, self._max_pending)
+        with self._lock:
+            self._by_topic.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._by_topic.get(subscription.topic)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._by_topic[subscription.topic]
+
+    def publish(self, topic: Optional[str], frame: bytes) -> None:
+        self.dispatch(topic, frame)
+        if self._relay:
+            self._relay.broadcast(topic, frame)
+
+    def dispatch(self, topic: Optional[str], frame: bytes) -> None:
+        """Delivers the frame to the local subscribers only."""
+        with self._lock:
+            if not self._by_topic:
+                return
+            subscriptions = list(self._by_topic.get(None, ()))
+            if topic is not None:
+                subscriptions.extend(self._by_topic.get(topic, ()))
+
+        for subscription in subscriptions:
+            if not subscription.put(frame):
+                logger.warning('Subscriber can not keep up with the events, disconnecting it...')
+                self.unsubscribe(subscription)
+                subscription.close()
@@ -0,0 +1,94 @@
+import logging
+import os
+import socket
+import threading
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class UnixSocketRelay:
+    """Cross-worker notification path based on Unix datagram sockets.
+
+    Every worker process binds "<socket dir>/<pid>.sock" and broadcasts a packet to all other
+    sockets of the directory. Sockets of dead workers are removed on the first failed send.
+    The relay starts lazily and restarts after a fork, so it is safe to create it before gunicorn
+    forks the workers.
+    """
+    _SOCKET_SUFFIX: str = '.sock'
+    _TOPIC_SEPARATOR: bytes = b'\0'
+    _MAX_PACKET_SIZE: int = 64 * 1024
+
+    def __init__(self, socket_dir: Path, on_event: Callable[[Optional[str], bytes], None]):
+        self._socket_dir: Path = socket_dir
+        self._on_event: Callable[[Optional[str], bytes], None] = on_event
+        self._lock: threading.Lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._socket: Optional[socket.socket] = None
+        self._sender: Optional[socket.socket] = None
+
+    @property
+    def _socket_path(self) -> Path:
+        return self._socket_dir / f'{os.getpid()}{self._SOCKET_SUFFIX}'
+
+    def ensure_started(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._socket_dir.mkdir(parents=True, exist_ok=True)
+            socket_path = self._socket_path
+            if socket_path.exists():
+                socket_path.unlink()
+
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._socket.bind(str(socket_path))
+            # NOTE: a slow peer must never block the publishing request
+            self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._sender.setblocking(False)
+            self._pid = os.getpid()
+            threading.Thread(target=self._listen, args=(self._socket,),
+                             name='event-relay', daemon=True).start()
+            logger.info('Event relay listens on %s', socket_path)
+
+    def broadcast(self, topic: Optional[str], frame: bytes) -> None:
+        self.ensure_started()
+        packet = self._encode(topic, frame)
+        if len(packet) > self._MAX_PACKET_SIZE:
+            logger.error('Event packet of %d bytes is too large to be relayed.', len(packet))
+            return
+
+        own_path = self._socket_path
+        for peer_path in self._socket_dir.glob(f'*{self._SOCKET_SUFFIX}'):
+            if peer_path == own_path:
+                continue
+            try:
+                self._sender.sendto(packet, str(peer_path))
+            except (ConnectionRefusedError, FileNotFoundError):
+                logger.debug('Removing a stale event relay socket %s', peer_path)
+                peer_path.unlink(missing_ok=True)
+            except BlockingIOError:
+                logger.warning('Event relay socket %s is full, dropping the event.', peer_path)
+            except OSError as e:
+                logger.error('Failed to relay an event to %s. Error: %s', peer_path, e)
+
+    def _listen(self, sock: socket.socket) -> None:
+        while True:
+            try:
+                packet = sock.recv(self._MAX_PACKET_SIZE)
+            except OSError as e:
+                logger.error('Event relay stopped. Error: %s', e)
+                return
+            try:
+                self._on_event(*self._decode(packet))
+            except Exception as e:
+                logger.exception('Failed to handle a relayed event. Error: %s', e)
+
+    def _encode(self, topic: Optional[str], frame: bytes) -> bytes:
+        return (topic or '').encode() + self._TOPIC_SEPARATOR + frame
+
+    def _decode(self, packet: bytes) -> Tuple[Optional[str], bytes]:
+        topic, _, frame = packet.partition(self._TOPIC_SEPARATOR)
+        return topic.decode() or None, frame
@@ -0,0 +1,14 @@
+import json
+from typing import Any, Dict
+
+KEEP_ALIVE_FRAME: bytes = b': keep-alive\n\n'
+
+
+def encode_event(event_type: str, data: Dict[str, Any]) -> bytes:
+    """Encodes a Server-Sent Events frame. It is done once per event, not once per subscriber."""
+    payload = json.dumps(data, separators=(',', ':'))
+    return f'event: {event_type}\ndata: {payload}\n\n'.encode()
+
+
+def encode_retry(milliseconds: int) -> bytes:
+    return f'retry: {milliseconds}\n\n'.encode()
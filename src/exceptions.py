@@ -37,3 +37,23 @@ class DeleteError(CRUDError):
 
     def __repr__(self) -> str:
         return f'{self.__class__.__name__}: Failed to delete {self.entry_type} due to: {self.reason}'
+
+
+class DuplicateError(CRUDError):
+    def __init__(self, *args):
+        super().__init__(*args)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}: Duplicated {self.entry_type} due to: {self.reason}'
+
+
+class VersionMismatchError(CRUDError):
+    def __init__(self, *args):
+        super().__init__(*args)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}: Stale {self.entry_type} version due to: {self.reason}'
+
+
+class QueueFullError(BaseCurrencyAPIException):
+    pass
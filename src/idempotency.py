@@ -0,0 +1,156 @@
+import datetime
+import hashlib
+from functools import wraps
+from http import HTTPStatus
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from flask import abort, make_response, request, Response
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql.expression import ColumnElement
+
+from .models import db, IdempotencyKey
+
+
+class StoredResponse(NamedTuple):
+    status: int
+    body: bytes
+    mimetype: str
+    headers: Dict[str, str]
+
+
+class _Entry(NamedTuple):
+    fingerprint: str
+    # NOTE: None while the original request is still being processed
+    response: Optional[StoredResponse]
+
+
+class IdempotencyStore:
+    """Bounded store of responses by idempotency keys in the database, shared by all worker processes.
+
+    Entries expire after the TTL. When the store is full the oldest entries are evicted first.
+    A key reserved by a request which never completed, e.g. its worker was killed, expires after
+    the reservation timeout, so it can be retried.
+
+    Every call is a short transaction of its own, apart from the transaction of the request.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 24 * 60 * 60, reservation_timeout: float = 60):
+        self._max_entries: int = max_entries
+        self._ttl: datetime.timedelta = datetime.timedelta(seconds=ttl)
+        self._reservation_timeout: datetime.timedelta = datetime.timedelta(seconds=reservation_timeout)
+
+    def configure(self, max_entries: int, ttl: float, reservation_timeout: float) -> None:
+        self._max_entries = max_entries
+        self._ttl = datetime.timedelta(seconds=ttl)
+        self._reservation_timeout = datetime.timedelta(seconds=reservation_timeout)
+
+    def reserve(self, key: Tuple[str, str, str], fingerprint: str) -> Optional[_Entry]:
+        """Reserves the key for a new request.
+        Returns:
+            None if the key was reserved, otherwise the entry of the previous request
+        """
+        table = IdempotencyKey.__table__
+        method, path, idempotency_key = key
+        now = datetime.datetime.utcnow()
+        statement = sqlite_insert(table) \
+            .values(Method=method, Path=path, Key=idempotency_key, Fingerprint=fingerprint, Created=now,
+                    Expires=now + self._reservation_timeout) \
+            .on_conflict_do_nothing(index_elements=[table.c.Method, table.c.Path, table.c.Key])
+        with db.engine.begin() as connection:
+            self._evict(connection, now)
+            if connection.execute(statement).rowcount:
+                return None
+            # NOTE: the insert took the write lock, the conflicting row can not be deleted meanwhile
+            row = connection.execute(
+                db.select(table.c.Fingerprint, table.c.Status, table.c.Body, table.c.Mimetype, table.c.Headers)
+                .where(self._get_key_clause(key))
+            ).one()
+
+        response = None
+        if row.Status is not None:
+            response = StoredResponse(row.Status, row.Body, row.Mimetype, row.Headers or {})
+        return _Entry(row.Fingerprint, response)
+
+    def complete(self, key: Tuple[str, str, str], response: StoredResponse) -> None:
+        table = IdempotencyKey.__table__
+        with db.engine.begin() as connection:
+            connection.execute(
+                table.update()
+                .where(self._get_key_clause(key))
+                .values(Status=response.status, Body=response.body, Mimetype=response.mimetype,
+                        Headers=response.headers, Expires=datetime.datetime.utcnow() + self._ttl)
+            )
+
+    def release(self, key: Tuple[str, str, str]) -> None:
+        table = IdempotencyKey.__table__
+        with db.engine.begin() as connection:
+            connection.execute(table.delete().where(self._get_key_clause(key), table.c.Status.is_(None)))
+
+    @staticmethod
+    def _get_key_clause(key: Tuple[str, str, str]) -> ColumnElement:
+        table = IdempotencyKey.__table__
+        method, path, idempotency_key = key
+        return db.and_(table.c.Method == method, table.c.Path == path, table.c.Key == idempotency_key)
+
+    def _evict(self, connection: Connection, now: datetime.datetime) -> None:
+        table = IdempotencyKey.__table__
+        connection.execute(table.delete().where(table.c.Expires <= now))
+        # NOTE: ids grow with the reservations, so the ones below the newest entries are the oldest.
+        #  A place is left for the key being reserved
+        newest_id = db.select(db.func.max(table.c.id)).scalar_subquery()
+        connection.execute(table.delete().where(table.c.id <= newest_id - self._max_entries + 1))
+
+
+idempotency_store = IdempotencyStore()
+
+
+def idempotent(view_method: Callable) -> Callable:
+    """Replays the original response of a request repeated with the same 'Idempotency-Key' header.
+
+    Only successful and client error responses returned by the view are stored. Aborted or
+    failed requests release the key, so they can be retried.
+    """
+    _HEADER = 'Idempotency-Key'
+    _MAX_KEY_LENGTH = 255
+    # NOTE: headers describing the stored representation, they are replayed along with its body
+    _STORED_HEADERS = ('ETag', 'Preference-Applied')
+
+    @wraps(view_method)
+    def wrapper(*args, **kwargs):
+        idempotency_key = request.headers.get(_HEADER)
+        if idempotency_key is None:
+            return view_method(*args, **kwargs)
+        if not idempotency_key or len(idempotency_key) > _MAX_KEY_LENGTH:
+            abort(HTTPStatus.BAD_REQUEST, f'{_HEADER} must be 1-{_MAX_KEY_LENGTH} characters long.')
+
+        key = (request.method, request.path, idempotency_key)
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+        entry = idempotency_store.reserve(key, fingerprint)
+        if entry:
+            if entry.fingerprint != fingerprint:
+                abort(HTTPStatus.UNPROCESSABLE_ENTITY,
+                      f'{_HEADER} was already used with a different request body.')
+            if entry.response is None:
+                abort(HTTPStatus.CONFLICT, f'A request with the same {_HEADER} is in progress.')
+            response = Response(entry.response.body, entry.response.status,
+                                headers=entry.response.headers, mimetype=entry.response.mimetype)
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+
+        try:
+            response = make_response(view_method(*args, **kwargs))
+        except BaseException:
+            idempotency_store.release(key)
+            raise
+
+        if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR or response.is_streamed:
+            idempotency_store.release(key)
+        else:
+            headers = {name: response.headers[name] for name in _STORED_HEADERS
+                       if name in response.headers}
+            idempotency_store.complete(key, StoredResponse(response.status_code, response.get_data(),
+                                                           response.mimetype, headers))
+        return response
+
+    return wrapper
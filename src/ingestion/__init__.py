@@ -0,0 +1,3 @@
+from .providers import BaseProvider, FileProvider, Quote, ProviderError, create_provider
+from .scheduler import IngestionScheduler
+from .writer import SnapshotWriter
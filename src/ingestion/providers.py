@@ -0,0 +1,101 @@
+import json
+import logging
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Type
+
+from marshmallow import ValidationError
+
+from src.enums import RateInternalReprFieldFieldNames as RateInternalRepr
+from src.schemas.rate_schema import CreateRateExternalSchema
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderError(Exception):
+    pass
+
+
+class Quote(NamedTuple):
+    currency: str
+    base_currency: str
+    operation_type: str
+    is_cash: bool
+    rate: Decimal
+
+
+class BaseProvider(ABC):
+    """Source of rate snapshots.
+
+    Every provider is fetched by the scheduler in its own interval, a snapshot it returns is
+    compared with the current rates and only the changed quotes are written.
+    """
+
+    def __init__(self, name: str, interval: float):
+        self.name: str = name
+        self.interval: float = interval
+
+    @abstractmethod
+    def fetch(self) -> Optional[List[Quote]]:
+        """Fetches the current snapshot of the provider quotes.
+        Raises:
+            ProviderError:
+        Returns:
+            list of quotes, None if the snapshot did not change since the previous fetch
+        """
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.name}, {self.interval})'
+
+
+class FileProvider(BaseProvider):
+    """Reads quotes from a JSON file in the POST /rates format wrapped with {"rates": [...]}.
+
+    Handy for local runs and fixtures, the file is parsed only when it was modified.
+    """
+
+    def __init__(self, name: str, interval: float, path: str):
+        super().__init__(name, interval)
+        self._path: Path = Path(path)
+        self._last_modified: Optional[float] = None
+        self._schema: CreateRateExternalSchema = CreateRateExternalSchema(many=True)
+
+    def fetch(self) -> Optional[List[Quote]]:
+        try:
+            modified = self._path.stat().st_mtime
+            if modified == self._last_modified:
+                return None
+            data = json.loads(self._path.read_text())
+            loaded_quotes = self._schema.load(data)
+        except (OSError, ValueError, KeyError, ValidationError) as e:
+            raise ProviderError(f'Can not read quotes from {self._path}. Error: {e}') from e
+
+        self._last_modified = modified
+        return [
+            Quote(
+                currency=quote[RateInternalRepr.currency.value],
+                base_currency=quote[RateInternalRepr.base_currency.value],
+                operation_type=quote[RateInternalRepr.operation_type.value],
+                is_cash=quote[RateInternalRepr.is_cash.value],
+                rate=quote[RateInternalRepr.rate.value],
+            )
+            for quote in loaded_quotes
+        ]
+
+
+PROVIDER_TYPES: Dict[str, Type[BaseProvider]] = {
+    'file': FileProvider,
+}
+
+
+def create_provider(spec: Dict[str, Any]) -> BaseProvider:
+    """Creates a provider from its config, e.g. {"type": "file", "name": "local", "interval": 60, ...}"""
+    spec = dict(spec)
+    provider_type = spec.pop('type')
+    try:
+        provider_cls = PROVIDER_TYPES[provider_type]
+    except KeyError as e:
+        raise ProviderError(f'Unknown provider type {e}. Allowed types: {list(PROVIDER_TYPES)}') from e
+    return provider_cls(**spec)
@@ -0,0 +1,70 @@
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from pathlib import Path
+from typing import List, Tuple
+
+from flask import Flask
+
+from src.leadership import LeaderElectedWorker
+
+from .providers import BaseProvider, ProviderError
+from .writer import SnapshotWriter
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionScheduler(LeaderElectedWorker):
+    """Fetches providers concurrently, each one in its own interval, and writes changed quotes.
+
+    Fetching happens in a worker pool while writing is serialized, SQLite has a single writer
+    anyway. Only one process holding the lock file runs the ingestion, so it is safe to start the
+    scheduler in every gunicorn worker: the others take over if the leader dies.
+    """
+
+    def __init__(self, app: Flask, providers: List[BaseProvider], max_workers: int, lock_path: Path):
+        super().__init__('ingestion-scheduler', lock_path)
+        self._app: Flask = app
+        self._providers: List[BaseProvider] = providers
+        self._pool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=max_workers,
+                                                            thread_name_prefix='ingestion-fetch')
+        self._writer: SnapshotWriter = SnapshotWriter()
+        self._write_lock: threading.Lock = threading.Lock()
+
+    def stop(self) -> None:
+        super().stop()
+        self._pool.shutdown(wait=False)
+
+    def _lead(self) -> None:
+        logger.info('Ingestion started for providers: %s', self._providers)
+
+        # (next run time, provider index)
+        schedule: List[Tuple[float, int]] = [(time.monotonic(), index)
+                                             for index in range(len(self._providers))]
+        heapq.heapify(schedule)
+        while schedule and not self._stopped.is_set():
+            next_run, index = schedule[0]
+            if self._stopped.wait(max(next_run - time.monotonic(), 0)):
+                return
+            provider = self._providers[index]
+            heapq.heapreplace(schedule, (time.monotonic() + provider.interval, index))
+            future = self._pool.submit(provider.fetch)
+            future.add_done_callback(lambda f, p=provider: self._on_fetched(p, f))
+
+    def _on_fetched(self, provider: BaseProvider, future: Future) -> None:
+        try:
+            quotes = future.result()
+        except ProviderError as e:
+            logger.error('Provider %s failed. Error: %s', provider.name, e)
+            return
+        except Exception as e:
+            logger.exception('Provider %s crashed. Error: %s', provider.name, e)
+            return
+        if quotes is None:
+            logger.debug('Provider %s: the snapshot did not change.', provider.name)
+            return
+
+        with self._write_lock, self._app.app_context():
+            self._writer.write(provider.name, quotes)
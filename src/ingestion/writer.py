@@ -0,0 +1,91 @@
+import logging
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+from src.api.v1.services.rate_service import RateService
+from src.enums import CurrencyStatuesInternal, RateEventTypes
+from src.enums import RateInternalReprFieldFieldNames as RateInternalRepr
+from src.exceptions import CreateError
+from src.models import db, Rate, Currency
+from .providers import Quote
+
+logger = logging.getLogger(__name__)
+
+QuoteKey = Tuple[int, int, str, bool]
+
+
+class SnapshotWriter:
+    """Writes only the quotes of a snapshot which differ from the latest stored rates."""
+
+    def __init__(self):
+        self._rate_service: RateService = RateService()
+
+    def write(self, provider_name: str, quotes: List[Quote]) -> int:
+        """Must be called within an application context.
+        Returns:
+            number of written quotes
+        """
+        currency_ids = self._get_currency_ids(quotes)
+        snapshot: Dict[QuoteKey, Quote] = {}
+        for quote in quotes:
+            base_id, currency_id = currency_ids.get(quote.base_currency), currency_ids.get(quote.currency)
+            if not base_id or not currency_id:
+                logger.warning('Provider %s: unknown currency pair %s/%s, skipping the quote.',
+                               provider_name, quote.currency, quote.base_currency)
+                continue
+            # NOTE: the last quote of the same key wins
+            snapshot[(base_id, currency_id, quote.operation_type, quote.is_cash)] = quote
+
+        current_rates = self._get_latest_rates(snapshot)
+        changed = {key: quote for key, quote in snapshot.items() if current_rates.get(key) != quote.rate}
+        logger.info('Provider %s: %d of %d quotes changed.', provider_name, len(changed), len(quotes))
+        if not changed:
+            return 0
+
+        items = [
+            {
+                RateInternalRepr.base_id.value: base_id,
+                RateInternalRepr.currency_id.value: currency_id,
+                RateInternalRepr.operation_type.value: operation_type,
+                RateInternalRepr.is_cash.value: is_cash,
+                RateInternalRepr.rate.value: quote.rate,
+            }
+            for (base_id, currency_id, operation_type, is_cash), quote in changed.items()
+        ]
+        try:
+            new_rates = Rate.bulk_create(items)
+        except CreateError as e:
+            logger.error('Provider %s: failed to write the snapshot. Error: %s', provider_name, e)
+            return 0
+
+        for new_rate, quote in zip(new_rates, changed.values()):
+            self._rate_service.publish_rate_event(RateEventTypes.created.value, new_rate,
+                                                  quote.currency, quote.base_currency)
+        return len(new_rates)
+
+    @staticmethod
+    def _get_currency_ids(quotes: List[Quote]) -> Dict[str, int]:
+        codes = {quote.currency for quote in quotes} | {quote.base_currency for quote in quotes}
+        currencies_info = db.session.query(Currency.code, Currency.id) \
+            .filter(Currency.status == CurrencyStatuesInternal.active.value, Currency.code.in_(codes)) \
+            .all()
+        return dict(currencies_info)
+
+    @staticmethod
+    def _get_latest_rates(snapshot: Dict[QuoteKey, Quote]) -> Dict[QuoteKey, Decimal]:
+        if not snapshot:
+            return {}
+        base_ids = {key[0] for key in snapshot}
+        currency_ids = {key[1] for key in snapshot}
+        # NOTE: ids grow monotonically, so the latest rate of a key is the one with the max id
+        latest_ids = db.select(db.func.max(Rate.id)) \
+            .where(Rate.base_id.in_(base_ids), Rate.currency_id.in_(currency_ids)) \
+            .group_by(Rate.base_id, Rate.currency_id, Rate.operation_type, Rate.is_cash)
+        latest_rates = db.session.query(Rate.base_id, Rate.currency_id, Rate.operation_type,
+                                        Rate.is_cash, Rate.rate) \
+            .filter(Rate.id.in_(latest_ids)) \
+            .all()
+        return {
+            (base_id, currency_id, operation_type, is_cash): rate
+            for base_id, currency_id, operation_type, is_cash, rate in latest_rates
+        }
@@ -0,0 +1,115 @@
+import logging
+import struct
+import threading
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .events.relay import UnixSocketRelay
+from .shared_memory import SharedMemoryFile
+
+logger = logging.getLogger(__name__)
+
+# NOTE: called with the table name and the changed keys, None means the whole table
+InvalidationCallback = Callable[[str, Optional[List[int]]], None]
+
+
+class GenerationCounters:
+    """Per table write generations shared by the worker processes through a memory-mapped file.
+
+    Reading a generation is a plain memory read, increments are serialized with flock. Tables are
+    hashed into a fixed number of slots, a collision only causes an extra invalidation. Without a
+    file the counters are local to the process.
+    """
+    _SLOTS: int = 64
+    _SLOT: struct.Struct = struct.Struct('=Q')
+
+    def __init__(self):
+        self._memory: Optional[SharedMemoryFile] = None
+        self._lock: threading.Lock = threading.Lock()
+        self._local: Dict[int, int] = defaultdict(int)
+
+    def configure(self, path: Optional[Path]) -> None:
+        self._memory = SharedMemoryFile(path, self._SLOTS * self._SLOT.size) if path else None
+
+    def get(self, table_name: str) -> int:
+        slot = self._get_slot(table_name)
+        if self._memory is None:
+            return self._local[slot]
+        return self._SLOT.unpack_from(self._memory.buffer, slot * self._SLOT.size)[0]
+
+    def increment(self, table_name: str) -> int:
+        slot = self._get_slot(table_name)
+        if self._memory is None:
+            with self._lock:
+                self._local[slot] += 1
+                return self._local[slot]
+
+        offset = slot * self._SLOT.size
+        with self._memory.locked() as buffer:
+            generation = self._SLOT.unpack_from(buffer, offset)[0] + 1
+            self._SLOT.pack_into(buffer, offset, generation)
+        return generation
+
+    def _get_slot(self, table_name: str) -> int:
+        return zlib.crc32(table_name.encode()) % self._SLOTS
+
+
+class InvalidationBus:
+    """Invalidations of the CRUDMixin writes, delivered to the caches of every worker.
+
+    Table-level: a cache remembers the generations of the tables it was built from and compares
+    them on every read, it is a memory read and sees the writes of all workers right after commit.
+    Key-level: subscribers get the changed keys, right away for the local writes and through the
+    Unix socket relay for the writes of other workers when it is configured.
+
+    NOTE: writes which bypass CRUDMixin, e.g. raw SQL, are not tracked.
+    """
+    # NOTE: bigger batches invalidate the whole table, a relay packet has a size limit
+    _MAX_RELAYED_KEYS: int = 1000
+    _KEYS_SEPARATOR: bytes = b','
+
+    def __init__(self):
+        self._counters: GenerationCounters = GenerationCounters()
+        self._relay: Optional[UnixSocketRelay] = None
+        self._subscribers: Dict[str, List[InvalidationCallback]] = defaultdict(list)
+        self._lock: threading.Lock = threading.Lock()
+
+    def configure(self, generations_path: Optional[Path], socket_dir: Optional[Path]) -> None:
+        self._counters.configure(generations_path)
+        self._relay = UnixSocketRelay(socket_dir, self._on_relayed) if socket_dir else None
+
+    def get_generations(self, *table_names: str) -> Tuple[int, ...]:
+        return tuple(self._counters.get(table_name) for table_name in table_names)
+
+    def subscribe(self, table_name: str, callback: InvalidationCallback) -> None:
+        with self._lock:
+            self._subscribers[table_name].append(callback)
+        if self._relay:
+            self._relay.ensure_started()
+
+    def publish(self, table_name: str, keys: Sequence[int]) -> None:
+        """Invalidates the keys of the table. Called after the write was committed."""
+        self._counters.increment(table_name)
+        relayed_keys = list(keys) if len(keys) <= self._MAX_RELAYED_KEYS else None
+        self._notify(table_name, relayed_keys)
+        if self._relay:
+            frame = self._KEYS_SEPARATOR.join(str(key).encode() for key in relayed_keys or ())
+            self._relay.broadcast(table_name, frame)
+
+    def _on_relayed(self, table_name: Optional[str], frame: bytes) -> None:
+        keys = [int(key) for key in frame.split(self._KEYS_SEPARATOR)] if frame else None
+        self._notify(table_name, keys)
+
+    def _notify(self, table_name: str, keys: Optional[List[int]]) -> None:
+        with self._lock:
+            callbacks = list(self._subscribers.get(table_name, ()))
+        for callback in callbacks:
+            try:
+                callback(table_name, keys)
+            except Exception as e:
+                logger.exception('Invalidation subscriber of %s failed. Error: %s', table_name, e)
+
+
+invalidation_bus = InvalidationBus()
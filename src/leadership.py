@@ -0,0 +1,93 @@
+import atexit
+import fcntl
+import logging
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, IO, Optional
+
+
+class LeaderElectedWorker(ABC):
+    """Background thread which does its work only in the process holding the lock file.
+
+    It is safe to start in every gunicorn worker: the first one to lock the file leads, the others
+    keep retrying and one of them takes over if the leader dies, the lock is released by the OS.
+    A stopped leader releases the lock itself, so another worker takes over while it exits.
+    """
+    _LEADERSHIP_RETRY_INTERVAL: float = 30
+    # NOTE: how long stop() waits for the current run of the job before it releases the lock
+    _STOP_TIMEOUT: float = 10
+
+    def __init__(self, name: str, lock_path: Path):
+        self._name: str = name
+        self._lock_path: Path = lock_path
+        self._stopped: threading.Event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock_file: Optional[IO] = None
+        self._lock_file_lock: threading.Lock = threading.Lock()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+        self._thread.start()
+        # NOTE: a worker process exiting normally hands the leadership over right away
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """Stops the worker and releases the leadership once the current run of the job is done."""
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(self._STOP_TIMEOUT)
+            if self._thread.is_alive():
+                logging.getLogger(self.__class__.__module__).warning(
+                    'Worker %s did not stop in %d s, its leadership is released anyway.',
+                    self._name, self._STOP_TIMEOUT)
+        self._release_leadership()
+
+    @abstractmethod
+    def _lead(self) -> None:
+        """Does the work of the leader until the worker is stopped."""
+        raise NotImplementedError
+
+    def _run_periodically(self, task: Callable[[], None], interval: float, error_message: str) -> None:
+        """Runs the task every interval until the worker is stopped, a failed run is logged."""
+        # NOTE: the failures are logged by the logger of the subclass module, like its other records
+        worker_logger = logging.getLogger(self.__class__.__module__)
+        while not self._stopped.is_set():
+            try:
+                task()
+            except Exception as e:
+                worker_logger.exception('%s Error: %s', error_message, e)
+            self._stopped.wait(interval)
+
+    def _run(self) -> None:
+        while not self._acquire_leadership():
+            if self._stopped.wait(self._LEADERSHIP_RETRY_INTERVAL):
+                return
+        try:
+            self._lead()
+        finally:
+            self._release_leadership()
+
+    def _acquire_leadership(self) -> bool:
+        self._lock_path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = open(self._lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        # NOTE: the lock is held as long as the file stays open
+        with self._lock_file_lock:
+            if self._stopped.is_set():
+                lock_file.close()
+                return False
+            self._lock_file = lock_file
+        return True
+
+    def _release_leadership(self) -> None:
+        with self._lock_file_lock:
+            if self._lock_file is None:
+                return
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
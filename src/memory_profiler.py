@@ -0,0 +1,241 @@
+import logging
+import threading
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from flask import Flask, g, has_request_context, request, Response
+
+from .enums import MemoryProfileStages
+
+logger = logging.getLogger(__name__)
+
+
+class EndpointMemory(NamedTuple):
+    endpoint: str
+    stage: str
+    count: int
+    # NOTE: allocations left after the stage, e.g. cached or leaked objects
+    net_avg: float
+    # NOTE: the highest allocations during the stage, e.g. ORM objects and serializer intermediates
+    peak_avg: float
+    peak_max: int
+
+
+class AllocationSite(NamedTuple):
+    site: str
+    size: int
+    count: int
+    # NOTE: change since the previous periodic snapshot
+    size_diff: int
+    count_diff: int
+    # NOTE: periodic snapshots in a row the site has grown in
+    growth_snapshots: int
+
+
+class MemoryProfile(NamedTuple):
+    traced: int
+    traced_peak: int
+    snapshot_at: Optional[datetime]
+    endpoints: List[EndpointMemory]
+    top_sites: List[AllocationSite]
+    suspected_leaks: List[AllocationSite]
+
+
+class _Frame:
+    __slots__ = ('stage', 'started_at', 'peak')
+
+    def __init__(self, stage: str, started_at: int):
+        self.stage: str = stage
+        self.started_at: int = started_at
+        # NOTE: the peak before the traced peak was reset by a nested stage
+        self.peak: int = started_at
+
+
+class _Usage:
+    __slots__ = ('count', 'net_total', 'peak_total', 'peak_max')
+
+    def __init__(self):
+        self.count: int = 0
+        self.net_total: int = 0
+        self.peak_total: int = 0
+        self.peak_max: int = 0
+
+
+class MemoryProfiler:
+    """Attributes the allocations of a worker to the endpoints and their stages with tracemalloc.
+
+    Every request is a stage, the code marks its own stages inside, e.g. the query, the schema dump
+    and the encoding. A stage is measured by the allocations it left (net) and by the highest
+    allocations above its start (peak).
+
+    Periodic snapshots are compared with the previous ones, the sites which grow in several of
+    them in a row are reported as suspected leaks. The top allocation sites are served by the
+    debug endpoint, from a snapshot taken at that moment.
+
+    NOTE: tracemalloc traces all the threads of the process, so the allocations of the concurrent
+    requests of a threaded worker are attributed to each other. The numbers are exact with one
+    request at a time. Tracing slows allocations down, the profiler is meant to be enabled for a
+    while or on a part of the workers.
+    """
+    _STACK_KEY: str = 'memory_profile_stack'
+    # NOTE: allocations of the profiler itself and of the imports are not the ones looked for
+    _SNAPSHOT_FILTERS: List[tracemalloc.Filter] = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    ]
+
+    def __init__(self):
+        self._is_enabled: bool = False
+        self._snapshot_interval: float = 300
+        self._leak_snapshots: int = 3
+        self._top_limit: int = 20
+        self._lock: threading.Lock = threading.Lock()
+        self._usages: Dict[Tuple[str, str], _Usage] = defaultdict(_Usage)
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._snapshot_at: Optional[datetime] = None
+        self._growth: Dict[str, int] = {}
+        self._suspected_leaks: List[AllocationSite] = []
+        self._stopped: threading.Event = threading.Event()
+
+    @property
+    def is_enabled(self) -> bool:
+        return self._is_enabled
+
+    def init_app(self, app: Flask, frames: int, snapshot_interval: float, leak_snapshots: int,
+                 top_limit: int) -> None:
+        self._snapshot_interval = snapshot_interval
+        self._leak_snapshots = leak_snapshots
+        self._top_limit = top_limit
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._is_enabled = True
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        threading.Thread(target=self._run, name='memory-profiler', daemon=True).start()
+        logger.info('Memory profiling with %d frames is enabled.', frames)
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        """Measures the allocations of the code block as a stage of the current endpoint."""
+        stack = g.get(self._STACK_KEY) if self._is_enabled and has_request_context() else None
+        if not stack:
+            yield
+            return
+
+        self._enter(stack, stage)
+        try:
+            yield
+        finally:
+            self._exit(stack)
+
+    def get_profile(self) -> MemoryProfile:
+        traced, traced_peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            endpoints = [
+                EndpointMemory(endpoint, stage, usage.count, usage.net_total / usage.count,
+                               usage.peak_total / usage.count, usage.peak_max)
+                for (endpoint, stage), usage in sorted(self._usages.items())
+            ]
+            previous_snapshot, snapshot_at = self._snapshot, self._snapshot_at
+            suspected_leaks = list(self._suspected_leaks)
+
+        snapshot = self._take_snapshot()
+        if previous_snapshot is not None:
+            statistics = snapshot.compare_to(previous_snapshot, 'lineno')
+        else:
+            statistics = snapshot.statistics('lineno')
+        top_sites = [self._get_site(statistic) for statistic in statistics[:self._top_limit]]
+        return MemoryProfile(traced, traced_peak, snapshot_at, endpoints, top_sites, suspected_leaks)
+
+    def check(self) -> None:
+        """Takes a snapshot and updates the suspected leaks by its difference from the previous one."""
+        snapshot = self._take_snapshot()
+        with self._lock:
+            previous_snapshot = self._snapshot
+
+        suspected_leaks = []
+        if previous_snapshot is not None:
+            statistics = snapshot.compare_to(previous_snapshot, 'lineno')
+            growing_sites = [self._get_site_name(statistic) for statistic in statistics if statistic.size_diff > 0]
+            self._growth = {site: self._growth.get(site, 0) + 1 for site in growing_sites}
+            suspected_leaks = [site for site in map(self._get_site, statistics)
+                               if site.growth_snapshots >= self._leak_snapshots][:self._top_limit]
+
+        reported_sites = {leak.site for leak in self._suspected_leaks}
+        for leak in suspected_leaks:
+            if leak.site not in reported_sites:
+                logger.warning('Allocations at %s grew in %d snapshots in a row, by %d bytes in the last one.',
+                               leak.site, leak.growth_snapshots, leak.size_diff)
+
+        with self._lock:
+            self._snapshot, self._snapshot_at = snapshot, datetime.now(timezone.utc)
+            self._suspected_leaks = suspected_leaks
+
+    def _start_request(self) -> None:
+        # NOTE: the debug endpoints would only measure the profiler
+        if request.blueprint == 'debug_api':
+            return
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        setattr(g, self._STACK_KEY, [_Frame(MemoryProfileStages.request.value, current)])
+
+    def _finish_request(self, response: Response) -> Response:
+        stack = g.pop(self._STACK_KEY, None)
+        if stack:
+            self._exit(stack)
+        return response
+
+    @staticmethod
+    def _enter(stack: List[_Frame], stage: str) -> None:
+        current, peak = tracemalloc.get_traced_memory()
+        stack[-1].peak = max(stack[-1].peak, peak)
+        stack.append(_Frame(stage, current))
+        tracemalloc.reset_peak()
+
+    def _exit(self, stack: List[_Frame]) -> None:
+        current, peak = tracemalloc.get_traced_memory()
+        frame = stack.pop()
+        frame.peak = max(frame.peak, peak)
+        if stack:
+            stack[-1].peak = max(stack[-1].peak, frame.peak)
+
+        with self._lock:
+            usage = self._usages[(request.endpoint or request.path, frame.stage)]
+            usage.count += 1
+            usage.net_total += current - frame.started_at
+            usage.peak_total += frame.peak - frame.started_at
+            usage.peak_max = max(usage.peak_max, frame.peak - frame.started_at)
+
+    def _take_snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(self._SNAPSHOT_FILTERS)
+
+    @staticmethod
+    def _get_site_name(statistic) -> str:
+        frame = statistic.traceback[0]
+        return f'{frame.filename}:{frame.lineno}'
+
+    def _get_site(self, statistic) -> AllocationSite:
+        site = self._get_site_name(statistic)
+        # NOTE: statistics of a single snapshot have no diff
+        return AllocationSite(site, statistic.size, statistic.count, getattr(statistic, 'size_diff', 0),
+                              getattr(statistic, 'count_diff', 0), self._growth.get(site, 0))
+
+    def _run(self) -> None:
+        # NOTE: the first snapshot is the baseline of the next one
+        while not self._stopped.is_set():
+            try:
+                self.check()
+            except Exception as e:
+                logger.exception('Failed to check the memory snapshots. Error: %s', e)
+            self._stopped.wait(self._snapshot_interval)
+
+
+memory_profiler = MemoryProfiler()
@@ -1,13 +1,21 @@
 import logging
 import datetime
 from http import HTTPStatus
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, List
 
 from flask import abort
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import InvalidRequestError, SQLAlchemyError, IntegrityError
+from sqlalchemy.ext.declarative import declared_attr
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.sql.expression import ColumnElement
 
 from .models.database import db
-from src.exceptions import CreateError, UpdateError, DeleteError
+from .models.change_log import ChangeLog
+from .invalidation import invalidation_bus
+from src.enums import ChangeOperationsInternal
+from src.exceptions import CreateError, UpdateError, DeleteError, DuplicateError, VersionMismatchError
 
 logger = logging.getLogger(__name__)
 
@@ -41,41 +49,248 @@ class CRUDMixin:
         try:
             obj = cls(**kwargs)
             db.session.add(obj)
+            db.session.flush()
+            obj._on_created()
+            obj._log_change(ChangeOperationsInternal.created.value)
             db.session.commit()
         except IntegrityError as e:
             logger.error(e)
             db.session.rollback()
             raise CreateError("Integrity error", cls.__name__.lower()) from e
+        obj._on_committed()
         return obj
 
-    def update(self, data: Dict[str, Any]) -> None:
+    @classmethod
+    def create_unique(cls, index_elements: List[ColumnElement], index_where: Optional[ColumnElement],
+                      **kwargs) -> db.Model:
+        """Creates a record with a single INSERT ... ON CONFLICT DO NOTHING statement.
+
+        The unique index defined by index elements and its WHERE clause guarantees there are no
+        duplicates even with concurrent writers.
+        Raises:
+            DuplicateError: a record with the same values of the unique index already exists
+            CreateError:
+        """
+        obj = cls(**kwargs)
+        obj._apply_column_defaults()
+        values = {cls.__mapper__.column_attrs[attr].columns[0]: value
+                  for attr, value in obj._get_column_values().items() if value is not None}
+        statement = sqlite_insert(cls.__table__) \
+            .values(values) \
+            .on_conflict_do_nothing(index_elements=index_elements, index_where=index_where)
+        try:
+            result = db.session.execute(statement)
+            if not result.rowcount:
+                db.session.rollback()
+                raise DuplicateError('Unique constraint', cls.__name__.lower())
+
+            # NOTE: the record is attached to the session as a persistent one without a SELECT
+            obj.id = result.inserted_primary_key[0]
+            make_transient_to_detached(obj)
+            db.session.add(obj)
+            obj._on_created()
+            obj._log_change(ChangeOperationsInternal.created.value)
+            db.session.commit()
+        except IntegrityError as e:
+            logger.error(e)
+            db.session.rollback()
+            raise CreateError("Integrity error", cls.__name__.lower()) from e
+        obj._on_committed()
+        return obj
+
+    @classmethod
+    def bulk_create(cls, items: List[Dict[str, Any]]) -> List[db.Model]:
+        """Creates all records in a single transaction."""
+        try:
+            objs = [cls(**kwargs) for kwargs in items]
+            db.session.add_all(objs)
+            db.session.flush()
+            for obj in objs:
+                obj._on_created()
+                obj._log_change(ChangeOperationsInternal.created.value)
+            db.session.commit()
+        except IntegrityError as e:
+            logger.error(e)
+            db.session.rollback()
+            raise CreateError("Integrity error", cls.__name__.lower()) from e
+        cls._on_records_committed(objs)
+        return objs
+
+    @classmethod
+    def bulk_update(cls, changes: Dict[int, Dict[str, Any]]) -> List[db.Model]:
+        """Updates records by their ids in a single transaction.
+
+        Records which do not exist or would not change are skipped.
+        """
+        objs = [obj for obj in cls.query.filter(cls.id.in_(changes)).all()
+                if obj._get_changed_values(changes[obj.id])]
+        if not objs:
+            return []
+        try:
+            previous = {}
+            for obj in objs:
+                previous[obj.id] = obj._get_column_values()
+                for attr, value in obj._get_changed_values(changes[obj.id]).items():
+                    setattr(obj, attr, value)
+            db.session.flush()
+            for obj in objs:
+                obj._on_updated(previous[obj.id])
+                obj._log_change(ChangeOperationsInternal.updated.value)
+            db.session.commit()
+        except StaleDataError as e:
+            logger.error(e)
+            db.session.rollback()
+            raise VersionMismatchError(str(e), cls.__name__.lower()) from e
+        except SQLAlchemyError as e:
+            # NOTE: e.g. an IntegrityError of one of the records, the whole batch is rolled back
+            logger.error(e)
+            db.session.rollback()
+            raise UpdateError(str(e), cls.__name__.lower()) from e
+        cls._on_records_committed(objs)
+        return objs
+
+    def update(self, data: Dict[str, Any], expected_version: Optional[int] = None) -> bool:
+        """Updates the record. Nothing is written if all values are equal to the stored ones.
+        Returns:
+            True if the record was changed
+        Raises:
+            VersionMismatchError: the record version is not the expected one or the record was
+                changed by a concurrent writer after it was loaded
+        """
         # todo: тут так-то стейт меняется и новый объект не возвращается... Жидковато выходит
-        for attr, value in data.items():
+        self.check_version(expected_version)
+        changed_values = self._get_changed_values(data)
+        if not changed_values:
+            return False
+
+        previous = self._get_column_values()
+        for attr, value in changed_values.items():
             setattr(self, attr, value)
         try:
+            db.session.flush()
+            self._on_updated(previous)
+            self._log_change(ChangeOperationsInternal.updated.value)
             db.session.commit()
+        except IntegrityError as e:
+            logger.error(e)
+            db.session.rollback()
+            if self._is_unique_violation(e):
+                raise DuplicateError(str(e.orig), self.__class__.__name__.lower()) from e
+            raise UpdateError(str(e.orig), self.__class__.__name__.lower()) from e
+        except StaleDataError as e:
+            logger.error(e)
+            db.session.rollback()
+            raise VersionMismatchError(str(e), self.__class__.__name__.lower()) from e
         except InvalidRequestError as e:
             logger.error(e)
             db.session.rollback()
             raise UpdateError(str(e), self.__class__.__name__.lower()) from e
+        self._on_committed()
+        return True
 
-    def hard_delete(self) -> None:
+    def hard_delete(self, expected_version: Optional[int] = None) -> None:
+        self.check_version(expected_version)
         try:
             db.session.delete(self)
+            db.session.flush()
+            self._on_deleted()
+            self._log_change(ChangeOperationsInternal.deleted.value)
             db.session.commit()
+        except StaleDataError as e:
+            logger.error(e)
+            db.session.rollback()
+            raise VersionMismatchError(str(e), self.__class__.__name__.lower()) from e
         except SQLAlchemyError as e:
             logger.error(e)
             db.session.rollback()
             raise DeleteError(str(e), self.__class__.__name__.lower()) from e
+        self._on_committed()
 
-    def soft_delete(self) -> None:
+    def soft_delete(self, expected_version: Optional[int] = None) -> None:
         try:
-            self.update({'status': 0})
+            self.update({'status': 0}, expected_version)
         except UpdateError as e:
             logger.error(e)
             raise DeleteError(str(e), self.__class__.__name__.lower()) from e
 
+    def check_version(self, expected_version: Optional[int]) -> None:
+        current_version = getattr(self, 'version', None)
+        if expected_version is not None and expected_version != current_version:
+            raise VersionMismatchError(f'expected version {expected_version}, '
+                                       f'current version {current_version}',
+                                       self.__class__.__name__.lower())
+
+    @classmethod
+    def _is_unique_violation(cls, error: IntegrityError) -> bool:
+        # NOTE: SQLite names the columns of the violated unique index, not the index itself, e.g.
+        #  "UNIQUE constraint failed: Currency.Code". NOT NULL, CHECK and FOREIGN KEY violations are
+        #  not duplicates
+        message = str(error.orig)
+        for index in cls.__table__.indexes:
+            if not index.unique:
+                continue
+            columns = ', '.join(f'{cls.__tablename__}.{column.name}' for column in index.columns)
+            if message == f'UNIQUE constraint failed: {columns}':
+                return True
+        return False
+
+    def _get_column_values(self) -> Dict[str, Any]:
+        return {attr.key: getattr(self, attr.key) for attr in self.__mapper__.column_attrs}
+
+    def _apply_column_defaults(self) -> None:
+        # NOTE: fills every attribute of a new object, so none of them is left expired and loaded
+        #  with an extra SELECT later
+        for attr in self.__mapper__.column_attrs:
+            if getattr(self, attr.key) is not None:
+                continue
+            default = attr.columns[0].default
+            if default is not None and default.is_callable:
+                setattr(self, attr.key, default.arg(None))
+            elif default is not None and default.is_scalar:
+                setattr(self, attr.key, default.arg)
+            else:
+                setattr(self, attr.key, None)
+
+    def _get_changed_values(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {attr: value for attr, value in data.items() if getattr(self, attr) != value}
+
+    # NOTE: write hooks. They are called after the flush and before the commit, so everything they
+    #  write ends up in the same transaction as the record itself.
+    def _on_created(self) -> None:
+        pass
+
+    def _on_updated(self, previous: Dict[str, Any]) -> None:
+        pass
+
+    def _on_deleted(self) -> None:
+        pass
+
+    def _log_change(self, operation: str) -> None:
+        ChangeLog.record(self.__tablename__, self.id, operation)
+
+    def _on_committed(self) -> None:
+        self._on_records_committed([self])
+
+    @classmethod
+    def _on_records_committed(cls, objs: List[db.Model]) -> None:
+        invalidation_bus.publish(cls.__tablename__, [obj.id for obj in objs])
+
 
 class TimestampMixin:
     created = db.Column('Created', db.DateTime, nullable=False, default=datetime.datetime.utcnow)
     updated = db.Column('Updated', db.DateTime, onupdate=datetime.datetime.utcnow)
+
+
+class VersionMixin:
+    """Optimistic concurrency control.
+
+    Every UPDATE and DELETE of the record is a compare-and-swap on the version it was loaded with:
+    "... WHERE id = ? AND Version = ?". If a concurrent writer got there first, no row is matched
+    and the flush raises StaleDataError instead of silently overwriting the other change.
+    """
+    # NOTE: the server default lets the column be added to the existing tables
+    version = db.Column('Version', db.Integer, nullable=False, default=1, server_default='1')
+
+    @declared_attr
+    def __mapper_args__(cls) -> Dict[str, Any]:
+        return {'version_id_col': cls.version}
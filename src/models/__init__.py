@@ -1,2 +1,7 @@
-from .database import db
-from .models import Rate, Currency
+from .database import db, create_read_only_engine, use_read_session
+from .change_log import ChangeLog
+from .idempotency_key import IdempotencyKey
+from .models import (Rate, Currency, BestRate, RateCandle, RateCompactionState, Basket,
+                     BasketComponent)
+from .types import ScaledInteger, migrate_scaled_columns
+from .search import currency_search_index
@@ -0,0 +1,58 @@
+import datetime
+import logging
+
+from .database import db
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeLog(db.Model):
+    """Sequenced log of CRUDMixin writes, used by clients to sync only what changed.
+
+    Only the latest entry per record is needed to sync, so older entries of the same record are
+    compacted away in the background, see ChangeLogCompactor.
+    """
+    __tablename__ = 'ChangeLog'
+    __table_args__ = (
+        db.Index('IxChangeLogRecord', 'TableName', 'RecordId'),
+        # NOTE: sequence numbers must never be reused, even after the newest entries were deleted
+        {'sqlite_autoincrement': True},
+    )
+
+    seq = db.Column('Seq', db.Integer, primary_key=True)
+    table_name = db.Column('TableName', db.String(32), nullable=False)
+    record_id = db.Column('RecordId', db.Integer, nullable=False)
+    operation = db.Column('Operation', db.CHAR, nullable=False)
+    created = db.Column('Created', db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    @classmethod
+    def record(cls, table_name: str, record_id: int, operation: str) -> None:
+        """Adds an entry to the current transaction."""
+        db.session.add(cls(table_name=table_name, record_id=record_id, operation=operation))
+
+    @classmethod
+    def compact(cls, after_seq: int, until_seq: int) -> int:
+        """Removes the entries superseded by an entry of the (after seq, until seq] range.
+
+        An entry is removed once the range of a newer entry of the same record is compacted, so
+        walking the new ranges in order keeps the whole log compacted without scanning all of it.
+        The lookups of the older entries go through the record index.
+        Returns:
+            number of removed entries
+        """
+        # NOTE: aliased, so the subqueries are not correlated with the table of the DELETE
+        entry = db.aliased(cls)
+        in_range = db.and_(entry.seq > after_seq, entry.seq <= until_seq)
+        records = db.select(entry.table_name, entry.record_id).where(in_range)
+        latest_entries = db.select(db.func.max(entry.seq)).where(in_range) \
+            .group_by(entry.table_name, entry.record_id)
+        removed = cls.query \
+            .filter(cls.seq <= until_seq,
+                    db.tuple_(cls.table_name, cls.record_id).in_(records),
+                    cls.seq.notin_(latest_entries)) \
+            .delete(synchronize_session=False)
+        db.session.commit()
+        return removed
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.seq}, {self.table_name}, {self.record_id}, {self.operation})'
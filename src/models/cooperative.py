@@ -0,0 +1,86 @@
+import sqlite3
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+import gevent
+
+
+def _run_blocking(function: Callable, *args) -> Any:
+    # NOTE: the calling greenlet waits for the thread, the others keep running on the hub
+    return gevent.get_hub().threadpool.apply(function, args)
+
+
+class OffloadingCursor(sqlite3.Cursor):
+    """Cursor which steps its statements in the gevent thread pool.
+
+    sqlite3 releases the GIL while a statement is stepped, but not the gevent hub, so a long query
+    or a wait for the write lock would stall every greenlet of the worker. The rows of a query are
+    fetched by the same pool call as its statement, so the fetches are served from memory instead
+    of a pool call each.
+
+    NOTE: the whole result is buffered, even when the caller streams it, e.g. by yield_per().
+    """
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._rows: Deque[Any] = deque()
+
+    def execute(self, *args) -> 'OffloadingCursor':
+        self._rows = _run_blocking(self._execute_and_fetch, *args)
+        return self
+
+    def executemany(self, *args) -> 'OffloadingCursor':
+        self._rows = deque()
+        return _run_blocking(super().executemany, *args)
+
+    def fetchone(self) -> Any:
+        return self._rows.popleft() if self._rows else None
+
+    def fetchmany(self, size: Optional[int] = None) -> list:
+        size = self.arraysize if size is None else size
+        return [self._rows.popleft() for _ in range(min(size, len(self._rows)))]
+
+    def fetchall(self) -> list:
+        rows, self._rows = list(self._rows), deque()
+        return rows
+
+    def __next__(self) -> Any:
+        if not self._rows:
+            raise StopIteration
+        return self._rows.popleft()
+
+    def _execute_and_fetch(self, *args) -> Deque[Any]:
+        super().execute(*args)
+        # NOTE: statements without a result, e.g. an UPDATE, have no description
+        if self.description is None:
+            return deque()
+        return deque(super().fetchall())
+
+
+class OffloadingConnection(sqlite3.Connection):
+    """Connection whose statements, commits and rollbacks run in the gevent thread pool.
+
+    NOTE: a connection is still used by one greenlet at a time, the pool threads only run its calls.
+    """
+
+    def cursor(self, factory: type = OffloadingCursor) -> sqlite3.Cursor:
+        return super().cursor(factory)
+
+    def execute(self, *args) -> sqlite3.Cursor:
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args) -> sqlite3.Cursor:
+        return self.cursor().executemany(*args)
+
+    def commit(self) -> None:
+        _run_blocking(super().commit)
+
+    def rollback(self) -> None:
+        _run_blocking(super().rollback)
+
+
+def get_offloading_engine_options(threads: int) -> Dict[str, Any]:
+    """Returns the engine options of a gevent worker, its SQLite calls run in the thread pool."""
+    gevent.get_hub().threadpool.maxsize = threads
+    # NOTE: the calls of a connection are run by whichever pool thread is free
+    return {'connect_args': {'factory': OffloadingConnection, 'check_same_thread': False}}
@@ -1,3 +1,63 @@
-from flask_sqlalchemy import SQLAlchemy
+from typing import Any, Dict, Hashable, Optional
 
-db = SQLAlchemy()
+from flask import _app_ctx_stack
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from greenlet import getcurrent
+from sqlalchemy import create_engine, event, orm
+from sqlalchemy.engine import Engine
+
+
+class RoutingSession(SignallingSession):
+    """Sends every statement to the read-only engine while it is set."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_only_engine: Optional[Engine] = None
+
+    def get_bind(self, mapper=None, clause=None) -> Engine:
+        # NOTE: the binds of all tables are set explicitly, so the session bind can not be replaced
+        if self.read_only_engine is not None:
+            return self.read_only_engine
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options) -> orm.sessionmaker:
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def get_session_scope() -> Hashable:
+    """Scopes the sessions to the app contexts, the session is removed with its context.
+
+    The contexts are context variables, so they are local to a thread as well as to a greenlet
+    of a gevent worker. A greenlet spawned by a request does not share the request session.
+    """
+    app_context = _app_ctx_stack.top
+    return id(app_context) if app_context is not None else getcurrent()
+
+
+# NOTE: committed objects keep their state. Write paths dump a record right after the commit and
+#  expiring it would cost a refresh SELECT per record, while the session lives for one request only
+db = RoutingSQLAlchemy(session_options={'expire_on_commit': False, 'scopefunc': get_session_scope})
+
+
+def create_read_only_engine(database_uri: str, engine_options: Optional[Dict[str, Any]] = None) -> Engine:
+    """Creates an engine with its own connection pool which can not write to the database."""
+    engine = create_engine(database_uri, **(engine_options or {}))
+
+    @event.listens_for(engine, 'connect')
+    def _set_query_only(dbapi_connection, connection_record) -> None:
+        dbapi_connection.execute('PRAGMA query_only = ON')
+
+    return engine
+
+
+def use_read_session(read_only_engine: Optional[Engine] = None) -> None:
+    """Switches the session of the current request to the read profile.
+
+    Nothing is written by a read request, so there is nothing to autoflush before every query.
+    pysqlite does not begin a transaction for SELECT statements anyway, so reads run without one.
+    """
+    session = db.session()
+    session.autoflush = False
+    session.read_only_engine = read_only_engine
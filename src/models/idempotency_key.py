@@ -0,0 +1,32 @@
+import datetime
+
+from .database import db
+
+
+class IdempotencyKey(db.Model):
+    """Response of a request by its idempotency key, shared by all worker processes.
+
+    A key is reserved by inserting its row before the request is processed, the unique key makes
+    the reservation atomic across the processes. The response columns are filled after.
+    """
+    __tablename__ = 'IdempotencyKey'
+    __table_args__ = (
+        db.UniqueConstraint('Method', 'Path', 'Key', name='UqIdempotencyKey'),
+        db.Index('IxIdempotencyKeyExpires', 'Expires'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    method = db.Column('Method', db.String(8), nullable=False)
+    path = db.Column('Path', db.String(255), nullable=False)
+    key = db.Column('Key', db.String(255), nullable=False)
+    fingerprint = db.Column('Fingerprint', db.CHAR(64), nullable=False)
+    created = db.Column('Created', db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    expires = db.Column('Expires', db.DateTime, nullable=False)
+    # NOTE: the response columns are NULL while the original request is still being processed
+    status = db.Column('Status', db.SMALLINT)
+    body = db.Column('Body', db.LargeBinary)
+    mimetype = db.Column('Mimetype', db.String(255))
+    headers = db.Column('Headers', db.JSON)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.method}, {self.path}, {self.key}, {self.status})'
@@ -1,19 +1,37 @@
+import datetime
 import logging
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.sql.expression import ColumnElement
 
 from .database import db
-from src.mixins import CRUDMixin, TimestampMixin
+from .types import ScaledInteger
+from src.mixins import CRUDMixin, TimestampMixin, VersionMixin
 from src.enums import CurrencyStatuesInternal
 from src.enums import CurrencyExternalReprFieldNames as CurrExternalRepr
+from src.constans import RATE_FIXED_POINT_STORAGE_ENABLED, RATE_STORAGE_SCALE
 
 logger = logging.getLogger(__name__)
 
+# NOTE: the stored values are converted by Application on start when the storage mode is switched
+RATE_COLUMN_TYPE = ScaledInteger(RATE_STORAGE_SCALE) if RATE_FIXED_POINT_STORAGE_ENABLED else db.DECIMAL(12, 5)
+
 
-class Rate(CRUDMixin, TimestampMixin, db.Model):
+class Rate(CRUDMixin, TimestampMixin, VersionMixin, db.Model):
     __tablename__ = 'Rate'
+    __table_args__ = (
+        # NOTE: covers BestRate recalculation, it is an index-only "top 1" lookup per key
+        db.Index('IxRateBestKey', 'BaseCurrencyId', 'CurrencyId', 'OperationType', 'IsCash', 'Rate'),
+        # NOTE: covers time range scans of a pair, e.g. OHLC candles
+        db.Index('IxRatePairCreated', 'BaseCurrencyId', 'CurrencyId', 'Created'),
+        # NOTE: covers the retention, it walks all rates in the creation order
+        db.Index('IxRateCreated', 'Created'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     operation_type = db.Column('OperationType', db.CHAR, nullable=False)
-    rate = db.Column('Rate', db.DECIMAL(12, 5), nullable=False)
+    rate = db.Column('Rate', RATE_COLUMN_TYPE, nullable=False)
     is_cash = db.Column('IsCash', db.Boolean, nullable=False)
 
     # Foreign keys
@@ -37,8 +55,191 @@ class Rate(CRUDMixin, TimestampMixin, db.Model):
             f')'
         )
 
+    @classmethod
+    def get_output_rate(cls) -> ColumnElement:
+        """Rate column for the JSON output, scaled integers are turned into floats by the database."""
+        if isinstance(cls.rate.type, ScaledInteger):
+            return cls.rate.type.as_float(cls.rate)
+        return cls.rate
+
+    def _on_created(self) -> None:
+        BestRate.on_rate_created(self)
+
+    def _on_updated(self, previous: Dict[str, Any]) -> None:
+        BestRate.on_rate_updated(self, previous)
+
+    def _on_deleted(self) -> None:
+        BestRate.on_rate_deleted(self)
+
+
+class BestRate(db.Model):
+    """Materialized best quote per (base currency, currency, operation type, is cash) key.
+
+    It is maintained incrementally by the Rate write hooks, so reading the best rate of a pair is a
+    primary key lookup instead of a scan over all quotes of that pair. Of equal quotes the newest
+    one is the best.
+    """
+    __tablename__ = 'BestRate'
+
+    # NOTE: "b" - the quoter buys the currency, the highest price is the best one for a client.
+    #  "s" - the quoter sells the currency, the lowest price is the best one.
+    _HIGHEST_IS_BEST: Dict[str, bool] = {
+        'b': True,
+        's': False,
+    }
+
+    base_id = db.Column('BaseCurrencyId', db.Integer, db.ForeignKey('Currency.id'), primary_key=True)
+    currency_id = db.Column('CurrencyId', db.Integer, db.ForeignKey('Currency.id'), primary_key=True)
+    operation_type = db.Column('OperationType', db.CHAR, primary_key=True)
+    is_cash = db.Column('IsCash', db.Boolean, primary_key=True)
+    rate_id = db.Column('RateId', db.Integer, db.ForeignKey('Rate.id'), nullable=False)
+    rate = db.Column('Rate', RATE_COLUMN_TYPE, nullable=False)
+    updated = db.Column('Updated', db.DateTime, nullable=False, default=datetime.datetime.utcnow,
+                        onupdate=datetime.datetime.utcnow)
+
+    @staticmethod
+    def get_key(base_id: int, currency_id: int, operation_type: str,
+                is_cash: bool) -> Tuple[int, int, str, bool]:
+        # NOTE: the order matches the primary key columns order, so it can be passed to query.get()
+        return base_id, currency_id, operation_type, is_cash
+
+    @classmethod
+    def rebuild(cls) -> None:
+        """Recalculates the whole table, e.g. to populate it for already existing rates."""
+        cls.query.delete()
+        keys = db.session.query(Rate.base_id, Rate.currency_id, Rate.operation_type, Rate.is_cash) \
+            .distinct() \
+            .all()
+        for key in keys:
+            cls._recalculate(cls.get_key(*key))
+        db.session.commit()
+
+    @classmethod
+    def on_rate_created(cls, rate: Rate) -> None:
+        key = cls.get_key(rate.base_id, rate.currency_id, rate.operation_type, rate.is_cash)
+        best = cls.query.get(key)
+        if not best or cls._is_better(rate.operation_type, rate.id, rate.rate, best.rate_id, best.rate):
+            cls._set(key, rate.id, rate.rate, best)
+
+    @classmethod
+    def on_rate_updated(cls, rate: Rate, previous: Dict[str, Any]) -> None:
+        previous_key = cls.get_key(previous['base_id'], previous['currency_id'],
+                                   previous['operation_type'], previous['is_cash'])
+        key = cls.get_key(rate.base_id, rate.currency_id, rate.operation_type, rate.is_cash)
+        if previous_key != key:
+            cls._recalculate(previous_key)
+            cls.on_rate_created(rate)
+            return
+
+        best = cls.query.get(key)
+        if not best:
+            cls._recalculate(key)
+        elif best.rate_id == rate.id:
+            # the current best quote got worse, some other quote might be the best one now
+            if cls._is_better(rate.operation_type, best.rate_id, best.rate, rate.id, rate.rate):
+                cls._recalculate(key)
+            else:
+                best.rate = rate.rate
+        elif cls._is_better(rate.operation_type, rate.id, rate.rate, best.rate_id, best.rate):
+            cls._set(key, rate.id, rate.rate, best)
+
+    @classmethod
+    def on_rate_deleted(cls, rate: Rate) -> None:
+        key = cls.get_key(rate.base_id, rate.currency_id, rate.operation_type, rate.is_cash)
+        best = cls.query.get(key)
+        if best and best.rate_id == rate.id:
+            cls._recalculate(key)
+
+    @classmethod
+    def _is_better(cls, operation_type: str, rate_id: int, value: Decimal, other_rate_id: int,
+                   other: Decimal) -> bool:
+        # NOTE: a tie is won by the newest quote, the same order as in _recalculate
+        if value == other:
+            return rate_id > other_rate_id
+        if cls._HIGHEST_IS_BEST.get(operation_type, True):
+            return value > other
+        return value < other
+
+    @classmethod
+    def _recalculate(cls, key: Tuple[int, int, str, bool]) -> None:
+        base_id, currency_id, operation_type, is_cash = key
+        order = Rate.rate.desc() if cls._HIGHEST_IS_BEST.get(operation_type, True) else Rate.rate.asc()
+        top = db.session.query(Rate.id, Rate.rate) \
+            .filter_by(base_id=base_id, currency_id=currency_id,
+                       operation_type=operation_type, is_cash=is_cash) \
+            .order_by(order, Rate.id.desc()) \
+            .first()
+
+        best = cls.query.get(key)
+        if top:
+            cls._set(key, top.id, top.rate, best)
+        elif best:
+            db.session.delete(best)
+
+    @classmethod
+    def _set(cls, key: Tuple[int, int, str, bool], rate_id: int, rate: Decimal,
+             best: Optional['BestRate']) -> None:
+        if best:
+            best.rate_id = rate_id
+            best.rate = rate
+            return
 
-class Currency(CRUDMixin, TimestampMixin, db.Model):
+        base_id, currency_id, operation_type, is_cash = key
+        db.session.add(cls(base_id=base_id, currency_id=currency_id, operation_type=operation_type,
+                           is_cash=is_cash, rate_id=rate_id, rate=rate))
+
+
+class RateCandle(db.Model):
+    """OHLC candle of the quotes of a pair, the raw rates are downsampled into it before they expire."""
+    __tablename__ = 'RateCandle'
+    __table_args__ = (
+        # NOTE: covers the retention of candles of an interval
+        db.Index('IxRateCandleIntervalStart', 'Interval', 'Start'),
+    )
+
+    # NOTE: the key starts with the pair and the interval, so a candles range read is a key range scan
+    base_id = db.Column('BaseCurrencyId', db.Integer, db.ForeignKey('Currency.id'), primary_key=True)
+    currency_id = db.Column('CurrencyId', db.Integer, db.ForeignKey('Currency.id'), primary_key=True)
+    interval = db.Column('Interval', db.String(3), primary_key=True)
+    start = db.Column('Start', db.DateTime, primary_key=True)
+    operation_type = db.Column('OperationType', db.CHAR, primary_key=True)
+    is_cash = db.Column('IsCash', db.Boolean, primary_key=True)
+    open = db.Column('Open', RATE_COLUMN_TYPE, nullable=False)
+    high = db.Column('High', RATE_COLUMN_TYPE, nullable=False)
+    low = db.Column('Low', RATE_COLUMN_TYPE, nullable=False)
+    close = db.Column('Close', RATE_COLUMN_TYPE, nullable=False)
+    ticks = db.Column('Ticks', db.Integer, nullable=False)
+    # NOTE: creation times of the open and the close rates, candles of one bucket are merged by them
+    opened = db.Column('Opened', db.DateTime, nullable=False)
+    closed = db.Column('Closed', db.DateTime, nullable=False)
+
+
+class RateCompactionState(db.Model):
+    """Progress of the rates retention.
+
+    The rates up to the watermark, in the (created, id) order, are already downsampled into
+    candles. Only the current best rates of them are still kept.
+    """
+    __tablename__ = 'RateCompactionState'
+    _ID: int = 1
+
+    id = db.Column(db.Integer, primary_key=True)
+    watermark_created = db.Column('WatermarkCreated', db.DateTime, nullable=False)
+    watermark_rate_id = db.Column('WatermarkRateId', db.Integer, nullable=False)
+
+    @classmethod
+    def get_watermark(cls) -> Optional[Tuple[datetime.datetime, int]]:
+        """Returns the (created, id) of the last downsampled rate, None if nothing was downsampled yet."""
+        row = db.session.query(cls.watermark_created, cls.watermark_rate_id).filter_by(id=cls._ID).first()
+        return tuple(row) if row else None
+
+    @classmethod
+    def set_watermark(cls, created: datetime.datetime, rate_id: int) -> None:
+        """Moves the watermark within the current transaction."""
+        db.session.merge(cls(id=cls._ID, watermark_created=created, watermark_rate_id=rate_id))
+
+
+class Currency(CRUDMixin, TimestampMixin, VersionMixin, db.Model):
     __tablename__ = 'Currency'
 
     id = db.Column(db.Integer, primary_key=True)
@@ -49,7 +250,41 @@ class Currency(CRUDMixin, TimestampMixin, db.Model):
     @classmethod
     def create(cls, **kwargs) -> db.Model:
         kwargs.update({CurrExternalRepr.status.value: CurrencyStatuesInternal.active.value})
-        return super().create(**kwargs)
+        return cls.create_unique(
+            index_elements=[cls.code],
+            index_where=cls.status == CurrencyStatuesInternal.active.value,
+            **kwargs
+        )
 
     def __repr__(self):
         return f'{self.__class__.__name__}({self.name}, {self.status}, {self.code})'
+
+
+# NOTE: only one active currency may have a code, deleted ones keep their codes
+db.Index('UqCurrencyActiveCode', Currency.code, unique=True,
+         sqlite_where=Currency.status == CurrencyStatuesInternal.active.value)
+
+
+class Basket(CRUDMixin, TimestampMixin, VersionMixin, db.Model):
+    """Weighted mix of currencies valued in the base currency, e.g. an index."""
+    __tablename__ = 'Basket'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column('Name', db.String(50), nullable=False)
+    base_id = db.Column('BaseCurrencyId', db.Integer, db.ForeignKey('Currency.id'), nullable=False)
+
+    # NOTE: components are written only together with their basket, so the basket table
+    #  generation covers them as well
+    components = db.relationship('BasketComponent', cascade='all, delete-orphan', lazy='selectin')
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.name}, {self.base_id})'
+
+
+class BasketComponent(db.Model):
+    __tablename__ = 'BasketComponent'
+
+    basket_id = db.Column('BasketId', db.Integer, db.ForeignKey('Basket.id'), primary_key=True)
+    currency_id = db.Column('CurrencyId', db.Integer, db.ForeignKey('Currency.id'), primary_key=True)
+    # NOTE: units of the currency in the basket
+    weight = db.Column('Weight', db.DECIMAL(12, 5), nullable=False)
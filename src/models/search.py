@@ -0,0 +1,113 @@
+import logging
+import re
+from typing import List
+
+from flask_sqlalchemy import BaseQuery
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from .database import db
+from .models import Currency
+from src.enums import CurrencyStatuesInternal
+
+logger = logging.getLogger(__name__)
+
+
+class CurrencySearchIndex:
+    """Ranked prefix search over the codes and names of currencies.
+
+    The FTS5 table indexes the Currency rows themselves (external content), triggers keep it in sync
+    with every write, raw SQL ones included. Prefixes of up to 3 characters are indexed separately,
+    so autocomplete lookups do not scan the terms. Without FTS5 in the SQLite build the search falls
+    back to LIKE prefix matching.
+    """
+    TABLE_NAME: str = 'CurrencySearch'
+    _TOKEN_PATTERN: re.Pattern = re.compile(r'\w+')
+    # NOTE: only active currencies are indexed. A row must be deleted from an external content
+    #  index with the values it was indexed with, so every statement checks the status it had
+    _DDL: List[str] = [
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS "{TABLE_NAME}" USING fts5('
+        f'"Code", "Name", content="Currency", content_rowid="id", '
+        f'tokenize="unicode61 remove_diacritics 2", prefix="1 2 3")',
+        f'CREATE TRIGGER IF NOT EXISTS "TrCurrencySearchInsert" AFTER INSERT ON "Currency" '
+        f'WHEN new."Status" = {CurrencyStatuesInternal.active.value} BEGIN '
+        f'INSERT INTO "{TABLE_NAME}"(rowid, "Code", "Name") VALUES (new.id, new."Code", new."Name"); '
+        f'END',
+        f'CREATE TRIGGER IF NOT EXISTS "TrCurrencySearchDelete" AFTER DELETE ON "Currency" '
+        f'WHEN old."Status" = {CurrencyStatuesInternal.active.value} BEGIN '
+        f'INSERT INTO "{TABLE_NAME}"("{TABLE_NAME}", rowid, "Code", "Name") '
+        f'VALUES (\'delete\', old.id, old."Code", old."Name"); '
+        f'END',
+        f'CREATE TRIGGER IF NOT EXISTS "TrCurrencySearchUpdate" '
+        f'AFTER UPDATE OF "Code", "Name", "Status" ON "Currency" BEGIN '
+        f'INSERT INTO "{TABLE_NAME}"("{TABLE_NAME}", rowid, "Code", "Name") '
+        f'SELECT \'delete\', old.id, old."Code", old."Name" '
+        f'WHERE old."Status" = {CurrencyStatuesInternal.active.value}; '
+        f'INSERT INTO "{TABLE_NAME}"(rowid, "Code", "Name") SELECT new.id, new."Code", new."Name" '
+        f'WHERE new."Status" = {CurrencyStatuesInternal.active.value}; '
+        f'END',
+    ]
+    _FILL: List[str] = [
+        f'INSERT INTO "{TABLE_NAME}"("{TABLE_NAME}", rank) VALUES (\'rank\', \'bm25(10.0, 1.0)\')',
+        f'INSERT INTO "{TABLE_NAME}"(rowid, "Code", "Name") SELECT id, "Code", "Name" FROM "Currency" '
+        f'WHERE "Status" = {CurrencyStatuesInternal.active.value}',
+    ]
+
+    def __init__(self):
+        self._is_available: bool = False
+
+    @property
+    def is_available(self) -> bool:
+        return self._is_available
+
+    def create(self, engine: Engine) -> None:
+        """Creates the index and its triggers if they do not exist, existing currencies are indexed."""
+        try:
+            with engine.begin() as connection:
+                is_new = not engine.dialect.has_table(connection, self.TABLE_NAME)
+                for statement in self._DDL:
+                    connection.execute(db.text(statement))
+                if is_new:
+                    for statement in self._FILL:
+                        connection.execute(db.text(statement))
+        except OperationalError as e:
+            logger.warning('Currency search index is not available, LIKE search is used. Error: %s', e)
+            self._is_available = False
+            return
+        self._is_available = True
+
+    def search(self, text: str, limit: int) -> BaseQuery:
+        """Returns the active currencies with a code or name word starting with every word of the text."""
+        query = Currency.get_by(status=CurrencyStatuesInternal.active.value)
+        tokens = self._TOKEN_PATTERN.findall(text)
+        if not tokens:
+            return query.filter(db.false())
+        if not self._is_available:
+            return self._search_like(query, ' '.join(tokens), limit)
+
+        search_table = db.table(self.TABLE_NAME, db.column('rowid'), db.column('rank'))
+        # NOTE: every token is quoted, so the user input is never parsed as the FTS5 query syntax
+        match_query = ' '.join(f'"{token}"*' for token in tokens)
+        # NOTE: ranked and limited inside the index, only the best matches are joined with currencies.
+        #  The rank is bm25 with a code match weighted higher than a name match. The order and the
+        #  limit are in the same statement, so the limit keeps the best matches, not the first ones
+        ranked = db.select(search_table.c.rowid, search_table.c.rank) \
+            .where(db.literal_column(f'"{self.TABLE_NAME}"').match(match_query)) \
+            .order_by(search_table.c.rank) \
+            .limit(limit) \
+            .subquery()
+        return query.join(ranked, ranked.c.rowid == Currency.id) \
+            .order_by(ranked.c.rank, Currency.code)
+
+    @staticmethod
+    def _search_like(query: BaseQuery, prefix: str, limit: int) -> BaseQuery:
+        escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        code_matches = Currency.code.like(f'{escaped}%', escape='\\')
+        name_matches = db.or_(Currency.name.like(f'{escaped}%', escape='\\'),
+                              Currency.name.like(f'% {escaped}%', escape='\\'))
+        return query.filter(db.or_(code_matches, name_matches)) \
+            .order_by(db.case((code_matches, 0), else_=1), Currency.code) \
+            .limit(limit)
+
+
+currency_search_index = CurrencySearchIndex()
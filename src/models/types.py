@@ -0,0 +1,85 @@
+from decimal import Decimal, ROUND_HALF_EVEN
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import BigInteger, Column, Float, type_coerce
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.types import TypeDecorator
+
+
+class ScaledInteger(TypeDecorator):
+    """Fixed-point decimal stored as an integer number of 10^-scale units.
+
+    SQLite has no decimal type, so DECIMAL values are stored as floats. Scaled integers keep the
+    values exact, are compared as integers by indexes and comparisons with Decimal values are
+    exact too, the bound values are scaled the same way.
+    """
+    impl = BigInteger
+    cache_ok = True
+
+    def __init__(self, scale: int):
+        super().__init__()
+        self.scale: int = scale
+
+    @property
+    def python_type(self) -> type:
+        return Decimal
+
+    def process_bind_param(self, value: Any, dialect) -> Optional[int]:
+        if value is None:
+            return None
+        return int(Decimal(value).scaleb(self.scale).to_integral_value(rounding=ROUND_HALF_EVEN))
+
+    def process_literal_param(self, value: Any, dialect) -> str:
+        return str(self.process_bind_param(value, dialect))
+
+    def process_result_value(self, value: Optional[int], dialect) -> Optional[Decimal]:
+        if value is None:
+            return None
+        return Decimal(value).scaleb(-self.scale)
+
+    def as_float(self, column: ColumnElement) -> ColumnElement:
+        """Returns the values as floats divided by the database, skipping Decimal on the way out."""
+        return type_coerce(type_coerce(column, BigInteger) / float(10 ** self.scale), Float)
+
+
+def migrate_scaled_columns(engine: Engine, columns: Sequence[Column], is_fixed_point: bool, scale: int,
+                           flag: int, busy_timeout: float = 600) -> bool:
+    """Converts the stored values of the columns between DECIMAL and integers of 10^-scale units.
+
+    SQLite stores whole DECIMAL values as integers as well, so the format can not be told by the
+    stored values and is kept in the flag bit of the "user_version" pragma. The flag is read and
+    the values are converted in one write transaction, so processes starting at once convert them
+    only once. Returns whether the values were converted.
+    """
+    factor = 10 ** scale
+    # NOTE: a raw connection, the transaction is begun explicitly and pysqlite keeps it as it is
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        # NOTE: another process may hold the write lock for its whole conversion
+        cursor.execute(f'PRAGMA busy_timeout = {int(busy_timeout * 1000)}')
+        # NOTE: the write lock is taken before the flag is read, a process waiting for it reads the
+        #  flag set by the one which converted the values
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            user_version = cursor.execute('PRAGMA user_version').fetchone()[0]
+            if bool(user_version & flag) == is_fixed_point:
+                connection.rollback()
+                return False
+
+            for column in columns:
+                if is_fixed_point:
+                    value = f'CAST(ROUND("{column.name}" * {factor}) AS INTEGER)'
+                else:
+                    value = f'"{column.name}" / {factor}.0'
+                cursor.execute(f'UPDATE "{column.table.name}" SET "{column.name}" = {value}')
+            # NOTE: the pragma is a part of the same transaction, a failed migration leaves no trace
+            cursor.execute(f'PRAGMA user_version = {user_version ^ flag}')
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+    finally:
+        connection.close()
+    return True
@@ -0,0 +1,109 @@
+import hashlib
+import logging
+import math
+import struct
+import time
+from pathlib import Path
+from typing import Callable, FrozenSet, Optional
+
+from flask import Flask, current_app, request
+from werkzeug.exceptions import TooManyRequests
+
+from .shared_memory import SharedMemoryFile
+
+logger = logging.getLogger(__name__)
+
+
+def rate_limit_cost(cost: int) -> Callable:
+    """Sets how many tokens a request to the view method takes, one by default."""
+
+    def decorator(view_method: Callable) -> Callable:
+        view_method.rate_limit_cost = cost
+        return view_method
+
+    return decorator
+
+
+class TokenBuckets:
+    """Token buckets of the clients in a hash table shared by the worker processes.
+
+    Every slot keeps a client key hash, the tokens left and the time they were counted at. Buckets
+    are refilled lazily when they are taken from. A client whose slot was taken over by another one
+    simply starts with a full bucket again.
+    """
+    _SLOT: struct.Struct = struct.Struct('=Qdd')
+
+    def __init__(self, path: Path, slots: int, capacity: float, refill_rate: float):
+        self._memory: SharedMemoryFile = SharedMemoryFile(path, slots * self._SLOT.size)
+        self._slots: int = slots
+        self._capacity: float = capacity
+        self._refill_rate: float = refill_rate
+
+    def take(self, client_key: str, cost: float) -> float:
+        """Takes the tokens from the client bucket if there are enough of them.
+        Returns:
+            0 if the tokens were taken, otherwise seconds until the bucket has enough of them
+        """
+        key_hash = int.from_bytes(hashlib.blake2b(client_key.encode(), digest_size=8).digest(), 'little')
+        offset = key_hash % self._slots * self._SLOT.size
+        cost = min(cost, self._capacity)
+        with self._memory.locked() as buffer:
+            # NOTE: wall clock time, the file outlives the processes and even reboots
+            now = time.time()
+            stored_hash, tokens, counted_at = self._SLOT.unpack_from(buffer, offset)
+            if stored_hash != key_hash:
+                tokens, counted_at = self._capacity, now
+            tokens = min(self._capacity, tokens + max(now - counted_at, 0) * self._refill_rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait_time = 0
+            else:
+                wait_time = (cost - tokens) / self._refill_rate
+            self._SLOT.pack_into(buffer, offset, key_hash, tokens, now)
+        return wait_time
+
+
+class RateLimiter:
+    """Limits requests per client, identified by the 'X-Api-Key' header or by the IP address.
+
+    Only the configured API keys identify clients. The header is set by the client, so an unknown
+    key falls back to the address, otherwise a client would get a new bucket with every new key.
+
+    The check takes a flock and a few struct operations on shared memory, no database access.
+    NOTE: behind a reverse proxy the remote address has to be fixed up, e.g. with ProxyFix.
+    """
+    _API_KEY_HEADER: str = 'X-Api-Key'
+    _DEFAULT_COST: int = 1
+
+    def __init__(self):
+        self._buckets: Optional[TokenBuckets] = None
+        self._api_keys: FrozenSet[str] = frozenset()
+
+    def init_app(self, app: Flask, path: Path, slots: int, capacity: float, refill_rate: float,
+                 api_keys: FrozenSet[str]) -> None:
+        self._buckets = TokenBuckets(path, slots, capacity, refill_rate)
+        self._api_keys = api_keys
+        app.before_request(self._check_limit)
+
+    def _check_limit(self) -> None:
+        api_key = request.headers.get(self._API_KEY_HEADER)
+        # NOTE: the kinds are prefixed, so a key equal to an address does not share its bucket
+        if api_key in self._api_keys:
+            client_key = f'key:{api_key}'
+        else:
+            client_key = f'address:{request.remote_addr or ""}'
+        wait_time = self._buckets.take(client_key, self._get_cost())
+        if wait_time:
+            # NOTE: the API key is a credential, it is not logged
+            logger.warning('Client %s exceeded the rate limit, with a known API key: %s.',
+                           request.remote_addr, api_key in self._api_keys)
+            raise TooManyRequests('Rate limit exceeded, retry later.', retry_after=math.ceil(wait_time))
+
+    def _get_cost(self) -> int:
+        view_func = current_app.view_functions.get(request.endpoint)
+        view_class = getattr(view_func, 'view_class', None)
+        view_method = getattr(view_class, request.method.lower(), None)
+        return getattr(view_method, 'rate_limit_cost', self._DEFAULT_COST)
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,76 @@
+from typing import Any, Dict, List
+
+from marshmallow import ValidationError
+from marshmallow import fields, validate, validates, EXCLUDE
+from flask_marshmallow import fields as fma_fields
+
+from .core import BaseSchema
+from .fields import CurrencyField, CurrencyRate
+from src.models import Basket
+from src.enums import BasketExternalReprFieldNames as ExternalRepr
+from src.enums import BasketInternalReprFieldNames as InternalRepr
+from src.constans import DATETIME_FORMAT
+
+
+class BasketComponentSchema(BaseSchema):
+    class Meta:
+        unknown = EXCLUDE
+        ordered = True
+
+    currency = CurrencyField(data_key=ExternalRepr.currency.value, required=True)
+    weight = CurrencyRate(data_key=ExternalRepr.weight.value, required=True, places=5,
+                          validate=validate.Range(min=0, min_inclusive=False))
+
+
+class BasketSchema(BaseSchema):
+    __envelope__ = {'many': 'baskets'}
+    __model__ = Basket
+
+    _MAX_NAME_LENGTH: int = 50
+    _MAX_COMPONENTS: int = 100
+
+    class Meta:
+        unknown = EXCLUDE
+        ordered = True
+        fields = (
+            InternalRepr.id.value,
+            InternalRepr.name_.value,
+            InternalRepr.base_currency.value,
+            InternalRepr.components.value,
+            InternalRepr.created.value,
+            InternalRepr.updated.value,
+            InternalRepr.version.value,
+            InternalRepr.links.value,
+        )
+
+    id = fields.Integer(dump_only=True)
+    name = fields.Str(data_key=ExternalRepr.name_.value, required=True,
+                      validate=validate.Length(min=1, max=_MAX_NAME_LENGTH))
+    base_currency = CurrencyField(data_key=ExternalRepr.base_currency.value, required=True)
+    components = fields.List(fields.Nested(BasketComponentSchema()), data_key=ExternalRepr.components.value,
+                             required=True, validate=validate.Length(min=1, max=_MAX_COMPONENTS))
+    created = fields.DateTime(data_key=ExternalRepr.created.value, format=DATETIME_FORMAT, dump_only=True)
+    updated = fields.DateTime(data_key=ExternalRepr.updated.value, format=DATETIME_FORMAT, dump_only=True)
+    version = fields.Integer(data_key=ExternalRepr.version.value, dump_only=True)
+    _links = fma_fields.Hyperlinks({
+        ExternalRepr.links_self.value: fma_fields.URLFor('basket_api.basket_view',
+                                                         values={'record_id': '<id>'}),
+        ExternalRepr.links_collection.value: fma_fields.URLFor('basket_api.baskets_view'),
+    }, data_key=ExternalRepr.links.value)
+
+    @validates(InternalRepr.components.value)
+    def _validate_components(self, value: List[Dict[str, Any]]) -> None:
+        currencies = [component[InternalRepr.currency.value] for component in value]
+        if len(set(currencies)) != len(currencies):
+            raise ValidationError('Every currency may be a component of the basket only once.')
+
+
+class BasketValueSchema(BaseSchema):
+    class Meta:
+        ordered = True
+
+    basket_id = fields.Integer(data_key=ExternalRepr.id.value)
+    base_currency = fields.String(data_key=ExternalRepr.base_currency.value)
+    value = fields.Float(data_key=ExternalRepr.value.value, allow_none=True)
+    missing_currencies = fields.List(fields.String(), data_key=ExternalRepr.missing_currencies.value)
+    data_version = fields.Integer(data_key=ExternalRepr.data_version.value)
@@ -0,0 +1,32 @@
+from marshmallow import fields, validate, EXCLUDE
+
+from .core import BaseSchema
+from .fields import ChangeOperation
+from src.enums import ChangeExternalReprFieldNames as ExternalRepr
+
+
+class ChangesArgsSchema(BaseSchema):
+    _DEFAULT_LIMIT: int = 100
+    _MAX_LIMIT: int = 1000
+
+    class Meta:
+        unknown = EXCLUDE
+        ordered = True
+
+    since = fields.Integer(data_key=ExternalRepr.since.value, load_default=0,
+                           validate=validate.Range(min=0))
+    limit = fields.Integer(data_key=ExternalRepr.limit.value, load_default=_DEFAULT_LIMIT,
+                           validate=validate.Range(min=1, max=_MAX_LIMIT))
+
+
+class ChangeSchema(BaseSchema):
+    __envelope__ = {'many': 'changes'}
+
+    class Meta:
+        ordered = True
+
+    seq = fields.Integer(data_key=ExternalRepr.seq.value)
+    table = fields.Str(data_key=ExternalRepr.table.value)
+    record_id = fields.Integer(data_key=ExternalRepr.record_id.value)
+    operation = ChangeOperation(data_key=ExternalRepr.operation.value)
+    record = fields.Raw(data_key=ExternalRepr.record.value)
@@ -1,5 +1,5 @@
 from marshmallow import ValidationError
-from marshmallow import fields, validates, EXCLUDE
+from marshmallow import fields, validate, validates, EXCLUDE
 from flask_marshmallow import fields as fma_fields
 
 from .core import BaseSchema
@@ -29,6 +29,7 @@ class CurrencyDetailedSchema(BaseSchema):
             InternalRepr.code.value,
             InternalRepr.created.value,
             InternalRepr.updated.value,
+            InternalRepr.version.value,
             InternalRepr.links.value,
         )
 
@@ -38,6 +39,7 @@ class CurrencyDetailedSchema(BaseSchema):
     code = fields.Str(data_key=ExternalRepr.code.value, required=True, allow_none=False)
     created = fields.DateTime(data_key=ExternalRepr.created.value, format=DATETIME_FORMAT)
     updated = fields.DateTime(data_key=ExternalRepr.updated.value, format=DATETIME_FORMAT)
+    version = fields.Integer(data_key=ExternalRepr.version.value, dump_only=True)
     _links = fma_fields.Hyperlinks({
         ExternalRepr.links_self.value: fma_fields.URLFor('currency_api.currency_view',
                                                          values={'record_id': '<id>'}),
@@ -67,6 +69,7 @@ class CurrencySchema(CurrencyDetailedSchema):
             InternalRepr.status.value,
             InternalRepr.code.value,
             InternalRepr.name_.value,
+            InternalRepr.version.value,
         )
 
 
@@ -76,3 +79,18 @@ class CurrencyMinimalSchema(CurrencyDetailedSchema):
             InternalRepr.id.value,
             InternalRepr.code.value,
         )
+
+
+class CurrencySearchArgsSchema(BaseSchema):
+    _DEFAULT_LIMIT: int = 10
+    _MAX_LIMIT: int = 50
+    _MAX_QUERY_LENGTH: int = 64
+
+    class Meta:
+        unknown = EXCLUDE
+        ordered = True
+
+    query = fields.Str(data_key=ExternalRepr.query.value, required=True,
+                       validate=validate.Length(min=1, max=_MAX_QUERY_LENGTH))
+    limit = fields.Integer(data_key=ExternalRepr.limit.value, load_default=_DEFAULT_LIMIT,
+                           validate=validate.Range(min=1, max=_MAX_LIMIT))
@@ -0,0 +1,66 @@
+from marshmallow import fields
+
+from .core import BaseSchema
+from src.enums import SlowQueryFieldNames as SlowQueryRepr
+from src.enums import MemoryProfileFieldNames as MemoryProfileRepr
+from src.enums import EndpointMemoryFieldNames as EndpointMemoryRepr
+from src.enums import AllocationSiteFieldNames as AllocationSiteRepr
+
+
+class SlowQuerySchema(BaseSchema):
+    __envelope__ = {'many': 'slowQueries'}
+
+    class Meta:
+        ordered = True
+
+    recorded_at = fields.DateTime(data_key=SlowQueryRepr.recorded_at.value)
+    duration = fields.Method('get_duration_ms', data_key=SlowQueryRepr.duration.value)
+    statement = fields.String(data_key=SlowQueryRepr.statement.value)
+    parameters = fields.Raw(data_key=SlowQueryRepr.parameters.value)
+    endpoint = fields.String(data_key=SlowQueryRepr.endpoint.value)
+    request_id = fields.String(data_key=SlowQueryRepr.request_id.value)
+    plan = fields.List(fields.String(), data_key=SlowQueryRepr.plan.value)
+
+    @staticmethod
+    def get_duration_ms(obj) -> float:
+        return round(obj.duration * 1000, 3)
+
+
+class EndpointMemorySchema(BaseSchema):
+
+    class Meta:
+        ordered = True
+
+    endpoint = fields.String(data_key=EndpointMemoryRepr.endpoint.value)
+    stage = fields.String(data_key=EndpointMemoryRepr.stage.value)
+    count = fields.Integer(data_key=EndpointMemoryRepr.count.value)
+    net_avg = fields.Integer(data_key=EndpointMemoryRepr.net_avg.value)
+    peak_avg = fields.Integer(data_key=EndpointMemoryRepr.peak_avg.value)
+    peak_max = fields.Integer(data_key=EndpointMemoryRepr.peak_max.value)
+
+
+class AllocationSiteSchema(BaseSchema):
+
+    class Meta:
+        ordered = True
+
+    site = fields.String(data_key=AllocationSiteRepr.site.value)
+    size = fields.Integer(data_key=AllocationSiteRepr.size.value)
+    count = fields.Integer(data_key=AllocationSiteRepr.count.value)
+    size_diff = fields.Integer(data_key=AllocationSiteRepr.size_diff.value)
+    count_diff = fields.Integer(data_key=AllocationSiteRepr.count_diff.value)
+    growth_snapshots = fields.Integer(data_key=AllocationSiteRepr.growth_snapshots.value)
+
+
+class MemoryProfileSchema(BaseSchema):
+
+    class Meta:
+        ordered = True
+
+    traced = fields.Integer(data_key=MemoryProfileRepr.traced.value)
+    traced_peak = fields.Integer(data_key=MemoryProfileRepr.traced_peak.value)
+    snapshot_at = fields.DateTime(data_key=MemoryProfileRepr.snapshot_at.value)
+    endpoints = fields.List(fields.Nested(EndpointMemorySchema()), data_key=MemoryProfileRepr.endpoints.value)
+    top_sites = fields.List(fields.Nested(AllocationSiteSchema()), data_key=MemoryProfileRepr.top_sites.value)
+    suspected_leaks = fields.List(fields.Nested(AllocationSiteSchema()),
+                                  data_key=MemoryProfileRepr.suspected_leaks.value)
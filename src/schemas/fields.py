@@ -4,7 +4,8 @@ from typing import Dict, Any
 from marshmallow import fields
 from marshmallow import ValidationError
 
-from src.enums import CurrencyStatuesExternal, RateOperationTypes
+from src.enums import (CurrencyStatuesExternal, RateOperationTypes, ChangeOperationsExternal,
+                       ChangeOperationsInternal)
 from src.models import Currency, Rate
 
 
@@ -60,10 +61,28 @@ class OperationType(fields.Field):
                                   f'Allowed operation types: {list(self._deserialize_map)}') from e
 
 
+class ChangeOperation(fields.Field):
+    _serialize_map: Dict[str, str] = {
+        ChangeOperationsInternal.created.value: ChangeOperationsExternal.created.value,
+        ChangeOperationsInternal.updated.value: ChangeOperationsExternal.updated.value,
+        ChangeOperationsInternal.deleted.value: ChangeOperationsExternal.deleted.value,
+    }
+
+    def _serialize(self, value: Any, attr: str, obj: Any, **kwargs) -> str:
+        """ORM object -> JSON"""
+        try:
+            return self._serialize_map[value]
+        except KeyError as e:
+            raise ValidationError(f'Invalid change operation {e}. '
+                                  f'Allowed operations: {list(self._serialize_map)}') from e
+
+
 class CurrencyRate(fields.Decimal):
 
     def _serialize(self, value: Any, attr: str, obj: Rate, **kwargs) -> float:
         """ORM object -> JSON"""
+        if value is None:
+            return None
         try:
             return float(value)
         except Exception as e:
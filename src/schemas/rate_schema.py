@@ -1,13 +1,15 @@
 from typing import Tuple
 
-from marshmallow import fields, EXCLUDE
+from marshmallow import fields, validate, EXCLUDE
 from flask_marshmallow import fields as fma_basic
 
 from .core import BaseSchema
 from .fields import OperationType, CurrencyRate, CurrencyField
 from .currency_schema import CurrencyMinimalSchema
 from src.models import Rate
-from src.enums import RateOperationTypes
+from src.enums import RateOperationTypes, RateOhlcIntervals
+from src.enums import RateCandleFieldNames as CandleRepr
+from src.enums import RateAnomalyFieldNames as AnomalyRepr
 from src.enums import RateExternalReprFieldFieldNames as ExternalRepr
 from src.enums import RateInternalReprFieldFieldNames as InternalRepr
 from src.constans import DATETIME_FORMAT
@@ -32,6 +34,7 @@ class RateSchema(BaseSchema):
             InternalRepr.rate.value,
             InternalRepr.operation_type.value,
             InternalRepr.is_cash.value,
+            InternalRepr.version.value,
         )
 
     id = fields.Integer()
@@ -41,6 +44,7 @@ class RateSchema(BaseSchema):
                                    allow_nan=False)
     rate = CurrencyRate(data_key=ExternalRepr.rate.value, required=True, places=5)
     is_cash = fields.Boolean(data_key=ExternalRepr.is_cash.value, required=True)
+    version = fields.Integer(data_key=ExternalRepr.version.value, dump_only=True)
 
 
 class RateDetailsExternalSchema(RateSchema):
@@ -58,6 +62,7 @@ class RateDetailsExternalSchema(RateSchema):
             InternalRepr.is_cash.value,
             InternalRepr.created.value,
             InternalRepr.updated.value,
+            InternalRepr.version.value,
             InternalRepr.links.value,
         )
 
@@ -110,3 +115,118 @@ class UpdateRateExternalSchema(RateSchema):
             InternalRepr.rate.value,
             InternalRepr.is_cash.value,
         )
+
+
+class BestRateSchema(RateSchema):
+    __envelope__ = {'many': 'bestRates'}
+
+    class Meta:
+        unknown = EXCLUDE
+        ordered = True
+        fields = (
+            InternalRepr.currency.value,
+            InternalRepr.base_currency.value,
+            InternalRepr.operation_type.value,
+            InternalRepr.is_cash.value,
+            InternalRepr.rate.value,
+            InternalRepr.rate_id.value,
+            InternalRepr.updated.value,
+        )
+
+    rate_id = fields.Integer(data_key=ExternalRepr.rate_id.value)
+    updated = fields.DateTime(data_key=ExternalRepr.updated.value, format=DATETIME_FORMAT)
+
+
+class BestRateArgsSchema(RateSchema):
+    class Meta:
+        unknown = EXCLUDE
+        ordered = True
+        fields = (
+            InternalRepr.currency.value,
+            InternalRepr.base_currency.value,
+            InternalRepr.operation_type.value,
+            InternalRepr.is_cash.value,
+        )
+
+    operation_type = OperationType(data_key=ExternalRepr.operation_type.value)
+    is_cash = fields.Boolean(data_key=ExternalRepr.is_cash.value)
+
+
+class RateFilterArgsSchema(RateSchema):
+    class Meta:
+        unknown = EXCLUDE
+        ordered = True
+        fields = (
+            InternalRepr.currency.value,
+            InternalRepr.base_currency.value,
+            InternalRepr.rate.value,
+            InternalRepr.operation_type.value,
+            InternalRepr.is_cash.value,
+            InternalRepr.min_rate.value,
+            InternalRepr.max_rate.value,
+        )
+
+    currency = CurrencyField(data_key=ExternalRepr.currency.value)
+    base_currency = CurrencyField(data_key=ExternalRepr.base_currency.value)
+    rate = CurrencyRate(data_key=ExternalRepr.rate.value, places=5)
+    operation_type = OperationType(data_key=ExternalRepr.operation_type.value)
+    is_cash = fields.Boolean(data_key=ExternalRepr.is_cash.value)
+    # NOTE: inclusive bounds
+    min_rate = CurrencyRate(data_key=ExternalRepr.min_rate.value, places=5)
+    max_rate = CurrencyRate(data_key=ExternalRepr.max_rate.value, places=5)
+
+
+class OhlcArgsSchema(RateSchema):
+    class Meta:
+        unknown = EXCLUDE
+        ordered = True
+        fields = (
+            InternalRepr.currency.value,
+            InternalRepr.base_currency.value,
+            InternalRepr.is_cash.value,
+            InternalRepr.interval.value,
+            InternalRepr.date_from.value,
+            InternalRepr.date_to.value,
+        )
+
+    is_cash = fields.Boolean(data_key=ExternalRepr.is_cash.value)
+    interval = fields.Str(data_key=ExternalRepr.interval.value, required=True,
+                          validate=validate.OneOf([item.value for item in RateOhlcIntervals]))
+    date_from = fields.DateTime(data_key=ExternalRepr.date_from.value)
+    date_to = fields.DateTime(data_key=ExternalRepr.date_to.value)
+
+
+class CandleSideSchema(BaseSchema):
+    class Meta:
+        ordered = True
+
+    open = CurrencyRate(data_key=CandleRepr.open.value, places=5)
+    high = CurrencyRate(data_key=CandleRepr.high.value, places=5)
+    low = CurrencyRate(data_key=CandleRepr.low.value, places=5)
+    close = CurrencyRate(data_key=CandleRepr.close.value, places=5)
+    ticks = fields.Integer(data_key=CandleRepr.ticks.value)
+
+
+class CandleSchema(BaseSchema):
+    __envelope__ = {'many': 'candles'}
+
+    class Meta:
+        ordered = True
+
+    start = fields.DateTime(data_key=CandleRepr.start.value)
+    buy = fields.Nested(CandleSideSchema(), data_key=CandleRepr.buy.value, allow_none=True)
+    sell = fields.Nested(CandleSideSchema(), data_key=CandleRepr.sell.value, allow_none=True)
+    spread = CurrencyRate(data_key=CandleRepr.spread.value, places=5)
+    ticks = fields.Integer(data_key=CandleRepr.ticks.value)
+
+
+class AnomalySchema(BaseSchema):
+    __envelope__ = {'many': 'anomalies'}
+
+    class Meta:
+        ordered = True
+
+    is_cash = fields.Boolean(data_key=AnomalyRepr.is_cash.value)
+    cycle = fields.List(fields.String(), data_key=AnomalyRepr.cycle.value)
+    rate_ids = fields.List(fields.Integer(), data_key=AnomalyRepr.rate_ids.value)
+    profit = fields.Float(data_key=AnomalyRepr.profit.value)
@@ -0,0 +1,59 @@
+import fcntl
+import logging
+import mmap
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SharedMemoryFile:
+    """A file of a fixed size mapped into the memory of every worker process.
+
+    The file is mapped lazily and remapped after a fork: flock locks are shared by the forked
+    processes, so every process has to open the file itself.
+    """
+
+    def __init__(self, path: Path, size: int):
+        self._path: Path = path
+        self._size: int = size
+        self._lock: threading.Lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._file: Optional[IO] = None
+        self._buffer: Optional[mmap.mmap] = None
+
+    @property
+    def buffer(self) -> mmap.mmap:
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._map()
+        return self._buffer
+
+    @contextmanager
+    def locked(self) -> Iterator[mmap.mmap]:
+        """Serializes writers of all threads and processes."""
+        buffer = self.buffer
+        with self._lock:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                yield buffer
+            finally:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+
+    def _map(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        file = open(self._path, 'a+b')
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            if os.fstat(file.fileno()).st_size < self._size:
+                file.truncate(self._size)
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+        self._file = file
+        self._buffer = mmap.mmap(file.fileno(), self._size, access=mmap.ACCESS_WRITE)
+        self._pid = os.getpid()
+        logger.info('Shared memory is mapped from %s', self._path)
@@ -0,0 +1,142 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Deque, List, NamedTuple, Optional
+
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .structured_logging import logging_pipeline, request_id_var
+
+logger = logging.getLogger(__name__)
+# NOTE: full records go only to the slow queries file, the main log gets a short line
+records_logger = logging.getLogger(f'{__name__}.records')
+
+
+class SlowQuery(NamedTuple):
+    recorded_at: datetime
+    duration: float
+    statement: str
+    parameters: Any
+    endpoint: Optional[str]
+    request_id: Optional[str]
+    plan: Optional[List[str]]
+
+
+class SlowQueryDetector:
+    """Records the statements of all engines which took longer than the threshold.
+
+    A record keeps the statement, its redacted parameters, the endpoint or the background thread
+    which executed it and the query plan. The last records are kept in a ring buffer.
+
+    NOTE: the plan is explained right after the statement on the same connection, so it is the
+    plan the statement was actually executed with. Only SQLite plans are captured.
+    """
+    _STARTED_AT_KEY: str = 'slow_query_started_at'
+    # NOTE: values which can not contain personal or secret data are kept as they are
+    _SAFE_PARAMETER_TYPES: tuple = (int, float, Decimal, bool, type(None), datetime)
+
+    def __init__(self):
+        self._threshold: float = 0.1
+        self._lock: threading.Lock = threading.Lock()
+        self._records: Deque[SlowQuery] = deque(maxlen=100)
+        self._is_logging_records: bool = False
+
+    def init_app(self, threshold: float, max_records: int, log_path: Optional[Path]) -> None:
+        self._threshold = threshold
+        with self._lock:
+            self._records = deque(self._records, maxlen=max_records)
+
+        if log_path is not None:
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+            handler = logging.FileHandler(log_path)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            # NOTE: written by the listener thread of the logging pipeline, not by the request
+            logging_pipeline.route(records_logger.name, handler)
+            self._is_logging_records = True
+
+        # NOTE: listens to every engine, e.g. to the read-only one as well
+        if not event.contains(Engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.listen(Engine, 'handle_error', self._handle_error)
+
+    def get_records(self) -> List[SlowQuery]:
+        """Returns the recorded slow queries, the latest first."""
+        with self._lock:
+            return list(reversed(self._records))
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault(self._STARTED_AT_KEY, []).append((context, time.perf_counter()))
+
+    def _handle_error(self, exception_context) -> None:
+        # NOTE: a failed statement is not followed by after_cursor_execute, its start time is dropped
+        #  here. The error may also come before the statement was executed or after its results
+        #  were fetched, then the start time is not the one of the failed statement
+        if exception_context.connection is None:
+            return
+        started_at = exception_context.connection.info.get(self._STARTED_AT_KEY)
+        if started_at and started_at[-1][0] is exception_context.execution_context:
+            started_at.pop()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        _, started_at = conn.info[self._STARTED_AT_KEY].pop()
+        duration = time.perf_counter() - started_at
+        if duration < self._threshold:
+            return
+
+        plan = None if executemany else self._explain(conn, cursor, statement, parameters)
+        record = SlowQuery(
+            recorded_at=datetime.now(timezone.utc),
+            duration=duration,
+            statement=statement,
+            parameters=self._redact(parameters),
+            endpoint=request.endpoint if has_request_context() else threading.current_thread().name,
+            request_id=request_id_var.get(),
+            plan=plan,
+        )
+        with self._lock:
+            self._records.append(record)
+
+        logger.warning('Slow query took %.1f ms at %s: %s', duration * 1000, record.endpoint, statement)
+        if self._is_logging_records:
+            entry = record._asdict()
+            entry['recorded_at'] = record.recorded_at.isoformat()
+            records_logger.warning(json.dumps(entry, default=str))
+
+    def _redact(self, parameters: Any) -> Any:
+        if isinstance(parameters, dict):
+            return {key: self._redact(value) for key, value in parameters.items()}
+        if isinstance(parameters, (list, tuple)):
+            return [self._redact(value) for value in parameters]
+        if isinstance(parameters, self._SAFE_PARAMETER_TYPES):
+            return parameters
+        return f'<{type(parameters).__name__}>'
+
+    @staticmethod
+    def _explain(conn, cursor, statement: str, parameters: Any) -> Optional[List[str]]:
+        if conn.dialect.name != 'sqlite':
+            return None
+
+        try:
+            rows = cursor.connection.execute(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+        except Exception as e:
+            logger.error('Failed to explain a slow query. Error: %s', e)
+            return None
+
+        # NOTE: rows are (id, parent id, unused, detail), the nesting is kept by the indentation
+        depths = {0: -1}
+        plan = []
+        for row_id, parent_id, _, detail in rows:
+            depths[row_id] = depths.get(parent_id, -1) + 1
+            plan.append(f'{"  " * depths[row_id]}{detail}')
+        return plan
+
+
+slow_query_detector = SlowQueryDetector()
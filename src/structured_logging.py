@@ -0,0 +1,204 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+# NOTE: set for the time of a request, records logged outside of requests have no id
+request_id_var: ContextVar[Optional[str]] = ContextVar('request_id', default=None)
+
+# NOTE: deliberate process-wide settings of the logging module, applied once on import. No record
+#  is formatted with the caller position or the process name, so they are not collected for every
+#  record, see "Optimization" in the logging docs. The caller position has no public switch,
+#  logging._srcfile is the one the docs name. The process id and the thread name are formatted.
+logging._srcfile = None
+logging.logMultiprocessing = False
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the id of the current request, before they leave the request thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SampledLogger(logging.LoggerAdapter):
+    """Logger of a hot path which keeps only a share of its records below WARNING.
+
+    The share is configured by the logger name or the name of its parent, e.g. {'src.api': 0.1}
+    keeps every tenth record of the API. Dropped records are not even created.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        super().__init__(logger, {})
+
+    def isEnabledFor(self, level: int) -> bool:
+        if not self.logger.isEnabledFor(level):
+            return False
+        if level >= logging.WARNING:
+            return True
+        rate = logging_pipeline.get_sample_rate(self.logger.name)
+        return rate >= 1 or random.random() < rate
+
+
+def get_sampled_logger(name: str) -> SampledLogger:
+    return SampledLogger(logging.getLogger(name))
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a single line JSON object."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'requestId': getattr(record, 'request_id', None),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Puts records to the queue as they are, they are formatted by the listener thread.
+
+    NOTE: the log arguments are formatted later, so a mutable argument changed right after the
+    logging call is logged with its new value.
+    When the queue is full the records are dropped instead of blocking the request.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped: int = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RoutingHandler(logging.Handler):
+    """Passes every record to the handler routed for its logger or its closest ancestor.
+
+    The records of the loggers without a route go to the default handler.
+    """
+
+    def __init__(self, default_handler: logging.Handler, routes: Dict[str, logging.Handler]):
+        super().__init__()
+        self._default_handler: logging.Handler = default_handler
+        self._routes: Dict[str, logging.Handler] = routes
+
+    def emit(self, record: logging.LogRecord) -> None:
+        name = record.name
+        while name:
+            handler = self._routes.get(name)
+            if handler is not None:
+                handler.handle(record)
+                return
+            name = name.rpartition('.')[0]
+        self._default_handler.handle(record)
+
+
+class LoggingPipeline:
+    """Root logger handler which writes the records from a background thread.
+
+    The request threads only filter records and put them to a bounded queue, formatting and
+    writing happen on the listener thread. The listener is restarted in forked workers.
+
+    The records of a logger can be routed to another handler, e.g. to a file of their own. They
+    go through the same queue, so the request threads never write them either.
+    """
+
+    def __init__(self):
+        self._handler: Optional[NonBlockingQueueHandler] = None
+        self._listener: Optional[QueueListener] = None
+        self._output_handler: Optional[logging.Handler] = None
+        # NOTE: output handlers by logger names, the listener reads them, so they are only added
+        self._routes: Dict[str, logging.Handler] = {}
+        self._queue_size: int = 10000
+        self._sample_rates: Dict[str, float] = {}
+        # NOTE: resolved rates by logger names, there are only as many of them as loggers
+        self._resolved_rates: Dict[str, float] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def configure(self, level: str, sample_rates: Dict[str, float], queue_size: int) -> None:
+        with self._lock:
+            if self._handler is None:
+                self._output_handler = logging.StreamHandler(sys.stderr)
+                self._output_handler.setFormatter(JsonFormatter())
+                self._handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+                self._handler.addFilter(RequestIdFilter())
+                os.register_at_fork(after_in_child=self._restart)
+                atexit.register(self.stop)
+            self._queue_size = queue_size
+            self._sample_rates = sample_rates
+            self._resolved_rates = {}
+
+            root_logger = logging.getLogger()
+            for handler in list(root_logger.handlers):
+                root_logger.removeHandler(handler)
+            root_logger.addHandler(self._handler)
+            root_logger.setLevel(level)
+            self._start()
+
+    def route(self, logger_name: str, handler: logging.Handler) -> None:
+        """Writes the records of the logger and its children with the handler instead of the main output."""
+        with self._lock:
+            self._routes[logger_name] = handler
+
+    def get_sample_rate(self, logger_name: str) -> float:
+        rate = self._resolved_rates.get(logger_name)
+        if rate is None:
+            rate = self._resolved_rates[logger_name] = self._resolve_sample_rate(logger_name)
+        return rate
+
+    @property
+    def dropped(self) -> int:
+        return self._handler.dropped if self._handler else 0
+
+    def stop(self) -> None:
+        """Writes the queued records and stops the listener."""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def _resolve_sample_rate(self, logger_name: str) -> float:
+        name = logger_name
+        while name:
+            if name in self._sample_rates:
+                return self._sample_rates[name]
+            name = name.rpartition('.')[0]
+        return 1
+
+    def _start(self) -> None:
+        if self._listener is None:
+            self._listener = QueueListener(self._handler.queue,
+                                           RoutingHandler(self._output_handler, self._routes))
+            self._listener.start()
+
+    def _restart(self) -> None:
+        # NOTE: the listener thread does not survive a fork and the queue locks might have been
+        #  held by another thread at that moment, so the child gets new ones
+        self._lock = threading.Lock()
+        self._listener = None
+        self._handler.queue = queue.Queue(self._queue_size)
+        self._start()
+
+
+logging_pipeline = LoggingPipeline()
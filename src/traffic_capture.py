@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, IO, Optional, Tuple
+
+from flask import Flask, g, request, Response
+
+logger = logging.getLogger(__name__)
+
+
+class TrafficRecorder:
+    """Records the served requests to a JSON lines file, it is replayed by scripts/replay.py.
+
+    A record keeps the method, the path, the route, the query args, the JSON body, the status and
+    the duration of a request, with short keys to keep the file compact:
+    {"t": started at, "m": method, "p": path, "r": route, "a": args, "b": body, "h": headers,
+     "s": status, "d": duration in ms}
+
+    Requests are sanitized before they are written. Only the headers needed to replay the request
+    as it was are kept, the values of the fields named like secrets are masked, the bodies which
+    are not JSON or larger than the limit are dropped. Client addresses are not recorded.
+
+    NOTE: every worker process appends to the same file, a record is written by a single write
+    call, so the records of the workers are not interleaved.
+    """
+    # NOTE: the debug endpoints are not a part of the traffic and the streams never end
+    _SKIPPED_BLUEPRINTS: Tuple[str, ...] = ('debug_api',)
+    _KEPT_HEADERS: Tuple[str, ...] = ('Accept-Encoding', 'If-None-Match')
+    _SECRET_FIELD_PATTERN: re.Pattern = re.compile(r'pass|secret|token|key|auth', re.IGNORECASE)
+    _MASK: str = '***'
+    _STARTED_AT_KEY: str = 'traffic_capture_started_at'
+
+    def __init__(self):
+        self._path: Optional[Path] = None
+        self._sample_rate: float = 1
+        self._max_body_size: int = 4096
+        self._lock: threading.Lock = threading.Lock()
+        self._file: Optional[IO] = None
+        self._file_pid: Optional[int] = None
+
+    def init_app(self, app: Flask, path: Path, sample_rate: float, max_body_size: int) -> None:
+        self._path = path
+        self._sample_rate = sample_rate
+        self._max_body_size = max_body_size
+        path.parent.mkdir(parents=True, exist_ok=True)
+        app.before_request(self._start)
+        app.after_request(self._record)
+        logger.info('Traffic capture to %s is enabled.', path)
+
+    def _start(self) -> None:
+        if request.blueprint in self._SKIPPED_BLUEPRINTS:
+            return
+        if self._sample_rate < 1 and random.random() >= self._sample_rate:
+            return
+        setattr(g, self._STARTED_AT_KEY, (time.time(), time.perf_counter()))
+
+    def _record(self, response: Response) -> Response:
+        started_at = g.pop(self._STARTED_AT_KEY, None)
+        if started_at is None or response.is_streamed:
+            return response
+
+        started_at_time, started_at_counter = started_at
+        entry = {
+            't': round(started_at_time, 6),
+            'm': request.method,
+            'p': request.path,
+            'r': request.url_rule.rule if request.url_rule else None,
+            'a': self._sanitize({key: request.args.getlist(key) for key in request.args}),
+            'b': self._get_body(),
+            'h': {name: request.headers[name] for name in self._KEPT_HEADERS if name in request.headers},
+            's': response.status_code,
+            'd': round((time.perf_counter() - started_at_counter) * 1000, 3),
+        }
+        try:
+            self._write(json.dumps(entry, separators=(',', ':'), default=str) + '\n')
+        except OSError as e:
+            logger.error('Failed to write a traffic capture record. Error: %s', e)
+        return response
+
+    def _get_body(self) -> Any:
+        if not request.content_length or request.content_length > self._max_body_size:
+            return None
+        body = request.get_json(silent=True)
+        return self._sanitize(body) if body is not None else None
+
+    def _sanitize(self, value: Any) -> Any:
+        if isinstance(value, dict):
+            return {key: self._MASK if self._SECRET_FIELD_PATTERN.search(str(key)) else self._sanitize(item)
+                    for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._sanitize(item) for item in value]
+        return value
+
+    def _write(self, line: str) -> None:
+        with self._lock:
+            # NOTE: a file opened before a fork would be shared with the parent process
+            if self._file is None or self._file_pid != os.getpid():
+                self._file = open(self._path, 'a', buffering=1, encoding='utf-8')
+                self._file_pid = os.getpid()
+            self._file.write(line)
+
+
+traffic_recorder = TrafficRecorder()
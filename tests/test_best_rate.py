@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+
+from src.models import db, BestRate, Currency, Rate
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / "db.sqlite"}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        Currency.create(code='USD', name='Dollar')
+        Currency.create(code='UAH', name='Hryvnia')
+        yield app
+        db.engine.dispose()
+
+
+def create_rate(rate: str, operation_type: str = 'b') -> Rate:
+    return Rate.create(currency_id=1, base_id=2, operation_type=operation_type, rate=Decimal(rate),
+                       is_cash=True)
+
+
+def get_best_rate(operation_type: str = 'b'):
+    best = BestRate.query.get(BestRate.get_key(2, 1, operation_type, True))
+    return best and (best.rate_id, best.rate)
+
+
+def rebuild_best_rate(operation_type: str = 'b'):
+    BestRate.rebuild()
+    return get_best_rate(operation_type)
+
+
+@pytest.mark.usefixtures('app')
+def test_best_rate_is_kept_on_create():
+    create_rate('27.1')
+    create_rate('27.3')
+    create_rate('27.2')
+    create_rate('27.0', 's')
+    create_rate('26.9', 's')
+    assert get_best_rate() == (2, Decimal('27.3'))
+    assert get_best_rate('s') == (5, Decimal('26.9'))
+
+
+@pytest.mark.usefixtures('app')
+def test_newest_of_equal_rates_is_the_best():
+    create_rate('27.1')
+    create_rate('27.1')
+    assert get_best_rate() == (2, Decimal('27.1'))
+    assert rebuild_best_rate() == (2, Decimal('27.1'))
+
+    Rate.get(1).update({'rate': Decimal('27.3')})
+    Rate.get(1).update({'rate': Decimal('27.1')})
+    assert get_best_rate() == (2, Decimal('27.1'))
+    assert rebuild_best_rate() == (2, Decimal('27.1'))
+
+
+@pytest.mark.usefixtures('app')
+def test_best_rate_is_kept_on_update():
+    create_rate('27.1')
+    create_rate('27.2')
+    Rate.get(1).update({'rate': Decimal('27.3')})
+    assert get_best_rate() == (1, Decimal('27.3'))
+    Rate.get(1).update({'rate': Decimal('27.4')})
+    assert get_best_rate() == (1, Decimal('27.4'))
+    Rate.get(1).update({'rate': Decimal('27.0')})
+    assert get_best_rate() == (2, Decimal('27.2'))
+    Rate.get(2).update({'operation_type': 's'})
+    assert get_best_rate() == (1, Decimal('27.0'))
+    assert get_best_rate('s') == (2, Decimal('27.2'))
+
+
+@pytest.mark.usefixtures('app')
+def test_best_rate_is_kept_on_hard_delete():
+    create_rate('27.1')
+    create_rate('27.2')
+    Rate.get(1).hard_delete()
+    assert get_best_rate() == (2, Decimal('27.2'))
+    Rate.get(2).hard_delete()
+    assert get_best_rate() is None
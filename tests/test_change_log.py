@@ -0,0 +1,50 @@
+import pytest
+from flask import Flask
+
+from src.compaction import ChangeLogCompactor
+from src.models import db, ChangeLog
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / "db.sqlite"}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        ChangeLog.__table__.create(db.engine)
+        yield app
+        db.engine.dispose()
+
+
+@pytest.fixture
+def compactor(app, tmp_path):
+    return ChangeLogCompactor(app, interval=60, batch_size=2, batch_pause=0,
+                              lock_path=tmp_path / 'compactor.lock')
+
+
+def record(*entries):
+    for table_name, record_id, operation in entries:
+        ChangeLog.record(table_name, record_id, operation)
+    db.session.commit()
+
+
+def get_entries():
+    return [(entry.seq, entry.table_name, entry.record_id, entry.operation)
+            for entry in ChangeLog.query.order_by(ChangeLog.seq)]
+
+
+def test_only_the_latest_entry_of_a_record_is_kept(compactor):
+    record(('Rate', 1, 'c'), ('Rate', 2, 'c'), ('Currency', 1, 'c'), ('Rate', 1, 'u'), ('Rate', 1, 'd'))
+    compactor.compact()
+    assert get_entries() == [(2, 'Rate', 2, 'c'), (3, 'Currency', 1, 'c'), (5, 'Rate', 1, 'd')]
+
+
+def test_compacted_entries_are_superseded_by_the_new_ones(compactor):
+    record(('Rate', 1, 'c'), ('Rate', 2, 'c'))
+    compactor.compact()
+    assert get_entries() == [(1, 'Rate', 1, 'c'), (2, 'Rate', 2, 'c')]
+
+    record(('Rate', 2, 'u'))
+    compactor.compact()
+    assert get_entries() == [(1, 'Rate', 1, 'c'), (3, 'Rate', 2, 'u')]
@@ -0,0 +1,51 @@
+import time
+
+import pytest
+from flask import Flask
+
+from src.idempotency import IdempotencyStore, StoredResponse
+from src.models import db, IdempotencyKey
+
+KEY = ('POST', '/api/v1/rates', 'key')
+RESPONSE = StoredResponse(201, b'{"id": 1}', 'application/json', {'ETag': '"1"'})
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / "db.sqlite"}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        IdempotencyKey.__table__.create(db.engine)
+        yield app
+        db.engine.dispose()
+
+
+def test_reserved_key_returns_the_response(app):
+    store = IdempotencyStore()
+    assert store.reserve(KEY, 'fingerprint') is None
+    assert store.reserve(KEY, 'fingerprint') == ('fingerprint', None)
+    store.complete(KEY, RESPONSE)
+    assert store.reserve(KEY, 'fingerprint') == ('fingerprint', RESPONSE)
+
+
+def test_released_key_can_be_reserved_again(app):
+    store = IdempotencyStore()
+    store.reserve(KEY, 'fingerprint')
+    store.release(KEY)
+    assert store.reserve(KEY, 'other fingerprint') is None
+
+
+def test_unfinished_reservation_expires(app):
+    store = IdempotencyStore(reservation_timeout=0.1)
+    store.reserve(KEY, 'fingerprint')
+    time.sleep(0.15)
+    assert store.reserve(KEY, 'fingerprint') is None
+
+
+def test_oldest_keys_are_evicted(app):
+    store = IdempotencyStore(max_entries=3)
+    for index in range(5):
+        store.reserve(('POST', '/api/v1/rates', str(index)), 'fingerprint')
+    assert [key for key, in db.session.query(IdempotencyKey.key).order_by(IdempotencyKey.id)] == ['2', '3', '4']
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from src.leadership import LeaderElectedWorker
+
+
+class CountingWorker(LeaderElectedWorker):
+    _LEADERSHIP_RETRY_INTERVAL = 0.01
+
+    def __init__(self, lock_path, interval=0.01):
+        super().__init__('counting-worker', lock_path)
+        self.runs = 0
+        self.is_leading = threading.Event()
+        self._interval = interval
+
+    def _lead(self):
+        self.is_leading.set()
+        self._run_periodically(self._count, self._interval, 'Failed to count.')
+
+    def _count(self):
+        self.runs += 1
+        if self.runs == 1:
+            raise ValueError('the first run fails')
+
+
+def test_only_one_worker_leads(tmp_path):
+    workers = [CountingWorker(tmp_path / 'worker.lock') for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    try:
+        time.sleep(0.2)
+        assert sum(worker.is_leading.is_set() for worker in workers) == 1
+    finally:
+        for worker in workers:
+            worker.stop()
+
+
+def test_failed_run_does_not_stop_the_worker(tmp_path):
+    worker = CountingWorker(tmp_path / 'worker.lock')
+    worker.start()
+    try:
+        assert worker.is_leading.wait(1)
+        time.sleep(0.1)
+        assert worker.runs > 1
+    finally:
+        worker.stop()
+
+
+def test_stopped_worker_does_not_lead(tmp_path):
+    leader = CountingWorker(tmp_path / 'worker.lock')
+    leader.start()
+    follower = CountingWorker(tmp_path / 'worker.lock')
+    try:
+        assert leader.is_leading.wait(1)
+        follower.stop()
+        follower.start()
+        assert not follower.is_leading.wait(0.1)
+    finally:
+        leader.stop()
+
+
+def test_stopped_leader_hands_over(tmp_path):
+    leader = CountingWorker(tmp_path / 'worker.lock')
+    leader.start()
+    follower = CountingWorker(tmp_path / 'worker.lock')
+    try:
+        assert leader.is_leading.wait(1)
+        follower.start()
+        assert not follower.is_leading.wait(0.1)
+        leader.stop()
+        assert follower.is_leading.wait(1)
+    finally:
+        leader.stop()
+        follower.stop()
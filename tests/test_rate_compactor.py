@@ -0,0 +1,88 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+
+from src.compaction import RateCompactor
+from src.enums import ChangeOperationsInternal
+from src.events import rate_events
+from src.models import db, BestRate, ChangeLog, Currency, Rate, RateCandle, RateCompactionState
+
+NOW = datetime.datetime.utcnow()
+EXPIRED = datetime.datetime(NOW.year, NOW.month, NOW.day, 10) - datetime.timedelta(days=10)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / "db.sqlite"}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        currency = Currency.create(code='USD', name='Dollar')
+        base_currency = Currency.create(code='UAH', name='Hryvnia')
+        for rate, created in (('27.0', EXPIRED), ('28.0', EXPIRED + datetime.timedelta(seconds=30)),
+                              ('27.5', EXPIRED + datetime.timedelta(seconds=70)), ('26.0', NOW)):
+            Rate.create(currency_id=currency.id, base_id=base_currency.id, operation_type='b',
+                        rate=Decimal(rate), is_cash=True, created=created)
+        yield app
+        db.engine.dispose()
+
+
+@pytest.fixture
+def compactor(app, tmp_path):
+    # NOTE: batches of two rates, so the hour candle is merged from two batches
+    return RateCompactor(app, raw_retention=7 * 24 * 60 * 60, candle_retention={'1m': None, '1h': None},
+                         interval=60, batch_size=2, batch_pause=0, vacuum_pages=10,
+                         analyze_interval=60 * 60, lock_path=tmp_path / 'compactor.lock')
+
+
+def get_rate_ids():
+    db.session.expire_all()
+    return [rate_id for rate_id, in db.session.query(Rate.id).order_by(Rate.id)]
+
+
+def get_candles():
+    return [(candle.interval, candle.start, candle.open, candle.high, candle.low, candle.close, candle.ticks)
+            for candle in RateCandle.query.order_by(RateCandle.interval, RateCandle.start)]
+
+
+def test_expired_rates_are_downsampled_into_candles(compactor):
+    compactor.compact()
+    minute = EXPIRED + datetime.timedelta(minutes=1)
+    assert get_candles() == [
+        ('1h', EXPIRED, Decimal('27.0'), Decimal('28.0'), Decimal('27.0'), Decimal('27.5'), 3),
+        ('1m', EXPIRED, Decimal('27.0'), Decimal('28.0'), Decimal('27.0'), Decimal('28.0'), 2),
+        ('1m', minute, Decimal('27.5'), Decimal('27.5'), Decimal('27.5'), Decimal('27.5'), 1),
+    ]
+    assert RateCompactionState.get_watermark() == (EXPIRED + datetime.timedelta(seconds=70), 3)
+
+
+def test_downsampled_rates_are_not_downsampled_again(compactor):
+    compactor.compact()
+    candles = get_candles()
+    compactor.compact()
+    assert get_candles() == candles
+
+
+def test_downsampled_rates_are_deleted_except_the_best_one(compactor):
+    subscription = rate_events.subscribe()
+    try:
+        compactor.compact()
+        assert get_rate_ids() == [2, 4]
+        deleted = ChangeLog.query.filter_by(operation=ChangeOperationsInternal.deleted.value)
+        assert [entry.record_id for entry in deleted] == [1, 3]
+        frames = [subscription.get(0), subscription.get(0)]
+        assert all(frame.startswith(b'event: deleted\n') for frame in frames)
+    finally:
+        rate_events.unsubscribe(subscription)
+
+
+def test_best_rate_is_deleted_once_it_is_not_the_best_one(compactor):
+    compactor.compact()
+    Rate.get(2).update({'rate': Decimal('25.0')})
+    assert BestRate.query.one().rate_id == 4
+    compactor.compact()
+    assert get_rate_ids() == [4]
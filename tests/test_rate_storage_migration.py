@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import Column, create_engine, Integer, MetaData, Numeric, Table
+
+from src.models.types import migrate_scaled_columns
+
+SCALE = 5
+FLAG = 0b1
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "db.sqlite"}')
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def rates(engine):
+    table = Table('Rate', MetaData(), Column('id', Integer, primary_key=True), Column('Rate', Numeric(12, 5)))
+    table.create(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql('INSERT INTO "Rate" ("id", "Rate") VALUES (1, 27.12345), (2, 1)')
+    return table
+
+
+def get_values(engine):
+    with engine.connect() as connection:
+        return connection.exec_driver_sql('SELECT "Rate" FROM "Rate" ORDER BY "id"').scalars().all()
+
+
+def get_user_version(engine):
+    with engine.connect() as connection:
+        return connection.exec_driver_sql('PRAGMA user_version').scalar()
+
+
+def test_migration_is_idempotent(engine, rates):
+    assert migrate_scaled_columns(engine, [rates.c.Rate], True, SCALE, FLAG)
+    assert not migrate_scaled_columns(engine, [rates.c.Rate], True, SCALE, FLAG)
+
+    assert get_values(engine) == [2712345, 100000]
+    assert get_user_version(engine) & FLAG
+
+
+def test_migration_back_restores_values(engine, rates):
+    migrate_scaled_columns(engine, [rates.c.Rate], True, SCALE, FLAG)
+    assert migrate_scaled_columns(engine, [rates.c.Rate], False, SCALE, FLAG)
+    assert not migrate_scaled_columns(engine, [rates.c.Rate], False, SCALE, FLAG)
+
+    assert get_values(engine) == [pytest.approx(27.12345), pytest.approx(1)]
+    assert not get_user_version(engine) & FLAG
+
+
+def test_migration_waits_for_concurrent_one(engine, rates):
+    # NOTE: another process converts the values while this one starts
+    other = engine.raw_connection()
+    other.cursor().execute('BEGIN IMMEDIATE')
+    results = []
+    thread = threading.Thread(target=lambda: results.append(
+        migrate_scaled_columns(engine, [rates.c.Rate], True, SCALE, FLAG)
+    ))
+    thread.start()
+    time.sleep(0.2)
+    other.cursor().execute('UPDATE "Rate" SET "Rate" = CAST(ROUND("Rate" * 100000) AS INTEGER)')
+    other.cursor().execute(f'PRAGMA user_version = {FLAG}')
+    other.commit()
+    other.close()
+    thread.join()
+
+    assert results == [False]
+    assert get_values(engine) == [2712345, 100000]
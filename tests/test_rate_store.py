@@ -0,0 +1,62 @@
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+
+from src.cache.rate_store import RateStore
+from src.cache.snapshot import RateSnapshotFile, SnapshotPublisher
+from src.models import db, Currency, Rate
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / "db.sqlite"}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.engine.dispose()
+
+
+@pytest.fixture
+def snapshot_file(tmp_path):
+    return RateSnapshotFile(tmp_path / 'rates.snapshot')
+
+
+@pytest.fixture
+def publisher(app, snapshot_file, tmp_path):
+    return SnapshotPublisher(app, snapshot_file, 1, tmp_path / 'publisher.lock')
+
+
+def create_rate(rate: str) -> Rate:
+    currency = Currency.create(code='USD', name='Dollar')
+    base_currency = Currency.create(code='UAH', name='Hryvnia')
+    return Rate.create(currency_id=currency.id, base_id=base_currency.id, operation_type='b',
+                       rate=Decimal(rate), is_cash=True)
+
+
+def get_rates(store: RateStore):
+    return [record['rate'] for record in store.get_rates(currency='USD')]
+
+
+def test_published_snapshot_is_read(publisher, snapshot_file):
+    create_rate('27.1')
+    publisher.publish()
+    store = RateStore()
+    store.init_app(True, snapshot_file)
+    assert get_rates(store) == [27.1]
+    assert store.get_snapshot() is snapshot_file.read()
+
+
+def test_write_is_read_before_the_snapshot_is_republished(publisher, snapshot_file):
+    rate = create_rate('27.1')
+    publisher.publish()
+    store = RateStore()
+    store.init_app(True, snapshot_file)
+    assert get_rates(store) == [27.1]
+
+    rate.update({'rate': Decimal('28.2')})
+    assert get_rates(store) == [28.2]
+    assert store.get_snapshot() is not snapshot_file.read()
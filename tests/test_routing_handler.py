@@ -0,0 +1,28 @@
+import logging
+
+from src.structured_logging import RoutingHandler
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.names = []
+
+    def emit(self, record):
+        self.names.append(record.name)
+
+
+def make_record(name):
+    return logging.LogRecord(name, logging.WARNING, __file__, 0, 'message', (), None)
+
+
+def test_records_go_to_the_closest_route():
+    default, records, slow_queries = ListHandler(), ListHandler(), ListHandler()
+    handler = RoutingHandler(default, {'src.slow_queries.records': records, 'src.slow_queries': slow_queries})
+    for name in ('src.slow_queries.records', 'src.slow_queries.records.child', 'src.slow_queries', 'src.app',
+                 'src.slow_queries_other'):
+        handler.handle(make_record(name))
+
+    assert records.names == ['src.slow_queries.records', 'src.slow_queries.records.child']
+    assert slow_queries.names == ['src.slow_queries']
+    assert default.names == ['src.app', 'src.slow_queries_other']
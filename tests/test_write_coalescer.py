@@ -0,0 +1,86 @@
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+
+from src.coalescer import WriteCoalescer
+from src.exceptions import QueueFullError
+from src.models import db, Currency, Rate
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / "db.sqlite"}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        currency = Currency.create(code='USD', name='Dollar')
+        base_currency = Currency.create(code='UAH', name='Hryvnia')
+        for rate in ('27.1', '27.2'):
+            Rate.create(currency_id=currency.id, base_id=base_currency.id, operation_type='b',
+                        rate=Decimal(rate), is_cash=True)
+        yield app
+        db.engine.dispose()
+
+
+@pytest.fixture
+def flushed():
+    return []
+
+
+@pytest.fixture
+def coalescer(app, flushed):
+    coalescer = WriteCoalescer(Rate, on_flushed=lambda rates: flushed.append(
+        [(rate.id, rate.rate, rate.is_cash) for rate in rates]))
+    # NOTE: the flusher thread never wakes up during a test, the tests flush explicitly
+    coalescer.init_app(app, flush_interval=60, max_pending=2, submit_timeout=0.05)
+    return coalescer
+
+
+def get_rate(record_id):
+    db.session.expire_all()
+    return Rate.get(record_id).rate
+
+
+def test_updates_of_a_record_are_coalesced(coalescer, flushed):
+    coalescer.submit(1, {'rate': Decimal('28.1'), 'is_cash': False})
+    pending = coalescer.submit(1, {'rate': Decimal('29.1')})
+    assert pending == {'rate': Decimal('29.1'), 'is_cash': False}
+    coalescer.flush()
+    assert flushed == [[(1, Decimal('29.1'), False)]]
+
+
+def test_pending_updates_are_read(coalescer):
+    assert coalescer.get_pending(1) is None
+    coalescer.submit(1, {'rate': Decimal('28.1')})
+    assert coalescer.get_pending(1) == {'rate': Decimal('28.1')}
+    assert get_rate(1) == Decimal('27.1')
+    coalescer.flush()
+    assert coalescer.get_pending(1) is None
+    assert get_rate(1) == Decimal('28.1')
+
+
+def test_full_queue_rejects_new_records(coalescer):
+    coalescer.submit(1, {'rate': Decimal('28.1')})
+    coalescer.submit(2, {'rate': Decimal('28.2')})
+    with pytest.raises(QueueFullError):
+        coalescer.submit(3, {'rate': Decimal('28.3')})
+    # NOTE: the queue is bounded by records, a queued record still takes updates
+    coalescer.submit(1, {'rate': Decimal('29.1')})
+    coalescer.flush()
+    coalescer.submit(3, {'rate': Decimal('28.3')})
+
+
+def test_failing_record_is_dropped(coalescer, flushed):
+    coalescer.submit(1, {'rate': Decimal('28.1')})
+    coalescer.submit(2, {'rate': None})
+    for _ in range(WriteCoalescer._MAX_FLUSH_ATTEMPTS):
+        assert coalescer.get_pending(1) is not None
+        coalescer.flush()
+    assert coalescer.get_pending(1) is None
+    assert coalescer.get_pending(2) is None
+    assert get_rate(1) == Decimal('28.1')
+    assert get_rate(2) == Decimal('27.2')
+    assert flushed == [[(1, Decimal('28.1'), True)]]